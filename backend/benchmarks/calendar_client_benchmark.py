@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-call setup cost of a Google Calendar API request
+
+Compares what it takes to get a ready-to-send events().list request:
+
+    build    googleapiclient.discovery.build() per call (how the calendar
+             tools worked before): reads and parses the discovery document
+             and creates a new HTTP object every time
+    factory  CalendarClientFactory.for_user(): the service object is built
+             once per process; each call only wraps the user's credentials
+
+Requests are built but not sent, so no network or Google account is needed.
+Run from the backend directory:
+    python3 benchmarks/calendar_client_benchmark.py [--calls 200]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.calendar_client import CalendarClientFactory
+
+def make_credentials(i: int) -> Credentials:
+    return Credentials(
+        token=f"access-token-{i}",
+        refresh_token=f"refresh-token-{i}",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="benchmark-client",
+        client_secret="benchmark-secret",
+        scopes=["https://www.googleapis.com/auth/calendar.readonly"]
+    )
+
+def list_request(events):
+    now = datetime.now(timezone.utc)
+    return events.list(
+        calendarId='primary',
+        timeMin=now.isoformat(),
+        timeMax=(now + timedelta(days=7)).isoformat(),
+        maxResults=50,
+        singleEvents=True,
+        orderBy='startTime'
+    )
+
+def run_build(i: int):
+    service = build('calendar', 'v3', credentials=make_credentials(i))
+    return list_request(service.events())
+
+def make_factory_runner():
+    factory = CalendarClientFactory()
+
+    def run_factory(i: int):
+        client = factory.for_user(make_credentials(i))
+        return list_request(client.events())
+    return factory, run_factory
+
+def measure(func, calls: int):
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        func(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    factory, run_factory = make_factory_runner()
+    first_start = time.perf_counter()
+    run_factory(-1)
+    first_ms = (time.perf_counter() - first_start) * 1000
+
+    print(f"{'mode':>8} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    for mode, func in (("build", run_build), ("factory", run_factory)):
+        timings = measure(func, args.calls)
+        print(f"{mode:>8} {statistics.mean(timings):>9.3f} {statistics.median(timings):>9.3f} {max(timings):>9.3f}")
+    print(f"\nfactory one-time service build: {factory.build_ms:.1f} ms (first call {first_ms:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-turn chat database time: PostgREST (Supabase HTTP API) vs direct asyncpg
+
+Each turn runs the queries /chat issues: session ownership check, recent
+messages for context, and the user + assistant message inserts (each with
+its session timestamp update). The recent-message cache is disabled so every
+turn reaches the database.
+
+Needs SUPABASE_* keys, POSTGRES_DSN or DATABASE_URL, and an existing user id.
+A scratch session is created per backend and deleted afterwards.
+
+Run from the backend directory:
+    python3 benchmarks/chat_db_benchmark.py --user-id <uuid> [--turns 50] [--context 20]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+# Measure the database, not the in-process cache
+os.environ["SESSION_CACHE_MAX_SESSIONS"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database.supabase_client import db_manager, close_async_clients
+from src.database.postgres_pool import postgres_pool, ASYNCPG_AVAILABLE
+from src.database.session_operations import SessionManager, AsyncpgSessionManager
+from src.database.message_operations import MessageManager, AsyncpgMessageManager
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run_turns(sessions, messages, session_id: str, user_id: str, turns: int, context: int):
+    timings = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        session = await sessions.get_session(session_id, user_id)
+        assert session is not None, "ownership check failed"
+        await messages.get_recent_messages(session_id, user_id, count=context)
+        user_row = await messages.add_message(session_id, user_id, "user", f"Benchmark question {turn}: what's on my calendar tomorrow?")
+        assistant_row = await messages.add_message(session_id, user_id, "assistant", f"Benchmark answer {turn}: you have two meetings tomorrow.")
+        assert user_row and assistant_row, "message insert failed"
+        timings.append(time.perf_counter() - start)
+    return timings
+
+async def benchmark(name: str, sessions, messages, user_id: str, turns: int, context: int, warmup: int):
+    # Scratch sessions are created through PostgREST so both backends start from the same state
+    session = await SessionManager().create_session(user_id, title=f"db benchmark ({name})")
+    if not session:
+        raise RuntimeError("could not create benchmark session - check SUPABASE_* settings and --user-id")
+    try:
+        await run_turns(sessions, messages, session["id"], user_id, warmup, context)
+        timings = await run_turns(sessions, messages, session["id"], user_id, turns, context)
+    finally:
+        # Hard delete; chat_messages rows cascade
+        await db_manager.async_admin.table('chat_sessions').delete().eq('id', session["id"]).execute()
+
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "mean_ms": statistics.mean(timings) * 1000,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", required=True, help="id of an existing row in users")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--context", type=int, default=20, help="recent messages loaded per turn")
+    parser.add_argument("--warmup", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = {"postgrest": (SessionManager(), MessageManager())}
+    if ASYNCPG_AVAILABLE and postgres_pool.dsn:
+        # Enable the pool regardless of DATABASE_BACKEND so both paths can be compared
+        postgres_pool.enabled = True
+        backends["asyncpg"] = (AsyncpgSessionManager(), AsyncpgMessageManager())
+    else:
+        print("asyncpg or POSTGRES_DSN/DATABASE_URL missing - benchmarking PostgREST only")
+
+    print(f"{'backend':>10} {'turns':>6} {'median ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    try:
+        for name, (sessions, messages) in backends.items():
+            result = await benchmark(name, sessions, messages, args.user_id, args.turns, args.context, args.warmup)
+            print(f"{name:>10} {args.turns:>6} {result['median_ms']:>10.1f} {result['p95_ms']:>10.1f} {result['mean_ms']:>10.1f}")
+    finally:
+        await postgres_pool.close()
+        await close_async_clients()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark checkpoint size and encode/decode time: LangGraph default serializer vs compact (msgpack + zstd)
+
+Run from the backend directory:
+    python3 benchmarks/checkpoint_serializer_benchmark.py [--turns 20] [--iterations 200]
+
+The synthetic conversation repeats the same turns, so zstd ratios here are far
+better than on real checkpoints; measure against exported production checkpoints
+before sizing storage from these numbers.
+"""
+
+import argparse
+import importlib.util
+import os
+import statistics
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+_serializer_path = os.path.join(
+    os.path.dirname(__file__), '..', 'src', 'services', 'checkpoint_serializer.py'
+)
+_spec = importlib.util.spec_from_file_location("checkpoint_serializer", _serializer_path)
+_checkpoint_serializer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_checkpoint_serializer)
+CompactCheckpointSerializer = _checkpoint_serializer.CompactCheckpointSerializer
+
+def build_messages(turns: int):
+    """Conversation shaped like SimpleWorkflowState after several orchestrated turns"""
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"What's the weather in London and schedule a sync tomorrow at {turn % 12 + 1}pm?"))
+        call_id = f"call_{turn}"
+        messages.append(AIMessage(
+            content="",
+            tool_calls=[{
+                "name": "invoke_weather_agent",
+                "args": {"query": "weather in London", "user_id": "3f2b6a1e-1c2d-4e5f-8a9b-0c1d2e3f4a5b"},
+                "id": call_id,
+            }],
+        ))
+        messages.append(ToolMessage(
+            content="🌤️ London: 18°C, partly cloudy, humidity 72%, wind 14 km/h NW. Forecast: light rain after 6pm.",
+            tool_call_id=call_id,
+            name="invoke_weather_agent",
+        ))
+        messages.append(AIMessage(
+            content="Here's what I found out for you! London is 18°C and partly cloudy right now, "
+                    "with light rain expected after 6pm. I've also scheduled your sync. Anything else?",
+            response_metadata={"finish_reason": "STOP", "model_name": "gemini-2.0-flash"},
+        ))
+    return messages
+
+def build_checkpoint(turns: int):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {
+        "messages": build_messages(turns),
+        "agent_results": {f"step_{i}": "Latest result: weather fetched" for i in range(turns)},
+        "context": "Latest result: weather fetched",
+        "user_id": "3f2b6a1e-1c2d-4e5f-8a9b-0c1d2e3f4a5b",
+    }
+    checkpoint["channel_versions"] = {channel: "1" for channel in checkpoint["channel_values"]}
+    return checkpoint
+
+def measure(serde, checkpoint, iterations: int):
+    encoded = serde.dumps_typed(checkpoint)
+    decoded = serde.loads_typed(encoded)
+    assert len(decoded["channel_values"]["messages"]) == len(checkpoint["channel_values"]["messages"])
+
+    encode_times, decode_times = [], []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        encoded = serde.dumps_typed(checkpoint)
+        encode_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        serde.loads_typed(encoded)
+        decode_times.append(time.perf_counter() - start)
+
+    return {
+        "type": encoded[0],
+        "bytes": len(encoded[1]),
+        "encode_us": statistics.median(encode_times) * 1e6,
+        "decode_us": statistics.median(decode_times) * 1e6,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[1, 5, 20, 50])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    serializers = {
+        "default": JsonPlusSerializer(),
+        "compact": CompactCheckpointSerializer(),
+    }
+
+    print(f"zstd available: {_checkpoint_serializer.ZSTD_AVAILABLE}")
+    print(f"{'turns':>6} {'serializer':>10} {'type':>14} {'bytes':>10} {'ratio':>7} {'encode µs':>10} {'decode µs':>10}")
+    for turns in args.turns:
+        checkpoint = build_checkpoint(turns)
+        baseline = None
+        for name, serde in serializers.items():
+            result = measure(serde, checkpoint, args.iterations)
+            baseline = baseline or result["bytes"]
+            print(
+                f"{turns:>6} {name:>10} {result['type']:>14} {result['bytes']:>10} "
+                f"{result['bytes'] / baseline:>7.2f} {result['encode_us']:>10.1f} {result['decode_us']:>10.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
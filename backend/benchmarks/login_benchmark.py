@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark sign-in throughput and chat latency while a login burst is hashed
+
+Each mode verifies --logins passwords with --concurrency in flight while
+--chat-clients simulated chat requests keep the event loop busy (10 ms of
+awaited I/O each, back to back). Reported per mode: logins per second and
+how late the chat requests resumed (event-loop stall) at p50/p99/max.
+
+Modes:
+    inline   bcrypt on the event loop (how signin worked before)
+    thread   PasswordHasher with a thread pool
+    process  PasswordHasher with a process pool
+
+No database or network is needed. Run from the backend directory:
+    python3 benchmarks/login_benchmark.py [--rounds 12] [--logins 40] [--concurrency 8] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import bcrypt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.services.password_hasher import PasswordHasher
+
+CHAT_IO_SECONDS = 0.01
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def chat_client(stop: asyncio.Event, stalls: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(CHAT_IO_SECONDS)
+        stalls.append(time.perf_counter() - start - CHAT_IO_SECONDS)
+
+async def run_mode(mode: str, hashed: str, password: str, args):
+    if mode == "inline":
+        hasher = None
+
+        async def verify():
+            return bcrypt.checkpw(password.encode(), hashed.encode())
+    else:
+        hasher = PasswordHasher(rounds=args.rounds, executor_type=mode, workers=args.workers, max_queue=args.logins)
+
+        async def verify():
+            return await hasher.verify(password, hashed)
+
+        # Start the pool outside the measurement
+        await verify()
+
+    stop = asyncio.Event()
+    stalls = []
+    clients = [asyncio.create_task(chat_client(stop, stalls)) for _ in range(args.chat_clients)]
+    await asyncio.sleep(0.1)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def login():
+        async with semaphore:
+            assert await verify()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await asyncio.gather(*clients)
+    if hasher is not None:
+        hasher.close()
+
+    return {
+        "logins_per_s": args.logins / elapsed,
+        "stall_p50_ms": statistics.median(stalls) * 1000,
+        "stall_p99_ms": percentile(stalls, 0.99) * 1000,
+        "stall_max_ms": max(stalls) * 1000,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8, help="logins in flight at once")
+    parser.add_argument("--workers", type=int, default=4, help="hashing pool size")
+    parser.add_argument("--chat-clients", type=int, default=50)
+    parser.add_argument("--modes", default="inline,thread,process")
+    args = parser.parse_args()
+
+    password = "benchmark-password"
+    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=args.rounds)).decode()
+
+    print(f"{'mode':>8} {'logins/s':>9} {'stall p50 ms':>13} {'stall p99 ms':>13} {'stall max ms':>13}")
+    for mode in args.modes.split(","):
+        result = await run_mode(mode, hashed, password, args)
+        print(f"{mode:>8} {result['logins_per_s']:>9.1f} {result['stall_p50_ms']:>13.1f} "
+              f"{result['stall_p99_ms']:>13.1f} {result['stall_max_ms']:>13.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
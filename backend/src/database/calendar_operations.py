@@ -4,6 +4,9 @@ Database operations for calendar integrations
 
 from typing import Optional, Dict, Any, List
 from src.database.supabase_client import db_manager
+from src.database.query_metrics import timed_execute
+from src.database.sqlite_db import sqlite_db, utc_now, row_to_dict
+import uuid
 import logging
 
 logger = logging.getLogger(__name__)
@@ -46,13 +49,17 @@ class CalendarDatabaseManager:
         if encrypted_refresh_token:
             integration_data['refresh_token'] = encrypted_refresh_token
 
+        return await self._save_integration(user_id, integration_data)
+
+    async def _save_integration(self, user_id: str, integration_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Upsert the (user_id, provider) integration row"""
         try:
             # Use upsert with the correct conflict resolution
-            result = db_manager.admin.table('user_calendar_integrations').upsert(
+            result = await timed_execute(db_manager.async_admin.table('user_calendar_integrations').upsert(
                 integration_data,
                 on_conflict='user_id,provider',
                 count='exact'
-            ).execute()
+            ))
 
             if result.data:
                 logger.info(f"Calendar integration stored for user: {user_id}")
@@ -64,9 +71,9 @@ class CalendarDatabaseManager:
             # Fallback: try to update existing record or insert new one
             try:
                 # First try to update existing record
-                existing = db_manager.admin.table('user_calendar_integrations').select("id").eq(
+                existing = await timed_execute(db_manager.async_admin.table('user_calendar_integrations').select("id").eq(
                     'user_id', user_id
-                ).eq('provider', 'google').execute()
+                ).eq('provider', 'google'))
                 
                 if existing.data:
                     # Update existing record - don't overwrite refresh_token if we don't have a new one
@@ -75,15 +82,15 @@ class CalendarDatabaseManager:
                         # Keep existing refresh_token
                         logger.info("Keeping existing refresh token")
                     
-                    result = db_manager.admin.table('user_calendar_integrations').update(
+                    result = await timed_execute(db_manager.async_admin.table('user_calendar_integrations').update(
                         update_data
-                    ).eq('user_id', user_id).eq('provider', 'google').execute()
+                    ).eq('user_id', user_id).eq('provider', 'google'))
                     logger.info(f"Calendar integration updated for user: {user_id}")
                 else:
                     # Insert new record
-                    result = db_manager.admin.table('user_calendar_integrations').insert(
+                    result = await timed_execute(db_manager.async_admin.table('user_calendar_integrations').insert(
                         integration_data
-                    ).execute()
+                    ))
                     logger.info(f"Calendar integration inserted for user: {user_id}")
                 
                 return result.data[0] if result.data else None
@@ -92,21 +99,43 @@ class CalendarDatabaseManager:
                 logger.error(f"Fallback also failed: {fallback_error}")
                 return None
 
+    async def update_tokens(self,
+                            user_id: str,
+                            access_token: str,
+                            refresh_token: Optional[str],
+                            expires_at: Optional[str]) -> bool:
+        """Store refreshed tokens on the active integration only; False if it is gone or inactive"""
+        from src.services.google_calendar_service import google_calendar_service
+
+        token_data = {
+            'access_token': google_calendar_service.encrypt_token(access_token),
+            'token_expires_at': expires_at,
+        }
+        if refresh_token:
+            token_data['refresh_token'] = google_calendar_service.encrypt_token(refresh_token)
+
+        try:
+            # Guarded by is_active so a refresh can't revive a calendar disconnected meanwhile
+            return await self._update_active_tokens(user_id, token_data)
+        except Exception as e:
+            logger.error(f"Error updating calendar tokens: {e}")
+            return False
+
+    async def _update_active_tokens(self, user_id: str, token_data: Dict[str, Any]) -> bool:
+        """Update the token columns of the active Google integration"""
+        result = await timed_execute(db_manager.async_admin.table('user_calendar_integrations').update(
+            token_data
+        ).eq('user_id', user_id).eq('provider', 'google').eq('is_active', True))
+        return bool(result.data)
+
     async def get_user_calendar_integration(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user's calendar integration with decrypted tokens"""
         try:
             logger.info(f"📅 Fetching calendar integration for user: {user_id}")
             
-            result = db_manager.admin.table('user_calendar_integrations').select("*").eq(
-                'user_id', user_id
-            ).eq('provider', 'google').eq('is_active', True).execute()
-
-            print(f"🔍 Result: {result}")
-
-            logger.info(f"📅 Database query result: {len(result.data) if result.data else 0} records found")
+            integration = await self._fetch_active_integration(user_id)
 
-            if result.data:
-                integration = result.data[0]
+            if integration:
                 logger.info(f"📅 Found integration record: {integration.get('id')}")
                 
                 # Tokens are stored directly (no decryption needed)
@@ -136,6 +165,15 @@ class CalendarDatabaseManager:
             logger.error(f"📅 Full traceback: {traceback.format_exc()}")
             return None
 
+    async def _fetch_active_integration(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Active Google integration row of a user"""
+        result = await timed_execute(db_manager.async_admin.table('user_calendar_integrations').select("*").eq(
+            'user_id', user_id
+        ).eq('provider', 'google').eq('is_active', True))
+
+        logger.info(f"📅 Database query result: {len(result.data) if result.data else 0} records found")
+        return result.data[0] if result.data else None
+
     async def log_calendar_event(self,
                                 user_id: str,
                                 integration_id: str,
@@ -154,12 +192,86 @@ class CalendarDatabaseManager:
                 'created_via_prompt': original_prompt
             }
 
-            db_manager.admin.table('calendar_events_log').insert(log_data).execute()
+            await self._insert_event_log(log_data)
             return True
 
         except Exception as e:
             logger.error(f"Error logging calendar event: {e}")
             return False
 
+    async def _insert_event_log(self, log_data: Dict[str, Any]):
+        """Insert a calendar_events_log row"""
+        await timed_execute(db_manager.async_admin.table('calendar_events_log').insert(log_data))
+
+    async def deactivate_calendar_integration(self, user_id: str) -> bool:
+        """Mark user's Google calendar integration inactive"""
+        try:
+            await timed_execute(db_manager.async_admin.table('user_calendar_integrations').update({
+                'is_active': False
+            }).eq('user_id', user_id).eq('provider', 'google'))
+            return True
+
+        except Exception as e:
+            logger.error(f"Error deactivating calendar integration: {e}")
+            return False
+
+class SqliteCalendarDatabaseManager(CalendarDatabaseManager):
+    """CalendarDatabaseManager backed by the embedded SQLite database"""
+
+    async def _save_integration(self, user_id: str, integration_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Upsert the (user_id, provider) integration row"""
+        try:
+            row = {'id': str(uuid.uuid4()), **integration_data, 'updated_at': utc_now()}
+            columns = ", ".join(row)
+            placeholders = ", ".join("?" for _ in row)
+            # Only the provided columns are overwritten, so an existing refresh_token is kept
+            assignments = ", ".join(f"{column} = excluded.{column}" for column in row if column not in ('id', 'user_id', 'provider'))
+            params = [int(v) if isinstance(v, bool) else v for v in row.values()]
+
+            def work(connection):
+                connection.execute(
+                    f"INSERT INTO user_calendar_integrations ({columns}) VALUES ({placeholders}) "
+                    f"ON CONFLICT(user_id, provider) DO UPDATE SET {assignments}",
+                    params
+                )
+                return row_to_dict(connection.execute(
+                    "SELECT * FROM user_calendar_integrations WHERE user_id = ? AND provider = ?",
+                    [row['user_id'], row['provider']]
+                ).fetchone())
+
+            result = await sqlite_db.transaction(work, 'user_calendar_integrations', 'upsert')
+            logger.info(f"Calendar integration stored for user: {user_id}")
+            return result
+        except Exception as e:
+            logger.error(f"Error storing calendar integration: {e}")
+            return None
+
+    async def _update_active_tokens(self, user_id: str, token_data: Dict[str, Any]) -> bool:
+        """Update the token columns of the active Google integration"""
+        rows = await sqlite_db.update(
+            'user_calendar_integrations', {**token_data, 'updated_at': utc_now()},
+            user_id=user_id, provider='google', is_active=True
+        )
+        return bool(rows)
+
+    async def _fetch_active_integration(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Active Google integration row of a user"""
+        rows = await sqlite_db.select('user_calendar_integrations', user_id=user_id, provider='google', is_active=True)
+        return rows[0] if rows else None
+
+    async def _insert_event_log(self, log_data: Dict[str, Any]):
+        """Insert a calendar_events_log row"""
+        await sqlite_db.insert('calendar_events_log', log_data)
+
+    async def deactivate_calendar_integration(self, user_id: str) -> bool:
+        """Mark user's Google calendar integration inactive"""
+        try:
+            await sqlite_db.update('user_calendar_integrations', {'is_active': False, 'updated_at': utc_now()}, user_id=user_id, provider='google')
+            return True
+
+        except Exception as e:
+            logger.error(f"Error deactivating calendar integration: {e}")
+            return False
+
 # Global instance
-calendar_db = CalendarDatabaseManager() 
\ No newline at end of file
+calendar_db = SqliteCalendarDatabaseManager() if sqlite_db.enabled else CalendarDatabaseManager() 
\ No newline at end of file
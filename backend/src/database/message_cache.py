@@ -0,0 +1,185 @@
+"""
+In-process cache of recent chat messages per session (write-through from MessageManager)
+"""
+
+from collections import OrderedDict, deque
+from typing import List, Optional, Dict, Any
+import json
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cache limits
+SESSION_CACHE_MAX_SESSIONS = int(os.getenv("SESSION_CACHE_MAX_SESSIONS", "1000"))
+SESSION_CACHE_MAX_BYTES = int(os.getenv("SESSION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_CACHE_MESSAGES_PER_SESSION = int(os.getenv("SESSION_CACHE_MESSAGES_PER_SESSION", "50"))
+
+# Rough per-row overhead for ids, timestamps and dict bookkeeping
+_ROW_OVERHEAD_BYTES = 256
+
+def _message_size(message: Dict[str, Any]) -> int:
+    """Approximate memory held by a cached message row"""
+    size = _ROW_OVERHEAD_BYTES + len(message.get("content") or "")
+    metadata = message.get("metadata")
+    if metadata:
+        size += len(json.dumps(metadata, default=str))
+    return size
+
+class _CachedSession:
+    """Ring buffer of the newest messages of one session"""
+
+    __slots__ = ("user_id", "messages", "complete", "size")
+
+    def __init__(self, user_id: str, capacity: int):
+        self.user_id = user_id
+        self.messages = deque(maxlen=capacity)
+        # True when the buffer holds the session's entire history
+        self.complete = False
+        self.size = 0
+
+class RecentMessageCache:
+    """LRU cache of per-session message ring buffers bounded by sessions and bytes"""
+
+    def __init__(self,
+                 max_sessions: int = SESSION_CACHE_MAX_SESSIONS,
+                 max_bytes: int = SESSION_CACHE_MAX_BYTES,
+                 messages_per_session: int = SESSION_CACHE_MESSAGES_PER_SESSION):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.messages_per_session = messages_per_session
+        self.enabled = max_sessions > 0 and messages_per_session > 0
+        self._sessions: "OrderedDict[str, _CachedSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Write sequence numbers so a slow database read can't overwrite newer appends:
+        # session_id -> sequence of its last write, bounded, with everything older
+        # than _writes_floor treated as possibly written
+        self._sequence = 0
+        self._writes: "OrderedDict[str, int]" = OrderedDict()
+        self._writes_floor = 0
+        self._max_tracked_writes = max(1024, 2 * max_sessions)
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, session_id: str, user_id: str, count: int) -> Optional[List[Dict[str, Any]]]:
+        """Return the newest `count` messages (oldest first), or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry.user_id != user_id or (len(entry.messages) < count and not entry.complete):
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            messages = list(entry.messages)[-count:] if count > 0 else []
+            return [dict(message) for message in messages]
+
+    def generation(self) -> int:
+        """Write sequence to take before a database read and pass to store()"""
+        with self._lock:
+            return self._sequence
+
+    def store(self, session_id: str, user_id: str, messages: List[Dict[str, Any]], requested: int, generation: int):
+        """Populate a session from a database read of the newest `requested` messages
+
+        Skipped when the session was written after `generation` was taken, since the
+        read may predate that write."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation < self._writes_floor or self._writes.get(session_id, 0) > generation:
+                return
+            entry = self._replace(session_id, user_id)
+            for message in messages[-self.messages_per_session:]:
+                self._push(entry, dict(message))
+            # Fewer rows than requested means we saw the whole history
+            entry.complete = len(messages) < requested and len(messages) <= self.messages_per_session
+            self._evict()
+
+    def append(self, session_id: str, user_id: str, message: Dict[str, Any]):
+        """Write-through of a newly inserted message; ignored for sessions not in the cache"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._record_write(session_id)
+            entry = self._sessions.get(session_id)
+            if entry is None or entry.user_id != user_id:
+                return
+            self._push(entry, dict(message))
+            self._sessions.move_to_end(session_id)
+            self._evict()
+
+    def invalidate(self, session_id: str):
+        """Drop a session's cached messages"""
+        with self._lock:
+            self._record_write(session_id)
+            self._remove(session_id)
+
+    def invalidate_message(self, message_id: str):
+        """Drop whichever session holds a given message"""
+        with self._lock:
+            for session_id, entry in list(self._sessions.items()):
+                if any(message.get("id") == message_id for message in entry.messages):
+                    self._record_write(session_id)
+                    self._remove(session_id)
+                    return
+            # Session unknown: fence off every read already in flight
+            self._sequence += 1
+            self._writes_floor = self._sequence
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and residency counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._sessions),
+                "resident_bytes": self.resident_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _record_write(self, session_id: str):
+        self._sequence += 1
+        self._writes[session_id] = self._sequence
+        self._writes.move_to_end(session_id)
+        while len(self._writes) > self._max_tracked_writes:
+            _, sequence = self._writes.popitem(last=False)
+            self._writes_floor = max(self._writes_floor, sequence)
+
+    def _replace(self, session_id: str, user_id: str) -> _CachedSession:
+        self._remove(session_id)
+        entry = _CachedSession(user_id, self.messages_per_session)
+        self._sessions[session_id] = entry
+        return entry
+
+    def _push(self, entry: _CachedSession, message: Dict[str, Any]):
+        if len(entry.messages) == entry.messages.maxlen:
+            dropped = _message_size(entry.messages[0])
+            entry.size -= dropped
+            self.resident_bytes -= dropped
+            entry.complete = False
+        size = _message_size(message)
+        entry.messages.append(message)
+        entry.size += size
+        self.resident_bytes += size
+
+    def _remove(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self.resident_bytes -= entry.size
+
+    def _evict(self):
+        while self._sessions and (len(self._sessions) > self.max_sessions or self.resident_bytes > self.max_bytes):
+            session_id = next(iter(self._sessions))
+            self._remove(session_id)
+            self.evictions += 1
+
+# Global instance
+recent_message_cache = RecentMessageCache()
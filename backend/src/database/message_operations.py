@@ -4,88 +4,203 @@ Chat message database operations
 
 from typing import List, Optional, Dict, Any
 from .supabase_client import db_manager
-from .session_operations import session_manager
+from .query_metrics import timed_execute, timed_call
+from .session_touch import session_touch_buffer
+from .message_cache import recent_message_cache
+from .postgres_pool import asyncpg, postgres_pool, record_to_dict
+from .sqlite_db import sqlite_db, utc_now, row_to_dict
+import html
+import json
+import os
+import re
+import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Keyset pagination of session history; the default page plus its look-ahead row
+# fits in the recent-message cache (SESSION_CACHE_MESSAGES_PER_SESSION)
+MESSAGE_PAGE_SIZE = int(os.getenv("MESSAGE_PAGE_SIZE", "40"))
+MESSAGE_PAGE_MAX_SIZE = int(os.getenv("MESSAGE_PAGE_MAX_SIZE", "200"))
+
+# Full-text search over a user's messages (GET /sessions/search)
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_PAGE_MAX_SIZE = int(os.getenv("SEARCH_PAGE_MAX_SIZE", "50"))
+
+# Highlight delimiters emitted by the database; replaced after HTML-escaping the snippet
+_HIGHLIGHT_START = "\x02"
+_HIGHLIGHT_END = "\x03"
+
+def format_search_snippet(snippet: Optional[str]) -> str:
+    """HTML-escape a search snippet and wrap its highlighted terms in <mark>"""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_HIGHLIGHT_START, "<mark>").replace(_HIGHLIGHT_END, "</mark>")
+
 class MessageManager:
     """Manage chat message database operations"""
 
+    # Backends whose insert also bumps chat_sessions.last_message_at set this to skip the extra round trip
+    insert_updates_session = False
+
     async def add_message(self, session_id: str, user_id: str, role: str, content: str, metadata: Dict[str, Any] = None, jwt_token: str = None) -> Optional[Dict[str, Any]]:
         """Add a new message to a session"""
         try:
-            # Use admin client if available, otherwise use regular client with user filtering
-            client = db_manager.admin if db_manager.admin else db_manager.client
-            if not client:
-                logger.error("No database client available")
-                return None
-                
-            # Get next message order
-            order_result = client.table('chat_messages').select("message_order").eq('session_id', session_id).order('message_order', desc=True).limit(1).execute()
-            next_order = (order_result.data[0]['message_order'] + 1) if order_result.data else 1
-
-            message_data = {
-                "session_id": session_id,
-                "user_id": user_id,
-                "role": role,
-                "content": content,
-                "metadata": metadata or {},
-                "message_order": next_order
-            }
-
-            result = client.table('chat_messages').insert(message_data).execute()
-            if result.data:
-                # Update session last message timestamp
-                await session_manager.update_session_last_message(session_id)
-                logger.info(f"Added message {result.data[0]['id']} to session {session_id}")
-                return result.data[0]
+            row = await self._insert_message(session_id, user_id, role, content, metadata or {})
+            if row:
+                # Keep the recent-messages cache in step with the database
+                recent_message_cache.append(session_id, user_id, row)
+
+                if not self.insert_updates_session:
+                    # Update session last message timestamp (coalesced across messages)
+                    await session_touch_buffer.touch(session_id)
+                logger.info(f"Added message {row['id']} to session {session_id}")
+                return row
             return None
         except Exception as e:
             logger.error(f"Error adding message: {e}")
             return None
 
-    async def get_session_messages(self, session_id: str, user_id: str, limit: int = None, offset: int = 0, jwt_token: str = None) -> List[Dict[str, Any]]:
-        """Get messages for a session"""
+    async def _insert_message(self, session_id: str, user_id: str, role: str, content: str, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert a message at the next message_order and return the stored row"""
+        # Use admin client if available, otherwise use regular client with user filtering
+        client = db_manager.async_admin or db_manager.async_client
+        if not client:
+            logger.error("No database client available")
+            return None
+
+        # Get next message order
+        order_result = await timed_execute(client.table('chat_messages').select("message_order").eq('session_id', session_id).order('message_order', desc=True).limit(1))
+        next_order = (order_result.data[0]['message_order'] + 1) if order_result.data else 1
+
+        message_data = {
+            "session_id": session_id,
+            "user_id": user_id,
+            "role": role,
+            "content": content,
+            "metadata": metadata,
+            "message_order": next_order
+        }
+
+        result = await timed_execute(client.table('chat_messages').insert(message_data))
+        return result.data[0] if result.data else None
+
+    async def get_session_messages(self, session_id: str, user_id: str, limit: int = MESSAGE_PAGE_SIZE, before: Optional[int] = None, after: Optional[int] = None, jwt_token: str = None) -> Dict[str, Any]:
+        """Get one page of a session's messages (oldest first) using message_order as the cursor
+
+        Without a cursor the newest page is returned. `before` pages backwards
+        through history and `after` pages forwards; next_cursor continues in the
+        same direction and is None once there are no more messages.
+        """
+        limit = max(1, min(limit or MESSAGE_PAGE_SIZE, MESSAGE_PAGE_MAX_SIZE))
         try:
-            # Use admin client if available, otherwise use regular client with user filtering
-            client = db_manager.admin if db_manager.admin else db_manager.client
-            if not client:
-                logger.error("No database client available")
-                return []
-                
-            query = client.table('chat_messages').select("*").eq('session_id', session_id).eq('user_id', user_id).order('message_order')
-
-            if limit:
-                query = query.limit(limit).offset(offset)
-
-            result = query.execute()
-            return result.data if result.data else []
+            if before is None and after is None:
+                # The newest page is what the recent-messages cache holds
+                rows = await self.get_recent_messages(session_id, user_id, count=limit + 1)
+            else:
+                rows = await self._fetch_message_page(session_id, user_id, limit + 1, before, after)
+
+            has_more = len(rows) > limit
+            if after is not None:
+                messages = rows[:limit]
+                next_cursor = messages[-1]['message_order'] if has_more else None
+            else:
+                messages = rows[-limit:]
+                next_cursor = messages[0]['message_order'] if has_more else None
+            return {"messages": messages, "next_cursor": next_cursor, "has_more": has_more}
         except Exception as e:
             logger.error(f"Error fetching session messages: {e}")
+            return {"messages": [], "next_cursor": None, "has_more": False}
+
+    async def _fetch_message_page(self, session_id: str, user_id: str, limit: int, before: Optional[int], after: Optional[int]) -> List[Dict[str, Any]]:
+        """Read up to `limit` messages after `after` or before `before`, oldest first"""
+        # Use admin client if available, otherwise use regular client with user filtering
+        client = db_manager.async_admin or db_manager.async_client
+        if not client:
+            logger.error("No database client available")
             return []
 
+        query = client.table('chat_messages').select("*").eq('session_id', session_id).eq('user_id', user_id)
+        if after is not None:
+            query = query.gt('message_order', after).order('message_order')
+        else:
+            query = query.lt('message_order', before).order('message_order', desc=True)
+
+        result = await timed_execute(query.limit(limit))
+        rows = result.data or []
+        if after is None:
+            rows.reverse()
+        return rows
+
     async def get_recent_messages(self, session_id: str, user_id: str, count: int = 50) -> List[Dict[str, Any]]:
         """Get recent messages for context (optimized for LangGraph)"""
+        cached = recent_message_cache.get(session_id, user_id, count)
+        if cached is not None:
+            return cached
+
         try:
-            # Use admin client if available, otherwise use regular client with user filtering
-            client = db_manager.admin if db_manager.admin else db_manager.client
-            if not client:
-                logger.error("No database client available")
-                return []
-                
-            result = client.table('chat_messages').select("*").eq('session_id', session_id).eq('user_id', user_id).order('message_order', desc=True).limit(count).execute()
-
-            # Return in correct order (oldest first)
-            return list(reversed(result.data)) if result.data else []
+            generation = recent_message_cache.generation()
+            messages = await self._fetch_recent_messages(session_id, user_id, count)
+            recent_message_cache.store(session_id, user_id, messages, count, generation)
+            return messages
         except Exception as e:
             logger.error(f"Error fetching recent messages: {e}")
             return []
 
+    async def _fetch_recent_messages(self, session_id: str, user_id: str, count: int) -> List[Dict[str, Any]]:
+        """Read the newest `count` messages of a session, oldest first"""
+        # Use admin client if available, otherwise use regular client with user filtering
+        client = db_manager.async_admin or db_manager.async_client
+        if not client:
+            logger.error("No database client available")
+            return []
+
+        result = await timed_execute(client.table('chat_messages').select("*").eq('session_id', session_id).eq('user_id', user_id).order('message_order', desc=True).limit(count))
+
+        # Return in correct order (oldest first)
+        return list(reversed(result.data)) if result.data else []
+
+    async def search_messages(self, user_id: str, query: str, limit: int = SEARCH_PAGE_SIZE, offset: int = 0) -> Dict[str, Any]:
+        """Rank a user's messages in active sessions against a search query
+
+        Each hit carries its session and message_order (to open the session at
+        that point) and an HTML snippet with the matched terms in <mark>.
+        """
+        limit = max(1, min(limit or SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX_SIZE))
+        offset = max(0, offset or 0)
+        query = (query or "").strip()
+        if not query:
+            return {"results": [], "next_offset": None, "has_more": False}
+        try:
+            rows = await self._search_messages(user_id, query, limit + 1, offset)
+            has_more = len(rows) > limit
+            results = rows[:limit]
+            for row in results:
+                row['snippet'] = format_search_snippet(row.get('snippet'))
+            return {"results": results, "next_offset": offset + limit if has_more else None, "has_more": has_more}
+        except Exception as e:
+            logger.error(f"Error searching messages: {e}")
+            return {"results": [], "next_offset": None, "has_more": False}
+
+    async def _search_messages(self, user_id: str, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Ranked search hits (database_migration_message_search.sql)"""
+        client = db_manager.async_admin or db_manager.async_client
+        if not client:
+            logger.error("No database client available")
+            return []
+
+        result = await timed_execute(client.rpc('search_chat_messages', {
+            'p_user_id': user_id,
+            'p_query': query,
+            'p_limit': limit,
+            'p_offset': offset,
+        }))
+        return result.data or []
+
     async def delete_session_messages(self, session_id: str, user_id: str) -> bool:
         """Delete all messages in a session"""
         try:
-            db_manager.client.table('chat_messages').delete().eq('session_id', session_id).eq('user_id', user_id).execute()
+            await timed_execute(db_manager.async_client.table('chat_messages').delete().eq('session_id', session_id).eq('user_id', user_id))
+            recent_message_cache.invalidate(session_id)
             return True
         except Exception as e:
             logger.error(f"Error deleting session messages: {e}")
@@ -95,11 +210,179 @@ class MessageManager:
         """Update a specific message"""
         try:
             update_data['updated_at'] = 'NOW()'
-            result = db_manager.client.table('chat_messages').update(update_data).eq('id', message_id).eq('user_id', user_id).execute()
+            result = await timed_execute(db_manager.async_client.table('chat_messages').update(update_data).eq('id', message_id).eq('user_id', user_id))
+            if result.data and result.data[0].get('session_id'):
+                recent_message_cache.invalidate(result.data[0]['session_id'])
+            else:
+                recent_message_cache.invalidate_message(message_id)
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error updating message: {e}")
             return None
 
+# Computes the next message_order, inserts the message and bumps the session timestamp in one round trip
+_INSERT_MESSAGE_SQL = """
+WITH next_order AS (
+    SELECT COALESCE(MAX(message_order), 0) + 1 AS message_order
+    FROM chat_messages WHERE session_id = $1::uuid
+), inserted AS (
+    INSERT INTO chat_messages (session_id, user_id, role, content, metadata, message_order)
+    SELECT $1::uuid, $2::uuid, $3::varchar, $4::text, $5::jsonb, message_order FROM next_order
+    RETURNING *
+), touched AS (
+    UPDATE chat_sessions SET last_message_at = NOW(), updated_at = NOW() WHERE id = $1::uuid
+)
+SELECT * FROM inserted
+"""
+
+_RECENT_MESSAGES_SQL = """
+SELECT * FROM (
+    SELECT * FROM chat_messages
+    WHERE session_id = $1::uuid AND user_id = $2::uuid
+    ORDER BY message_order DESC LIMIT $3
+) recent ORDER BY message_order
+"""
+
+_SEARCH_MESSAGES_SQL = "SELECT * FROM search_chat_messages($1::uuid, $2, $3, $4)"
+
+# Concurrent inserts into one session can race for the same message_order
+_INSERT_MESSAGE_ATTEMPTS = 3
+
+class AsyncpgMessageManager(MessageManager):
+    """MessageManager serving the per-turn message queries over a direct asyncpg connection"""
+
+    insert_updates_session = True
+
+    async def _insert_message(self, session_id: str, user_id: str, role: str, content: str, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert a message at the next message_order and return the stored row"""
+        pool = await postgres_pool.get_pool()
+        for attempt in range(_INSERT_MESSAGE_ATTEMPTS):
+            try:
+                record = await timed_call('chat_messages', 'insert', pool.fetchrow(_INSERT_MESSAGE_SQL, session_id, user_id, role, content, metadata), detail=f"session_id={session_id}")
+                return record_to_dict(record)
+            except asyncpg.UniqueViolationError:
+                if attempt == _INSERT_MESSAGE_ATTEMPTS - 1:
+                    raise
+                logger.debug(f"message_order conflict in session {session_id}, retrying")
+
+    async def _fetch_recent_messages(self, session_id: str, user_id: str, count: int) -> List[Dict[str, Any]]:
+        """Read the newest `count` messages of a session, oldest first"""
+        pool = await postgres_pool.get_pool()
+        records = await timed_call('chat_messages', 'select', pool.fetch(_RECENT_MESSAGES_SQL, session_id, user_id, count), detail=f"session_id={session_id} limit={count}")
+        return [record_to_dict(record) for record in records]
+
+    async def _search_messages(self, user_id: str, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Ranked search hits (database_migration_message_search.sql)"""
+        pool = await postgres_pool.get_pool()
+        records = await timed_call('search_chat_messages', 'rpc', pool.fetch(_SEARCH_MESSAGES_SQL, user_id, query, limit, offset), detail=f"limit={limit} offset={offset}")
+        return [record_to_dict(record) for record in records]
+
+# bm25() is lower-is-better; rank is negated so every backend sorts hits by descending rank
+_SQLITE_SEARCH_SQL = """
+SELECT m.id, m.session_id, s.title AS session_title, m.role, m.message_order, m.created_at,
+       -bm25(chat_messages_fts) AS rank,
+       snippet(chat_messages_fts, 0, char(2), char(3), ' … ', 24) AS snippet
+FROM chat_messages_fts
+JOIN chat_messages m ON m.rowid = chat_messages_fts.rowid
+JOIN chat_sessions s ON s.id = m.session_id AND s.is_active = 1
+WHERE chat_messages_fts MATCH ? AND m.user_id = ?
+ORDER BY bm25(chat_messages_fts), m.created_at DESC, m.id
+LIMIT ? OFFSET ?
+"""
+
+def to_fts5_query(query: str) -> str:
+    """Quote each word of free text so FTS5 matches them all, ignoring its query syntax"""
+    return " ".join(f'"{term}"' for term in re.findall(r"\w+", query))
+
+class SqliteMessageManager(MessageManager):
+    """MessageManager backed by the embedded SQLite database"""
+
+    insert_updates_session = True
+
+    async def _insert_message(self, session_id: str, user_id: str, role: str, content: str, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert a message at the next message_order and return the stored row"""
+        message_id = str(uuid.uuid4())
+
+        def work(connection):
+            # The write transaction is serialized, so the next order cannot race
+            now = utc_now()
+            connection.execute(
+                """
+                INSERT INTO chat_messages (id, session_id, user_id, role, content, metadata, message_order, created_at, updated_at)
+                SELECT ?, ?, ?, ?, ?, ?, COALESCE(MAX(message_order), 0) + 1, ?, ?
+                FROM chat_messages WHERE session_id = ?
+                """,
+                [message_id, session_id, user_id, role, content, json.dumps(metadata), now, now, session_id]
+            )
+            connection.execute("UPDATE chat_sessions SET last_message_at = ?, updated_at = ? WHERE id = ?", [now, now, session_id])
+            return row_to_dict(connection.execute("SELECT * FROM chat_messages WHERE id = ?", [message_id]).fetchone())
+
+        return await sqlite_db.transaction(work, 'chat_messages', 'insert')
+
+    async def _fetch_message_page(self, session_id: str, user_id: str, limit: int, before: Optional[int], after: Optional[int]) -> List[Dict[str, Any]]:
+        """Read up to `limit` messages after `after` or before `before`, oldest first"""
+        if after is not None:
+            return await sqlite_db.fetch_all(
+                "SELECT * FROM chat_messages WHERE session_id = ? AND user_id = ? AND message_order > ? ORDER BY message_order LIMIT ?",
+                [session_id, user_id, after, limit], 'chat_messages'
+            )
+        rows = await sqlite_db.fetch_all(
+            "SELECT * FROM chat_messages WHERE session_id = ? AND user_id = ? AND message_order < ? ORDER BY message_order DESC LIMIT ?",
+            [session_id, user_id, before, limit], 'chat_messages'
+        )
+        rows.reverse()
+        return rows
+
+    async def _fetch_recent_messages(self, session_id: str, user_id: str, count: int) -> List[Dict[str, Any]]:
+        """Read the newest `count` messages of a session, oldest first"""
+        rows = await sqlite_db.fetch_all(
+            "SELECT * FROM chat_messages WHERE session_id = ? AND user_id = ? ORDER BY message_order DESC LIMIT ?",
+            [session_id, user_id, count], 'chat_messages'
+        )
+        rows.reverse()
+        return rows
+
+    async def _search_messages(self, user_id: str, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Ranked search hits from the FTS5 index"""
+        match = to_fts5_query(query)
+        if not match:
+            return []
+        return await sqlite_db.fetch_all(_SQLITE_SEARCH_SQL, [match, user_id, limit, offset], 'chat_messages_fts')
+
+    async def delete_session_messages(self, session_id: str, user_id: str) -> bool:
+        """Delete all messages in a session"""
+        try:
+            await sqlite_db.transaction(
+                lambda connection: connection.execute(
+                    "DELETE FROM chat_messages WHERE session_id = ? AND user_id = ?", [session_id, user_id]
+                ).rowcount,
+                'chat_messages', 'delete'
+            )
+            recent_message_cache.invalidate(session_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting session messages: {e}")
+            return False
+
+    async def update_message(self, message_id: str, user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a specific message"""
+        try:
+            rows = await sqlite_db.update('chat_messages', {**update_data, 'updated_at': utc_now()}, id=message_id, user_id=user_id)
+            if rows:
+                recent_message_cache.invalidate(rows[0]['session_id'])
+            else:
+                recent_message_cache.invalidate_message(message_id)
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error updating message: {e}")
+            return None
+
 # Global instance
-message_manager = MessageManager() 
\ No newline at end of file
+if sqlite_db.enabled:
+    message_manager = SqliteMessageManager()
+elif postgres_pool.enabled:
+    message_manager = AsyncpgMessageManager()
+else:
+    message_manager = MessageManager()
+
+ 
\ No newline at end of file
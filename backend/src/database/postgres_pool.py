@@ -0,0 +1,115 @@
+"""
+Direct PostgreSQL connection pool (asyncpg) for the hot chat queries
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any
+from uuid import UUID
+import asyncio
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    asyncpg = None
+    ASYNCPG_AVAILABLE = False
+
+# DATABASE_BACKEND: "postgrest" (Supabase HTTP API), "asyncpg" (direct connection for
+# session/message queries) or "sqlite" (embedded database for every manager, see sqlite_db.py)
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "postgrest").lower()
+POSTGRES_DSN = os.getenv("POSTGRES_DSN") or os.getenv("DATABASE_URL")
+POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", "2"))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10"))
+POSTGRES_COMMAND_TIMEOUT = float(os.getenv("POSTGRES_COMMAND_TIMEOUT", "10"))
+# Per-connection prepared statement cache; set to 0 behind a transaction-mode pooler (pgbouncer / Supabase port 6543)
+POSTGRES_STATEMENT_CACHE_SIZE = int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "100"))
+
+def record_to_dict(record) -> Optional[Dict[str, Any]]:
+    """Convert an asyncpg record to the JSON-shaped dict PostgREST would return"""
+    if record is None:
+        return None
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, UUID):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        row[key] = value
+    return row
+
+async def _init_connection(connection):
+    # Decode json/jsonb columns to Python objects, as PostgREST does
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+class PostgresPool:
+    """Lazily opened asyncpg pool; statements are prepared and cached per connection"""
+
+    def __init__(self, dsn: Optional[str] = POSTGRES_DSN):
+        self.dsn = dsn
+        self.enabled = DATABASE_BACKEND == "asyncpg" and ASYNCPG_AVAILABLE and bool(dsn)
+        self.pool = None
+        self._lock = None
+
+        if DATABASE_BACKEND == "asyncpg" and not self.enabled:
+            if not ASYNCPG_AVAILABLE:
+                logger.warning("DATABASE_BACKEND=asyncpg but asyncpg is not installed - using PostgREST")
+            else:
+                logger.warning("DATABASE_BACKEND=asyncpg but POSTGRES_DSN/DATABASE_URL is not set - using PostgREST")
+
+    async def open(self) -> bool:
+        """Create the pool if the asyncpg backend is enabled"""
+        if not self.enabled:
+            return False
+        if self.pool is not None:
+            return True
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.pool is None:
+                try:
+                    self.pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=POSTGRES_POOL_MIN_SIZE,
+                        max_size=POSTGRES_POOL_MAX_SIZE,
+                        command_timeout=POSTGRES_COMMAND_TIMEOUT,
+                        statement_cache_size=POSTGRES_STATEMENT_CACHE_SIZE,
+                        init=_init_connection,
+                    )
+                    logger.info("asyncpg pool opened")
+                except Exception as e:
+                    logger.error(f"Failed to open asyncpg pool: {e}")
+                    return False
+        return True
+
+    async def get_pool(self):
+        """Return the open pool, opening it on first use"""
+        if self.pool is None and not await self.open():
+            raise RuntimeError("asyncpg pool is not available")
+        return self.pool
+
+    async def close(self):
+        """Close the pool"""
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await pool.close()
+            logger.info("asyncpg pool closed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Backend name and pool occupancy"""
+        stats = {"backend": "asyncpg" if self.enabled else "postgrest"}
+        if self.pool is not None:
+            stats.update({
+                "pool_size": self.pool.get_size(),
+                "pool_idle": self.pool.get_idle_size(),
+                "pool_max": self.pool.get_max_size(),
+            })
+        return stats
+
+# Global instance
+postgres_pool = PostgresPool()
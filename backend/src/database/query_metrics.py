@@ -0,0 +1,189 @@
+"""
+Database query instrumentation: latency histograms, slow-query log and per-request DB time
+"""
+
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List
+import bisect
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Queries slower than this are logged with their filter columns and operators
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is unbounded)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+_HTTP_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+# PostgREST parameters whose values are column lists or paging, never user data
+_SHAPE_PARAMS = {"select", "order", "limit", "offset", "columns", "on_conflict"}
+_FILTER_OPERATORS = {
+    "eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "match", "imatch", "in", "is", "isdistinct",
+    "fts", "plfts", "phfts", "wfts", "cs", "cd", "ov", "sl", "sr", "nxr", "nxl", "adj",
+}
+
+# [db_ms, queries] for the request being served; a mutable list so time spent in
+# tasks spawned from the request (which copy the context) is still added to it
+_request_db_time: ContextVar[Optional[List[float]]] = ContextVar("request_db_time", default=None)
+
+class _QueryStats:
+    """Counters and latency histogram for one (table, operation)"""
+
+    __slots__ = ("count", "errors", "rows", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return None
+        target = self.count * fraction
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+class QueryMetrics:
+    """Process-wide query latency histograms keyed by table and operation"""
+
+    def __init__(self, slow_query_ms: float = DB_SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._stats: Dict[tuple, _QueryStats] = {}
+        self._lock = threading.Lock()
+        self.slow_queries = 0
+
+    def observe(self, table: str, operation: str, elapsed_ms: float, rows: int = 0,
+                error: Optional[BaseException] = None, detail: Any = None):
+        """Record one query"""
+        with self._lock:
+            stats = self._stats.get((table, operation))
+            if stats is None:
+                stats = self._stats[(table, operation)] = _QueryStats()
+            stats.count += 1
+            stats.rows += rows
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            if error is not None:
+                stats.errors += 1
+            slow = elapsed_ms >= self.slow_query_ms
+            if slow:
+                self.slow_queries += 1
+
+        request_db_time = _request_db_time.get()
+        if request_db_time is not None:
+            request_db_time[0] += elapsed_ms
+            request_db_time[1] += 1
+
+        if error is not None:
+            # Error messages can echo row values (e.g. unique violations), so only the code is logged
+            code = getattr(error, "code", None)
+            logger.warning(f"Query failed after {elapsed_ms:.1f}ms: {operation} {table} {detail} - {type(error).__name__}" + (f" ({code})" if code else ""))
+        elif slow:
+            logger.warning(f"Slow query {elapsed_ms:.1f}ms: {operation} {table} rows={rows} {detail}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-query counters with approximate p50/p95/p99 from the histograms"""
+        with self._lock:
+            queries = {}
+            for (table, operation), stats in sorted(self._stats.items()):
+                queries[f"{operation} {table}"] = {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "mean_ms": round(stats.total_ms / stats.count, 2) if stats.count else 0.0,
+                    "p50_ms": stats.percentile(0.5),
+                    "p95_ms": stats.percentile(0.95),
+                    "p99_ms": stats.percentile(0.99),
+                    "max_ms": round(stats.max_ms, 2),
+                    "histogram": dict(zip([f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["inf"], stats.buckets)),
+                }
+            return {
+                "slow_query_ms": self.slow_query_ms,
+                "slow_queries": self.slow_queries,
+                "queries": queries,
+            }
+
+    def start_request(self):
+        """Begin accumulating DB time for the current request; returns a reset token"""
+        return _request_db_time.set([0.0, 0])
+
+    def end_request(self, token) -> Dict[str, Any]:
+        """Stop accumulating and return {"db_ms", "queries"} for the request"""
+        db_ms, queries = _request_db_time.get() or (0.0, 0)
+        _request_db_time.reset(token)
+        return {"db_ms": db_ms, "queries": int(queries)}
+
+def _filter_shape(params) -> str:
+    """PostgREST query params with filter values masked, e.g. 'select=* email=eq.?'"""
+    parts = []
+    for key, value in getattr(params, "multi_items", lambda: [])():
+        if key in _SHAPE_PARAMS:
+            parts.append(f"{key}={value}")
+        elif key in ("or", "and", "not.or", "not.and"):
+            parts.append(f"{key}=(?)")
+        else:
+            # "eq.value" / "not.in.(a,b)" -> keep the operators only
+            # "[not.]operator[(modifier)].value" -> keep the operator only
+            tokens = value.split(".", 2)
+            operators = tokens[:1] if tokens[0] == "not" else []
+            operator = tokens[len(operators)].split("(", 1)[0] if len(tokens) > len(operators) else ""
+            if operator in _FILTER_OPERATORS:
+                operators.append(operator)
+            parts.append(f"{key}={'.'.join(operators + ['?'])}")
+    return " ".join(parts)[:500]
+
+def _describe_request(query) -> tuple:
+    """(table, operation, filter shape) of a PostgREST request builder"""
+    path = getattr(query, "path", "")
+    table = path.rsplit("/", 1)[-1] or "unknown"
+    method = getattr(query, "http_method", "")
+    operation = _HTTP_OPERATIONS.get(method, method.lower() or "unknown")
+    if method == "POST":
+        if "/rpc/" in path:
+            operation = "rpc"
+        elif "merge-duplicates" in (getattr(query, "headers", None) or {}).get("Prefer", ""):
+            operation = "upsert"
+    return table, operation, _filter_shape(getattr(query, "params", None))
+
+async def timed_execute(query):
+    """Execute a PostgREST query and record its latency, row count and outcome"""
+    table, operation, filters = _describe_request(query)
+    started = time.perf_counter()
+    try:
+        result = await query.execute()
+    except Exception as e:
+        query_metrics.observe(table, operation, (time.perf_counter() - started) * 1000, error=e, detail=filters)
+        raise
+    data = getattr(result, "data", None)
+    rows = len(data) if isinstance(data, list) else int(bool(data))
+    query_metrics.observe(table, operation, (time.perf_counter() - started) * 1000, rows=rows, detail=filters)
+    return result
+
+async def timed_call(table: str, operation: str, awaitable, detail: Any = None):
+    """Await a direct driver call (e.g. an asyncpg fetch) and record it like timed_execute"""
+    started = time.perf_counter()
+    try:
+        result = await awaitable
+    except Exception as e:
+        query_metrics.observe(table, operation, (time.perf_counter() - started) * 1000, error=e, detail=detail)
+        raise
+    rows = len(result) if isinstance(result, list) else int(result is not None)
+    query_metrics.observe(table, operation, (time.perf_counter() - started) * 1000, rows=rows, detail=detail)
+    return result
+
+# Global instance
+query_metrics = QueryMetrics()
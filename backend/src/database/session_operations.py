@@ -2,12 +2,43 @@
 Chat session database operations
 """
 
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+from typing import List, Optional, Dict, Any, Tuple
 from .supabase_client import db_manager
+from .query_metrics import timed_execute, timed_call
+from .message_cache import recent_message_cache
+from .postgres_pool import postgres_pool, record_to_dict
+from .sqlite_db import sqlite_db, utc_now, to_timestamp
+import base64
+import json
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Cursor pagination of the session list
+SESSION_PAGE_SIZE = int(os.getenv("SESSION_PAGE_SIZE", "30"))
+SESSION_PAGE_MAX_SIZE = int(os.getenv("SESSION_PAGE_MAX_SIZE", "100"))
+# synced_at is moved back by this much so rows committed by in-flight transactions are not missed
+SESSION_SYNC_OVERLAP_SECONDS = float(os.getenv("SESSION_SYNC_OVERLAP_SECONDS", "5"))
+
+def encode_session_cursor(session: Dict[str, Any]) -> str:
+    """Opaque cursor for the position after a session in last_message_at order"""
+    raw = json.dumps([session['last_message_at'], session['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_session_cursor(cursor: str) -> Tuple[str, str]:
+    """Return (last_message_at, id) from a cursor; raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_message_at, session_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        # Validate both parts before they are embedded in a filter
+        datetime.fromisoformat(last_message_at)
+        return last_message_at, str(UUID(session_id))
+    except Exception:
+        raise ValueError("Invalid session cursor")
+
 class SessionManager:
     """Manage chat session database operations"""
 
@@ -22,12 +53,12 @@ class SessionManager:
             }
             
             # Use admin client if available, otherwise use regular client with user filtering
-            client = db_manager.admin if db_manager.admin else db_manager.client
+            client = db_manager.async_admin or db_manager.async_client
             if not client:
                 logger.error("No database client available")
                 return None
                 
-            result = client.table('chat_sessions').insert(session_data).execute()
+            result = await timed_execute(client.table('chat_sessions').insert(session_data))
             if result.data:
                 logger.info(f"Created session {result.data[0]['id']} for user {user_id}")
                 return result.data[0]
@@ -39,27 +70,72 @@ class SessionManager:
     async def get_user_sessions(self, user_id: str, active_only: bool = True) -> List[Dict[str, Any]]:
         """Get all sessions for a user"""
         try:
-            query = db_manager.client.from_('session_stats').select("*").eq('user_id', user_id)
+            query = db_manager.async_client.from_('session_stats').select("*").eq('user_id', user_id)
             if active_only:
                 query = query.eq('is_active', True)
             query = query.order('last_message_at', desc=True)
 
-            result = query.execute()
+            result = await timed_execute(query)
             return result.data if result.data else []
         except Exception as e:
             logger.error(f"Error fetching user sessions: {e}")
             return []
 
+    async def get_user_sessions_page(self, user_id: str, active_only: bool = True, limit: int = SESSION_PAGE_SIZE, cursor: Optional[str] = None, updated_since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get a page of a user's sessions ordered by last_message_at (newest first)
+
+        With updated_since only sessions changed after that time are returned,
+        including deactivated ones so clients can drop deleted sessions.
+        synced_at is the value to pass as updated_since on the next poll.
+        """
+        limit = max(1, min(limit or SESSION_PAGE_SIZE, SESSION_PAGE_MAX_SIZE))
+        position = decode_session_cursor(cursor) if cursor else None
+        synced_at = datetime.now(timezone.utc) - timedelta(seconds=SESSION_SYNC_OVERLAP_SECONDS)
+        try:
+            rows = await self._fetch_sessions_page(user_id, active_only, limit + 1, position, updated_since)
+            has_more = len(rows) > limit
+            sessions = rows[:limit]
+            return {
+                "sessions": sessions,
+                "next_cursor": encode_session_cursor(sessions[-1]) if has_more else None,
+                "has_more": has_more,
+                "synced_at": synced_at.isoformat(),
+            }
+        except Exception as e:
+            logger.error(f"Error fetching user sessions page: {e}")
+            return {"sessions": [], "next_cursor": None, "has_more": False, "synced_at": None}
+
+    async def _fetch_sessions_page(self, user_id: str, active_only: bool, limit: int, position: Optional[Tuple[str, str]], updated_since: Optional[datetime]) -> List[Dict[str, Any]]:
+        """Read up to `limit` sessions after the keyset position, newest first"""
+        query = db_manager.async_client.from_('session_stats').select("*").eq('user_id', user_id)
+        if updated_since is not None:
+            if updated_since.tzinfo is None:
+                updated_since = updated_since.replace(tzinfo=timezone.utc)
+            query = query.gt('updated_at', updated_since.isoformat())
+        elif active_only:
+            query = query.eq('is_active', True)
+        if position:
+            last_message_at, session_id = position
+            # Keyset on (last_message_at, id): strictly after the cursor row
+            query = query.or_(
+                f'last_message_at.lt."{last_message_at}",'
+                f'and(last_message_at.eq."{last_message_at}",id.lt.{session_id})'
+            )
+        query = query.order('last_message_at', desc=True).order('id', desc=True).limit(limit)
+
+        result = await timed_execute(query)
+        return result.data or []
+
     async def get_session(self, session_id: str, user_id: str, jwt_token: str = None) -> Optional[Dict[str, Any]]:
         """Get a specific session"""
         try:
             # Use admin client if available, otherwise use regular client with user filtering
-            client = db_manager.admin if db_manager.admin else db_manager.client
+            client = db_manager.async_admin or db_manager.async_client
             if not client:
                 logger.error("No database client available")
                 return None
                 
-            result = client.table('chat_sessions').select("*").eq('id', session_id).eq('user_id', user_id).execute()
+            result = await timed_execute(client.table('chat_sessions').select("*").eq('id', session_id).eq('user_id', user_id))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error fetching session: {e}")
@@ -69,12 +145,12 @@ class SessionManager:
         """Get a specific session with message stats from session_stats view"""
         try:
             # Use admin client if available, otherwise use regular client with user filtering
-            client = db_manager.admin if db_manager.admin else db_manager.client
+            client = db_manager.async_admin or db_manager.async_client
             if not client:
                 logger.error("No database client available")
                 return None
                 
-            result = client.from_('session_stats').select("*").eq('id', session_id).eq('user_id', user_id).execute()
+            result = await timed_execute(client.from_('session_stats').select("*").eq('id', session_id).eq('user_id', user_id))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error fetching session with stats: {e}")
@@ -84,7 +160,7 @@ class SessionManager:
         """Update session information"""
         try:
             update_data['updated_at'] = 'NOW()'
-            result = db_manager.client.table('chat_sessions').update(update_data).eq('id', session_id).eq('user_id', user_id).execute()
+            result = await timed_execute(db_manager.async_client.table('chat_sessions').update(update_data).eq('id', session_id).eq('user_id', user_id))
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Error updating session: {e}")
@@ -93,26 +169,195 @@ class SessionManager:
     async def delete_session(self, session_id: str, user_id: str) -> bool:
         """Delete a session (soft delete by setting inactive)"""
         try:
-            result = db_manager.client.table('chat_sessions').update({
+            result = await timed_execute(db_manager.async_client.table('chat_sessions').update({
                 'is_active': False,
                 'updated_at': 'NOW()'
-            }).eq('id', session_id).eq('user_id', user_id).execute()
+            }).eq('id', session_id).eq('user_id', user_id))
+            if result.data:
+                self._forget_session(session_id, user_id)
             return bool(result.data)
         except Exception as e:
             logger.error(f"Error deleting session: {e}")
             return False
 
+    def _forget_session(self, session_id: str, user_id: str):
+        """Drop in-process state of a deleted session"""
+        recent_message_cache.invalidate(session_id)
+        # Checkpoints of deleted sessions are dropped by the next compaction run
+        from ..services.memory_service import memory_service
+        memory_service.forget_session(session_id, user_id)
+
     async def update_session_last_message(self, session_id: str) -> bool:
         """Update session's last_message_at timestamp"""
         try:
-            db_manager.client.table('chat_sessions').update({
+            await timed_execute(db_manager.async_client.table('chat_sessions').update({
                 'last_message_at': 'NOW()',
                 'updated_at': 'NOW()'
-            }).eq('id', session_id).execute()
+            }).eq('id', session_id))
             return True
         except Exception as e:
             logger.error(f"Error updating session timestamp: {e}")
             return False
 
+    async def update_sessions_last_message(self, session_ids: List[str]) -> bool:
+        """Update last_message_at for many sessions in one UPDATE"""
+        try:
+            await timed_execute(db_manager.async_client.table('chat_sessions').update({
+                'last_message_at': 'NOW()',
+                'updated_at': 'NOW()'
+            }).in_('id', session_ids))
+            return True
+        except Exception as e:
+            logger.error(f"Error updating session timestamps: {e}")
+            return False
+
+_GET_SESSION_SQL = "SELECT * FROM chat_sessions WHERE id = $1::uuid AND user_id = $2::uuid"
+_TOUCH_SESSION_SQL = "UPDATE chat_sessions SET last_message_at = NOW(), updated_at = NOW() WHERE id = $1::uuid"
+_TOUCH_SESSIONS_SQL = "UPDATE chat_sessions SET last_message_at = NOW(), updated_at = NOW() WHERE id = ANY($1::uuid[])"
+
+class AsyncpgSessionManager(SessionManager):
+    """SessionManager serving the per-turn session queries over a direct asyncpg connection"""
+
+    async def get_session(self, session_id: str, user_id: str, jwt_token: str = None) -> Optional[Dict[str, Any]]:
+        """Get a specific session"""
+        try:
+            pool = await postgres_pool.get_pool()
+            record = await timed_call('chat_sessions', 'select', pool.fetchrow(_GET_SESSION_SQL, session_id, user_id), detail=f"id={session_id}")
+            return record_to_dict(record)
+        except Exception as e:
+            logger.error(f"Error fetching session: {e}")
+            return None
+
+    async def update_session_last_message(self, session_id: str) -> bool:
+        """Update session's last_message_at timestamp"""
+        try:
+            pool = await postgres_pool.get_pool()
+            await timed_call('chat_sessions', 'update', pool.execute(_TOUCH_SESSION_SQL, session_id), detail=f"id={session_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating session timestamp: {e}")
+            return False
+
+    async def update_sessions_last_message(self, session_ids: List[str]) -> bool:
+        """Update last_message_at for many sessions in one UPDATE"""
+        try:
+            pool = await postgres_pool.get_pool()
+            await timed_call('chat_sessions', 'update', pool.execute(_TOUCH_SESSIONS_SQL, session_ids), detail=f"sessions={len(session_ids)}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating session timestamps: {e}")
+            return False
+
+class SqliteSessionManager(SessionManager):
+    """SessionManager backed by the embedded SQLite database"""
+
+    async def create_session(self, user_id: str, title: str = "New Chat", description: str = None, jwt_token: str = None) -> Optional[Dict[str, Any]]:
+        """Create a new chat session for user"""
+        try:
+            session = await sqlite_db.insert('chat_sessions', {
+                "user_id": user_id,
+                "title": title,
+                "description": description,
+                "is_active": True
+            })
+            logger.info(f"Created session {session['id']} for user {user_id}")
+            return session
+        except Exception as e:
+            logger.error(f"Error creating session: {e}")
+            return None
+
+    async def get_user_sessions(self, user_id: str, active_only: bool = True) -> List[Dict[str, Any]]:
+        """Get all sessions for a user"""
+        try:
+            sql = "SELECT * FROM session_stats WHERE user_id = ?"
+            if active_only:
+                sql += " AND is_active = 1"
+            return await sqlite_db.fetch_all(sql + " ORDER BY last_message_at DESC", [user_id], 'session_stats')
+        except Exception as e:
+            logger.error(f"Error fetching user sessions: {e}")
+            return []
+
+    async def _fetch_sessions_page(self, user_id: str, active_only: bool, limit: int, position: Optional[Tuple[str, str]], updated_since: Optional[datetime]) -> List[Dict[str, Any]]:
+        """Read up to `limit` sessions after the keyset position, newest first"""
+        sql = "SELECT * FROM session_stats WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        if updated_since is not None:
+            sql += " AND updated_at > ?"
+            params.append(to_timestamp(updated_since))
+        elif active_only:
+            sql += " AND is_active = 1"
+        if position:
+            last_message_at, session_id = position
+            sql += " AND (last_message_at < ? OR (last_message_at = ? AND id < ?))"
+            params.extend([last_message_at, last_message_at, session_id])
+        sql += " ORDER BY last_message_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return await sqlite_db.fetch_all(sql, params, 'session_stats')
+
+    async def get_session(self, session_id: str, user_id: str, jwt_token: str = None) -> Optional[Dict[str, Any]]:
+        """Get a specific session"""
+        try:
+            rows = await sqlite_db.select('chat_sessions', id=session_id, user_id=user_id)
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error fetching session: {e}")
+            return None
+
+    async def get_session_with_stats(self, session_id: str, user_id: str, jwt_token: str = None) -> Optional[Dict[str, Any]]:
+        """Get a specific session with message stats from session_stats view"""
+        try:
+            rows = await sqlite_db.select('session_stats', id=session_id, user_id=user_id)
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error fetching session with stats: {e}")
+            return None
+
+    async def update_session(self, session_id: str, user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update session information"""
+        try:
+            rows = await sqlite_db.update('chat_sessions', {**update_data, 'updated_at': utc_now()}, id=session_id, user_id=user_id)
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error updating session: {e}")
+            return None
+
+    async def delete_session(self, session_id: str, user_id: str) -> bool:
+        """Delete a session (soft delete by setting inactive)"""
+        try:
+            rows = await sqlite_db.update('chat_sessions', {'is_active': False, 'updated_at': utc_now()}, id=session_id, user_id=user_id)
+            if rows:
+                self._forget_session(session_id, user_id)
+            return bool(rows)
+        except Exception as e:
+            logger.error(f"Error deleting session: {e}")
+            return False
+
+    async def update_session_last_message(self, session_id: str) -> bool:
+        """Update session's last_message_at timestamp"""
+        return await self.update_sessions_last_message([session_id])
+
+    async def update_sessions_last_message(self, session_ids: List[str]) -> bool:
+        """Update last_message_at for many sessions in one UPDATE"""
+        try:
+            now = utc_now()
+            placeholders = ", ".join("?" for _ in session_ids)
+            await sqlite_db.transaction(
+                lambda connection: connection.execute(
+                    f"UPDATE chat_sessions SET last_message_at = ?, updated_at = ? WHERE id IN ({placeholders})",
+                    [now, now, *session_ids]
+                ).rowcount,
+                'chat_sessions', 'update'
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error updating session timestamps: {e}")
+            return False
+
 # Global instance
-session_manager = SessionManager() 
\ No newline at end of file
+if sqlite_db.enabled:
+    session_manager = SqliteSessionManager()
+elif postgres_pool.enabled:
+    session_manager = AsyncpgSessionManager()
+else:
+    session_manager = SessionManager()
+ 
\ No newline at end of file
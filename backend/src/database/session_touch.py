@@ -0,0 +1,123 @@
+"""
+Coalesced chat_sessions.last_message_at updates
+"""
+
+from typing import Dict, Any, List
+import asyncio
+import os
+import time
+import logging
+
+from .session_operations import session_manager
+
+logger = logging.getLogger(__name__)
+
+# SESSION_TOUCH_MODE:
+#   debounce  - coalesce per session and flush in bulk UPDATEs (default)
+#   immediate - one UPDATE per message
+#   trigger   - the database does it (database_migration_session_touch_trigger.sql)
+SESSION_TOUCH_MODE = os.getenv("SESSION_TOUCH_MODE", "debounce").lower()
+# A session is flushed once it has been quiet this long...
+SESSION_TOUCH_DEBOUNCE_SECONDS = float(os.getenv("SESSION_TOUCH_DEBOUNCE_SECONDS", "0.5"))
+# ...or once its oldest pending touch is this old, even if messages keep arriving
+SESSION_TOUCH_MAX_DELAY_SECONDS = float(os.getenv("SESSION_TOUCH_MAX_DELAY_SECONDS", "2"))
+# Upper bound on ids per UPDATE (keeps the PostgREST query string short)
+SESSION_TOUCH_BATCH_SIZE = int(os.getenv("SESSION_TOUCH_BATCH_SIZE", "200"))
+
+class SessionTouchBuffer:
+    """Debounces last_message_at updates per session and flushes them in bulk"""
+
+    def __init__(self,
+                 mode: str = SESSION_TOUCH_MODE,
+                 debounce_seconds: float = SESSION_TOUCH_DEBOUNCE_SECONDS,
+                 max_delay_seconds: float = SESSION_TOUCH_MAX_DELAY_SECONDS,
+                 batch_size: int = SESSION_TOUCH_BATCH_SIZE):
+        self.mode = mode
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max(max_delay_seconds, debounce_seconds)
+        self.batch_size = max(1, batch_size)
+        # session_id -> [first_touch, last_touch] (monotonic)
+        self._pending: Dict[str, List[float]] = {}
+        self._task = None
+        self._loop = None
+        self.touches = 0
+        self.updates = 0
+        self.flushed_sessions = 0
+
+    async def touch(self, session_id: str):
+        """Record that a session received a message"""
+        if self.mode == "trigger":
+            return
+        self.touches += 1
+        loop = asyncio.get_running_loop()
+        if self.mode != "debounce" or (self._loop is not None and self._loop is not loop):
+            # Callers on another event loop (tools run their own) update directly
+            self.updates += 1
+            await session_manager.update_session_last_message(session_id)
+            return
+
+        now = time.monotonic()
+        entry = self._pending.get(session_id)
+        if entry is None:
+            self._pending[session_id] = [now, now]
+        else:
+            entry[1] = now
+
+        if self._task is None or self._task.done():
+            self._loop = loop
+            self._task = loop.create_task(self._flush_loop())
+
+    async def flush(self, force: bool = False) -> int:
+        """Write due (or, with force, all) pending touches; returns the number of sessions flushed"""
+        now = time.monotonic()
+        due = [
+            session_id for session_id, (first, last) in self._pending.items()
+            if force
+            or now - last >= self.debounce_seconds
+            or now - first >= self.max_delay_seconds
+        ]
+        for session_id in due:
+            del self._pending[session_id]
+
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            self.updates += 1
+            if not await session_manager.update_sessions_last_message(batch):
+                logger.warning(f"Dropped last_message_at update for {len(batch)} sessions")
+        self.flushed_sessions += len(due)
+        return len(due)
+
+    async def close(self):
+        """Stop the flusher and write everything still pending"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._pending:
+            await self.flush(force=True)
+        self._loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Coalescing counters"""
+        return {
+            "mode": self.mode,
+            "pending": len(self._pending),
+            "touches": self.touches,
+            "updates": self.updates,
+            "flushed_sessions": self.flushed_sessions,
+        }
+
+    async def _flush_loop(self):
+        tick = max(self.debounce_seconds / 2, 0.05)
+        while self._pending:
+            await asyncio.sleep(tick)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Session touch flush failed: {e}")
+
+# Global instance
+session_touch_buffer = SessionTouchBuffer()
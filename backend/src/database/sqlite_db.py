@@ -0,0 +1,359 @@
+"""
+Embedded SQLite (WAL) database for single-node deployments and offline load tests
+"""
+
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Callable, Iterable
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+import logging
+
+from .postgres_pool import DATABASE_BACKEND
+from .query_metrics import timed_call
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PATH = os.getenv(
+    "SQLITE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'assistant.db')
+)
+SQLITE_BUSY_TIMEOUT_SECONDS = float(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", "5"))
+
+# ISO-8601 UTC with microseconds, the same shape PostgREST returns, so string order is time order
+_NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')"
+
+# Mirrors src/migrations (database_schema.sql, chat_sessions_and_messages.sql and the
+# session counter migrations) with UUIDs and timestamps stored as TEXT
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    first_name TEXT,
+    last_name TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT DEFAULT ({_NOW_SQL}),
+    updated_at TEXT DEFAULT ({_NOW_SQL}),
+    last_login TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_active ON users(is_active);
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at);
+
+CREATE TABLE IF NOT EXISTS user_calendar_integrations (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    provider TEXT NOT NULL DEFAULT 'google',
+    calendar_id TEXT,
+    calendar_name TEXT,
+    access_token TEXT NOT NULL,
+    refresh_token TEXT,
+    token_expires_at TEXT,
+    scope TEXT,
+    is_active INTEGER DEFAULT 1,
+    connected_at TEXT DEFAULT ({_NOW_SQL}),
+    updated_at TEXT DEFAULT ({_NOW_SQL}),
+    UNIQUE(user_id, provider)
+);
+CREATE INDEX IF NOT EXISTS idx_calendar_user_id ON user_calendar_integrations(user_id);
+
+CREATE TABLE IF NOT EXISTS calendar_events_log (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    integration_id TEXT NOT NULL REFERENCES user_calendar_integrations(id),
+    event_id TEXT NOT NULL,
+    event_title TEXT,
+    event_description TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    created_via_prompt TEXT,
+    created_at TEXT DEFAULT ({_NOW_SQL})
+);
+CREATE INDEX IF NOT EXISTS idx_events_user_id ON calendar_events_log(user_id);
+CREATE INDEX IF NOT EXISTS idx_events_integration ON calendar_events_log(integration_id);
+
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title TEXT NOT NULL DEFAULT 'New Chat',
+    description TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT DEFAULT ({_NOW_SQL}),
+    updated_at TEXT DEFAULT ({_NOW_SQL}),
+    last_message_at TEXT DEFAULT ({_NOW_SQL}),
+    message_count INTEGER NOT NULL DEFAULT 0,
+    last_message_preview TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_last_message ON chat_sessions(user_id, last_message_at DESC);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_updated_at ON chat_sessions(user_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES chat_sessions(id) ON DELETE CASCADE,
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    role TEXT NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
+    content TEXT NOT NULL,
+    metadata TEXT DEFAULT '{{}}',
+    message_order INTEGER NOT NULL,
+    created_at TEXT DEFAULT ({_NOW_SQL}),
+    updated_at TEXT DEFAULT ({_NOW_SQL})
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_session_order ON chat_messages(session_id, message_order);
+CREATE INDEX IF NOT EXISTS idx_messages_user_id ON chat_messages(user_id);
+
+-- Counter triggers are recreated on startup so existing database files pick up changes
+DROP TRIGGER IF EXISTS chat_messages_count_insert;
+CREATE TRIGGER chat_messages_count_insert AFTER INSERT ON chat_messages BEGIN
+    UPDATE chat_sessions
+    SET message_count = message_count + 1,
+        last_message_preview = NEW.content
+    WHERE id = NEW.session_id;
+END;
+
+DROP TRIGGER IF EXISTS chat_messages_count_delete;
+CREATE TRIGGER chat_messages_count_delete AFTER DELETE ON chat_messages BEGIN
+    UPDATE chat_sessions
+    SET message_count = max(message_count - 1, 0),
+        last_message_preview = (
+            SELECT content FROM chat_messages
+            WHERE session_id = OLD.session_id
+            ORDER BY message_order DESC LIMIT 1
+        ),
+        updated_at = {_NOW_SQL}
+    WHERE id = OLD.session_id;
+END;
+
+DROP TRIGGER IF EXISTS chat_messages_preview_update;
+CREATE TRIGGER chat_messages_preview_update AFTER UPDATE OF content ON chat_messages
+WHEN OLD.content IS NOT NEW.content BEGIN
+    UPDATE chat_sessions
+    SET last_message_preview = NEW.content,
+        updated_at = {_NOW_SQL}
+    WHERE id = NEW.session_id
+      AND NOT EXISTS (
+          SELECT 1 FROM chat_messages
+          WHERE session_id = NEW.session_id AND message_order > NEW.message_order
+      );
+END;
+
+-- Full-text index over message content (database_migration_message_search.sql).
+-- External content keyed by chat_messages.rowid, which only changes on VACUUM;
+-- run INSERT INTO chat_messages_fts(chat_messages_fts) VALUES ('rebuild') after one.
+CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+    content, content='chat_messages', content_rowid='rowid', tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS chat_messages_fts_insert AFTER INSERT ON chat_messages BEGIN
+    INSERT INTO chat_messages_fts (rowid, content) VALUES (NEW.rowid, NEW.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS chat_messages_fts_delete AFTER DELETE ON chat_messages BEGIN
+    INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content) VALUES ('delete', OLD.rowid, OLD.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS chat_messages_fts_update AFTER UPDATE OF content ON chat_messages BEGIN
+    INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content) VALUES ('delete', OLD.rowid, OLD.content);
+    INSERT INTO chat_messages_fts (rowid, content) VALUES (NEW.rowid, NEW.content);
+END;
+
+CREATE VIEW IF NOT EXISTS session_stats AS
+SELECT
+    id, user_id, title, description, is_active, created_at, updated_at, last_message_at,
+    message_count,
+    COALESCE(last_message_preview, 'No messages yet') AS last_message_preview
+FROM chat_sessions;
+"""
+
+# Columns decoded on read so rows match the PostgREST JSON shapes
+_BOOLEAN_COLUMNS = {"is_active"}
+_JSON_COLUMNS = {"metadata"}
+
+def utc_now() -> str:
+    """Current time in the stored timestamp format"""
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+def to_timestamp(value: datetime) -> str:
+    """Format a datetime for comparison with stored timestamps (naive means UTC)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+def row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a sqlite3 row to the JSON-shaped dict PostgREST would return"""
+    result = dict(row)
+    for key, value in result.items():
+        if key in _BOOLEAN_COLUMNS and value is not None:
+            result[key] = bool(value)
+        elif key in _JSON_COLUMNS and isinstance(value, str):
+            result[key] = json.loads(value)
+    return result
+
+def _to_param(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+class SqliteDatabase:
+    """SQLite database in WAL mode: concurrent readers, one serialized writer
+
+    Queries run in worker threads via asyncio.to_thread; each thread keeps
+    its own connection.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self.enabled = DATABASE_BACKEND == "sqlite"
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._schema_ready = False
+        self._columns: Dict[str, set] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+
+        if self.path in ("", ":memory:"):
+            # Every thread has its own connection, and each of these would be a separate empty database
+            raise ValueError("SQLITE_PATH must be a file path; in-memory and temporary databases are not supported (use a tmpfs path instead)")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Autocommit mode; writes open explicit BEGIN IMMEDIATE transactions
+        connection = sqlite3.connect(
+            self.path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        self._local.connection = connection
+        with self._connections_lock:
+            self._connections.append(connection)
+
+        if not self._schema_ready:
+            with self._write_lock:
+                if not self._schema_ready:
+                    has_search_index = connection.execute(
+                        "SELECT 1 FROM sqlite_master WHERE name = 'chat_messages_fts'"
+                    ).fetchone() is not None
+                    connection.executescript(SCHEMA_SQL)
+                    if not has_search_index:
+                        # Index messages stored before the search index existed
+                        connection.execute("INSERT INTO chat_messages_fts (chat_messages_fts) VALUES ('rebuild')")
+                    for table in ("users", "user_calendar_integrations", "calendar_events_log", "chat_sessions", "chat_messages"):
+                        self._columns[table] = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}
+                    self._schema_ready = True
+                    logger.info(f"SQLite database ready at {self.path}")
+        return connection
+
+    def _read(self, sql: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+        connection = self._connect()
+        return [row_to_dict(row) for row in connection.execute(sql, [_to_param(p) for p in params])]
+
+    def _write(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        connection = self._connect()
+        with self._write_lock:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(connection)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            return result
+
+    async def open(self) -> bool:
+        """Create the database file and schema if the SQLite backend is enabled"""
+        if not self.enabled:
+            return False
+        try:
+            await asyncio.to_thread(self._connect)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to open SQLite database {self.path}: {e}")
+            return False
+
+    def close(self):
+        """Close every thread's connection"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+    async def fetch_all(self, sql: str, params: Iterable[Any] = (), table: str = "sql", operation: str = "select") -> List[Dict[str, Any]]:
+        """Run a read query and return all rows"""
+        return await timed_call(table, operation, asyncio.to_thread(self._read, sql, list(params)), detail=sql[:200])
+
+    async def fetch_one(self, sql: str, params: Iterable[Any] = (), table: str = "sql", operation: str = "select") -> Optional[Dict[str, Any]]:
+        """Run a read query and return the first row"""
+        rows = await self.fetch_all(sql, params, table, operation)
+        return rows[0] if rows else None
+
+    async def transaction(self, work: Callable[[sqlite3.Connection], Any], table: str = "sql", operation: str = "write") -> Any:
+        """Run work(connection) inside a write transaction in a worker thread"""
+        return await timed_call(table, operation, asyncio.to_thread(self._write, work))
+
+    def _check_columns(self, table: str, columns: Iterable[str]):
+        self._connect()
+        unknown = set(columns) - self._columns[table]
+        if unknown:
+            raise ValueError(f"Unknown columns for {table}: {sorted(unknown)}")
+
+    async def insert(self, table: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a row (generating its id) and return it as stored"""
+        row = {"id": str(uuid.uuid4()), **data}
+        await asyncio.to_thread(self._check_columns, table, row)
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        values = [_to_param(v) for v in row.values()]
+
+        def work(connection):
+            connection.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", values)
+            return row_to_dict(connection.execute(f"SELECT * FROM {table} WHERE id = ?", [row["id"]]).fetchone())
+
+        return await self.transaction(work, table, "insert")
+
+    async def update(self, table: str, data: Dict[str, Any], **where: Any) -> List[Dict[str, Any]]:
+        """Update rows matching the equality filters and return them"""
+        await asyncio.to_thread(self._check_columns, table, list(data) + list(where))
+        assignments = ", ".join(f"{column} = ?" for column in data)
+        conditions = " AND ".join(f"{column} = ?" for column in where)
+        values = [_to_param(v) for v in data.values()]
+        filters = [_to_param(v) for v in where.values()]
+
+        def work(connection):
+            ids = [r["id"] for r in connection.execute(f"SELECT id FROM {table} WHERE {conditions}", filters)]
+            if not ids:
+                return []
+            id_placeholders = ", ".join("?" for _ in ids)
+            connection.execute(f"UPDATE {table} SET {assignments} WHERE id IN ({id_placeholders})", values + ids)
+            return [row_to_dict(r) for r in connection.execute(f"SELECT * FROM {table} WHERE id IN ({id_placeholders})", ids)]
+
+        return await self.transaction(work, table, "update")
+
+    async def select(self, table: str, **where: Any) -> List[Dict[str, Any]]:
+        """Rows of a table or view matching the equality filters"""
+        conditions = " AND ".join(f"{column} = ?" for column in where) or "1 = 1"
+        return await self.fetch_all(f"SELECT * FROM {table} WHERE {conditions}", list(where.values()), table)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Backend name and database file"""
+        return {
+            "backend": "sqlite",
+            "path": os.path.abspath(self.path),
+            "connections": len(self._connections),
+        }
+
+# Global instance
+sqlite_db = SqliteDatabase()
@@ -3,9 +3,17 @@ Supabase client configuration and database operations
 """
 
 import os
+import asyncio
+import importlib.metadata
+import weakref
+import httpx
+from postgrest import AsyncPostgrestClient
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
 from typing import Optional, Dict, Any
+from .query_metrics import timed_execute
+from .sqlite_db import sqlite_db, utc_now
+from .user_cache import user_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,10 +23,44 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
+# Sent as X-Client-Info so Supabase sees the installed client version
+try:
+    SUPABASE_CLIENT_INFO = f"supabase-py/{importlib.metadata.version('supabase')}"
+except importlib.metadata.PackageNotFoundError:
+    SUPABASE_CLIENT_INFO = "supabase-py"
+
+# Pooled HTTP/2 transport for the async PostgREST clients
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "100"))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "30"))
+
 # Initialize clients as None - will be created when needed
 supabase_client: Optional[Client] = None
 supabase_admin: Optional[Client] = None
 
+# Async clients are bound to the event loop they were created on (tools run
+# their own loops via run_sync), so keep one pair per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncPostgrestClient]]" = weakref.WeakKeyDictionary()
+
+class UserConflictError(Exception):
+    """Raised by create_user when the email or username is already taken"""
+
+    def __init__(self, field: str):
+        super().__init__(f"users.{field} already exists")
+        self.field = field
+
+def _conflicting_user_column(error: Exception) -> Optional[str]:
+    """Unique column named by a PostgREST (23505) or SQLite unique violation, if any"""
+    text = " ".join(str(part) for part in (getattr(error, "message", None), getattr(error, "details", None), error) if part)
+    if getattr(error, "code", None) != "23505" and "UNIQUE constraint failed" not in text:
+        return None
+    for column in ("email", "username"):
+        # "Key (email)=(...) already exists" / users_email_key / "UNIQUE constraint failed: users.email"
+        if f"({column})" in text or f"users_{column}_key" in text or f"users.{column}" in text:
+            return column
+    return None
+
 def get_supabase_client() -> Optional[Client]:
     """Get or create Supabase client"""
     global supabase_client
@@ -30,7 +72,7 @@ def get_supabase_client() -> Optional[Client]:
             # Create client with explicit options to avoid proxy argument issue
             options = ClientOptions(
                 schema='public',
-                headers={'X-Client-Info': 'supabase-py/2.3.4'},
+                headers={'X-Client-Info': SUPABASE_CLIENT_INFO},
                 auto_refresh_token=True,
                 persist_session=True
             )
@@ -55,7 +97,7 @@ def get_supabase_admin() -> Optional[Client]:
             # Create admin client with explicit options to avoid proxy argument issue
             options = ClientOptions(
                 schema='public',
-                headers={'X-Client-Info': 'supabase-py/2.3.4'},
+                headers={'X-Client-Info': SUPABASE_CLIENT_INFO},
                 auto_refresh_token=True,
                 persist_session=True
             )
@@ -69,6 +111,72 @@ def get_supabase_admin() -> Optional[Client]:
             return None
     return supabase_admin
 
+def _create_async_postgrest(api_key: str) -> AsyncPostgrestClient:
+    """Create an async PostgREST client on its own pooled HTTP/2 connection pool"""
+    http_client = httpx.AsyncClient(
+        http2=SUPABASE_HTTP2,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(SUPABASE_HTTP_TIMEOUT),
+        follow_redirects=True,
+    )
+    return AsyncPostgrestClient(
+        f"{SUPABASE_URL}/rest/v1",
+        schema='public',
+        headers={
+            'X-Client-Info': SUPABASE_CLIENT_INFO,
+            'apikey': api_key,
+            'Authorization': f'Bearer {api_key}',
+        },
+        http_client=http_client,
+    )
+
+def _get_async_postgrest(role: str, api_key: Optional[str]) -> Optional[AsyncPostgrestClient]:
+    """Get or create the async PostgREST client for a role on the running event loop"""
+    if not SUPABASE_URL or not api_key:
+        logger.warning(f"Supabase {role} environment variables not set. Using mock client.")
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.error("Async Supabase client requested outside of an event loop")
+        return None
+
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(role)
+    if client is None:
+        try:
+            client = clients[role] = _create_async_postgrest(api_key)
+        except Exception as e:
+            logger.error(f"Failed to create async Supabase {role} client: {e}")
+            return None
+    return client
+
+def get_async_supabase_client() -> Optional[AsyncPostgrestClient]:
+    """Get or create async PostgREST client (anon key)"""
+    return _get_async_postgrest("anon", SUPABASE_ANON_KEY)
+
+def get_async_supabase_admin() -> Optional[AsyncPostgrestClient]:
+    """Get or create async PostgREST admin client (service role key, bypasses RLS)"""
+    return _get_async_postgrest("admin", SUPABASE_SERVICE_ROLE_KEY)
+
+async def close_async_clients():
+    """Close the async PostgREST clients of the running event loop"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+def run_sync(coro):
+    """Run a coroutine from sync code on a fresh event loop, closing that loop's clients before it exits"""
+    async def _run():
+        try:
+            return await coro
+        finally:
+            await close_async_clients()
+    return asyncio.run(_run())
+
 class SupabaseManager:
     """Manage Supabase database operations"""
 
@@ -86,6 +194,16 @@ class SupabaseManager:
         """Get Supabase admin client (lazy initialization)"""
         return get_supabase_admin()
 
+    @property
+    def async_client(self) -> Optional[AsyncPostgrestClient]:
+        """Get async PostgREST client (lazy initialization, pooled per event loop)"""
+        return get_async_supabase_client()
+
+    @property
+    def async_admin(self) -> Optional[AsyncPostgrestClient]:
+        """Get async PostgREST admin client (lazy initialization, pooled per event loop)"""
+        return get_async_supabase_admin()
+
     def get_authenticated_client(self, jwt_token: str) -> Optional[Client]:
         """Get Supabase client with user authentication"""
         try:
@@ -96,7 +214,7 @@ class SupabaseManager:
             options = ClientOptions(
                 schema='public',
                 headers={
-                    'X-Client-Info': 'supabase-py/2.3.4',
+                    'X-Client-Info': SUPABASE_CLIENT_INFO,
                     'Authorization': f'Bearer {jwt_token}'
                 },
                 auto_refresh_token=False,
@@ -118,27 +236,32 @@ class SupabaseManager:
             return None
 
     async def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Create a new user in the database"""
-        if not self.admin:
+        """Create a new user in the database; raises UserConflictError if the email or username is taken"""
+        admin = self.async_admin
+        if not admin:
             logger.error("Supabase admin client not available. Please configure Supabase environment variables.")
             return None
         try:
-            result = self.admin.table('users').insert(user_data).execute()
+            result = await timed_execute(admin.table('users').insert(user_data))
             if result.data:
                 logger.info(f"User created successfully: {user_data['email']}")
                 return result.data[0]
             return None
         except Exception as e:
+            field = _conflicting_user_column(e)
+            if field:
+                raise UserConflictError(field) from e
             logger.error(f"Error creating user: {e}")
             return None
 
     async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Get user by email address"""
-        if not self.client:
+        client = self.async_client
+        if not client:
             logger.error("Supabase client not available. Please configure Supabase environment variables.")
             return None
         try:
-            result = self.client.table('users').select("*").eq('email', email).execute()
+            result = await timed_execute(client.table('users').select("*").eq('email', email))
             if result.data:
                 return result.data[0]
             return None
@@ -148,11 +271,12 @@ class SupabaseManager:
 
     async def get_user_by_email_admin(self, email: str) -> Optional[Dict[str, Any]]:
         """Get user by email address using admin client (bypasses RLS)"""
-        if not self.admin:
+        admin = self.async_admin
+        if not admin:
             logger.error("Supabase admin client not available. Please configure Supabase environment variables.")
             return None
         try:
-            result = self.admin.table('users').select("*").eq('email', email).execute()
+            result = await timed_execute(admin.table('users').select("*").eq('email', email))
             if result.data:
                 return result.data[0]
             return None
@@ -162,11 +286,12 @@ class SupabaseManager:
 
     async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Get user by username"""
-        if not self.client:
+        client = self.async_client
+        if not client:
             logger.error("Supabase client not available. Please configure Supabase environment variables.")
             return None
         try:
-            result = self.client.table('users').select("*").eq('username', username).execute()
+            result = await timed_execute(client.table('users').select("*").eq('username', username))
             if result.data:
                 return result.data[0]
             return None
@@ -176,11 +301,12 @@ class SupabaseManager:
 
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
-        if not self.client:
+        client = self.async_client
+        if not client:
             logger.error("Supabase client not available. Please configure Supabase environment variables.")
             return None
         try:
-            result = self.client.table('users').select("*").eq('id', user_id).execute()
+            result = await timed_execute(client.table('users').select("*").eq('id', user_id))
             if result.data:
                 return result.data[0]
             return None
@@ -190,11 +316,12 @@ class SupabaseManager:
 
     async def get_user_by_id_admin(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID using admin client (bypasses RLS)"""
-        if not self.admin:
+        admin = self.async_admin
+        if not admin:
             logger.error("Supabase admin client not available. Please configure Supabase environment variables.")
             return None
         try:
-            result = self.admin.table('users').select("*").eq('id', user_id).execute()
+            result = await timed_execute(admin.table('users').select("*").eq('id', user_id))
             if result.data:
                 return result.data[0]
             return None
@@ -204,14 +331,17 @@ class SupabaseManager:
 
     async def update_user(self, user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update user information"""
-        if not self.client:
+        client = self.async_client
+        if not client:
             logger.error("Supabase client not available. Please configure Supabase environment variables.")
             return None
         try:
             # Add updated_at timestamp
             update_data['updated_at'] = 'NOW()'
 
-            result = self.client.table('users').update(update_data).eq('id', user_id).execute()
+            result = await timed_execute(client.table('users').update(update_data).eq('id', user_id))
+            # Profile changes and deactivation must not be served from the auth cache
+            self._forget_user(user_id, update_data)
             if result.data:
                 return result.data[0]
             return None
@@ -219,19 +349,91 @@ class SupabaseManager:
             logger.error(f"Error updating user: {e}")
             return None
 
+    def _forget_user(self, user_id: str, update_data: Dict[str, Any]):
+        """Drop cached copies of an updated user; deactivation also revokes issued tokens"""
+        user_cache.invalidate(user_id)
+        if update_data.get('is_active') is False:
+            # Stateless tokens embed is_active, so they have to be rejected explicitly
+            from ..services.token_revocation import token_revocations
+            token_revocations.revoke(user_id)
+
     async def update_last_login(self, user_id: str) -> bool:
         """Update user's last login timestamp"""
-        if not self.client:
+        client = self.async_client
+        if not client:
             logger.error("Supabase client not available. Please configure Supabase environment variables.")
             return False
         try:
-            self.client.table('users').update({
+            await timed_execute(client.table('users').update({
                 'last_login': 'NOW()'
-            }).eq('id', user_id).execute()
+            }).eq('id', user_id))
+            return True
+        except Exception as e:
+            logger.error(f"Error updating last login: {e}")
+            return False
+
+class SqliteSupabaseManager(SupabaseManager):
+    """SupabaseManager storing users in the embedded SQLite database"""
+
+    async def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create a new user in the database; raises UserConflictError if the email or username is taken"""
+        try:
+            user = await sqlite_db.insert('users', user_data)
+            logger.info(f"User created successfully: {user_data['email']}")
+            return user
+        except Exception as e:
+            field = _conflicting_user_column(e)
+            if field:
+                raise UserConflictError(field) from e
+            logger.error(f"Error creating user: {e}")
+            return None
+
+    async def _get_user(self, **where: Any) -> Optional[Dict[str, Any]]:
+        try:
+            rows = await sqlite_db.select('users', **where)
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error fetching user by {', '.join(where)}: {e}")
+            return None
+
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Get user by email address"""
+        return await self._get_user(email=email)
+
+    async def get_user_by_email_admin(self, email: str) -> Optional[Dict[str, Any]]:
+        """Get user by email address (no RLS in SQLite)"""
+        return await self._get_user(email=email)
+
+    async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        """Get user by username"""
+        return await self._get_user(username=username)
+
+    async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user by ID"""
+        return await self._get_user(id=user_id)
+
+    async def get_user_by_id_admin(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user by ID (no RLS in SQLite)"""
+        return await self._get_user(id=user_id)
+
+    async def update_user(self, user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update user information"""
+        try:
+            rows = await sqlite_db.update('users', {**update_data, 'updated_at': utc_now()}, id=user_id)
+            self._forget_user(user_id, update_data)
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error updating user: {e}")
+            return None
+
+    async def update_last_login(self, user_id: str) -> bool:
+        """Update user's last login timestamp"""
+        try:
+            await sqlite_db.update('users', {'last_login': utc_now()}, id=user_id)
             return True
         except Exception as e:
             logger.error(f"Error updating last login: {e}")
             return False
 
 # Global instance
-db_manager = SupabaseManager() 
\ No newline at end of file
+db_manager = SqliteSupabaseManager() if sqlite_db.enabled else SupabaseManager()
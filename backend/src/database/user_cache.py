@@ -0,0 +1,91 @@
+"""
+In-process cache of authenticated users (saves the users lookup on every request)
+"""
+
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Entries expire after the TTL, which also bounds how long another worker
+# process can serve a user that was updated or deactivated elsewhere
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+class UserCache:
+    """LRU cache of user objects keyed by user id, with a TTL per entry"""
+
+    def __init__(self, max_size: int = USER_CACHE_MAX_SIZE, ttl_seconds: float = USER_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.enabled = max_size > 0 and ttl_seconds > 0
+        # user_id -> (expires_at, user), least recently used first
+        self._users: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Optional[Any]:
+        """Return the cached user, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._users[user_id]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id: str, user: Any):
+        """Cache a user freshly read from the database"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._users[user_id] = (time.monotonic() + self.ttl_seconds, user)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        """Drop a user after an update, deactivation or sign-out"""
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every cached user"""
+        with self._lock:
+            self._users.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and size counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "users": len(self._users),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+# Global instance
+user_cache = UserCache()
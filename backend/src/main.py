@@ -3,12 +3,13 @@ Enhanced FastAPI Server for Simplified Two-Agent LangGraph System with Authentic
 Focus on Slack and Weather agents with LLM-driven tool selection and user authentication
 """
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
 import uvicorn
 import os
+import time
 import logging
 from dotenv import load_dotenv
 
@@ -52,6 +53,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request latency breakdown (total vs database time) as a Server-Timing header
+from src.database.query_metrics import query_metrics
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    token = query_metrics.start_request()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        db = query_metrics.end_request(token)
+    total_ms = (time.perf_counter() - started) * 1000
+    # Concurrent queries can overlap, so app time is clamped at zero
+    app_ms = max(0.0, total_ms - db["db_ms"])
+    response.headers["Server-Timing"] = (
+        f'db;dur={db["db_ms"]:.1f};desc="{db["queries"]} queries", '
+        f'app;dur={app_ms:.1f}, total;dur={total_ms:.1f}'
+    )
+    logger.debug(f"{request.method} {request.url.path} total={total_ms:.1f}ms db={db['db_ms']:.1f}ms queries={db['queries']}")
+    return response
+
 # Create our enhanced orchestrator system when the server starts
 enhanced_orchestrator = None
 
@@ -73,6 +95,51 @@ async def startup():
     else:
         print("⚠️  No Gemini API key found. Please set GEMINI_API_KEY in .env file")
 
+    # Open the pooled async checkpointer (no-op unless DATABASE_URL is configured)
+    from src.services.memory_service import memory_service
+    if await memory_service.setup_async_checkpointer():
+        print("✅ Async PostgreSQL checkpointer ready!")
+    memory_service.start_compaction_job()
+
+    # Open the direct Postgres pool for chat queries (no-op unless DATABASE_BACKEND=asyncpg)
+    from src.database.postgres_pool import postgres_pool
+    if await postgres_pool.open():
+        print("✅ asyncpg pool ready for chat queries!")
+
+    # Create the embedded database (no-op unless DATABASE_BACKEND=sqlite)
+    from src.database.sqlite_db import sqlite_db
+    if await sqlite_db.open():
+        print(f"✅ SQLite database ready at {sqlite_db.path}")
+
+    # Refresh Google tokens of active calendar users before they expire
+    from src.services.calendar_tokens import calendar_tokens
+    calendar_tokens.start_refresh_job()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """This runs when the server stops"""
+    from src.services.memory_service import memory_service
+    await memory_service.close()
+
+    from src.services.calendar_tokens import calendar_tokens
+    await calendar_tokens.stop_refresh_job()
+
+    # Write coalesced session timestamps before the database clients go away
+    from src.database.session_touch import session_touch_buffer
+    await session_touch_buffer.close()
+
+    from src.database.supabase_client import close_async_clients
+    await close_async_clients()
+
+    from src.database.postgres_pool import postgres_pool
+    await postgres_pool.close()
+
+    from src.database.sqlite_db import sqlite_db
+    sqlite_db.close()
+
+    from src.services.password_hasher import password_hasher
+    password_hasher.close()
+
 # Include authentication and calendar routes
 app.include_router(auth_router)
 from src.routes.calendar_routes import router as calendar_router
@@ -126,6 +193,39 @@ async def health_check():
     """Check if everything is working"""
     has_system = enhanced_orchestrator is not None
     
+    from src.services.memory_service import memory_service
+    memory_health = await memory_service.check_health()
+
+    from src.database.message_cache import recent_message_cache
+    session_cache_stats = recent_message_cache.get_stats()
+
+    from src.database.user_cache import user_cache
+    user_cache_stats = user_cache.get_stats()
+
+    from src.services.auth_service import AUTH_TOKEN_MODE
+    from src.services.token_revocation import token_revocations
+    from src.services.password_hasher import password_hasher
+    auth_stats = {
+        "token_mode": AUTH_TOKEN_MODE,
+        "revocations": token_revocations.get_stats(),
+        "password_hashing": password_hasher.get_stats(),
+    }
+
+    from src.services.calendar_client import calendar_client_factory
+    from src.services.calendar_sync import calendar_sync
+    calendar_api_stats = calendar_client_factory.get_stats()
+    calendar_api_stats["sync"] = calendar_sync.get_stats()
+    from src.services.calendar_tokens import calendar_tokens
+    calendar_api_stats["tokens"] = calendar_tokens.get_stats()
+
+    from src.database.postgres_pool import postgres_pool
+    from src.database.sqlite_db import sqlite_db
+    database_stats = sqlite_db.get_stats() if sqlite_db.enabled else postgres_pool.get_stats()
+    database_stats["queries"] = query_metrics.get_stats()
+
+    from src.database.session_touch import session_touch_buffer
+    database_stats["session_touch"] = session_touch_buffer.get_stats()
+
     # Check Supabase configuration
     import os
     supabase_configured = bool(
@@ -138,6 +238,12 @@ async def health_check():
         "status": "healthy" if has_system else "no_ai_configured",
         "ai_ready": has_system,
         "auth_ready": supabase_configured,
+        "memory": memory_health,
+        "session_cache": session_cache_stats,
+        "user_cache": user_cache_stats,
+        "auth": auth_stats,
+        "calendar_api": calendar_api_stats,
+        "database": database_stats,
         "system_type": "Enhanced Three-Agent Orchestrator" if has_system else "None",
         "agents": ["Enhanced Slack Agent", "Enhanced Weather Agent", "Google Calendar Agent"] if has_system else [],
         "ai_model": "Google Gemini 2.0 Flash" if has_system else "None",
@@ -246,11 +352,16 @@ async def authenticated_chat(
         # Add current user message to context
         all_messages = recent_messages + [{"role": "user", "content": message.message}]
 
+        # Recall relevant snippets from earlier in this or other sessions
+        long_term_context = await memory_service.retrieve_relevant_context(
+            current_user.id, message.message, recent_messages
+        )
+
         # Create enhanced state with session context
         initial_state = {
             "messages": all_messages,
             "agent_results": {},
-            "context": "",
+            "context": long_term_context,
             "user_id": current_user.id,
             "session_id": session_id
         }
@@ -309,16 +420,22 @@ async def authenticated_chat(
                 # Fallback to original workflow without memory
                 enhanced_orchestrator.workflow_graph_with_memory = enhanced_orchestrator.workflow_graph
 
-        # Use orchestrator with memory
-        result = enhanced_orchestrator.workflow_graph_with_memory.invoke(initial_state, config)
+        # Use orchestrator with memory (async path keeps checkpoint I/O off the event loop)
+        if memory_service.is_async:
+            result = await enhanced_orchestrator.workflow_graph_with_memory.ainvoke(initial_state, config)
+        else:
+            result = enhanced_orchestrator.workflow_graph_with_memory.invoke(initial_state, config)
 
         # Extract response
         final_message = result["messages"][-1]
         ai_response = final_message.content if hasattr(final_message, 'content') else str(final_message)
 
         # Save messages to database
-        await message_manager.add_message(session_id, current_user.id, "user", message.message, jwt_token=jwt_token)
-        await message_manager.add_message(session_id, current_user.id, "assistant", ai_response, jwt_token=jwt_token)
+        user_row = await message_manager.add_message(session_id, current_user.id, "user", message.message, jwt_token=jwt_token)
+        assistant_row = await message_manager.add_message(session_id, current_user.id, "assistant", ai_response, jwt_token=jwt_token)
+
+        # Index the new turn for long-term recall
+        await memory_service.remember_messages(session_id, current_user.id, [user_row, assistant_row])
 
         return ChatResponse(
             response=ai_response,
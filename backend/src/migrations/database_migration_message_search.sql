@@ -0,0 +1,57 @@
+-- Migration: full-text search over chat history (GET /sessions/search)
+-- Run this in your Supabase SQL editor after chat_sessions_and_messages.sql.
+--
+-- Adding the generated column rewrites chat_messages once; on a large table
+-- run it in a quiet period.
+
+-- (user_id, search_vector) in one GIN index so a search only touches the caller's rows
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+ALTER TABLE chat_messages
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', COALESCE(content, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_messages_user_search ON chat_messages USING GIN (user_id, search_vector);
+
+-- Ranked hits in active sessions. Only the requested page is passed to
+-- ts_headline, which re-parses the message text. Highlights are delimited by
+-- chr(2) / chr(3) so the backend can HTML-escape the snippet before marking them.
+CREATE OR REPLACE FUNCTION search_chat_messages(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    id UUID,
+    session_id UUID,
+    session_title VARCHAR,
+    role VARCHAR,
+    message_order INTEGER,
+    created_at TIMESTAMPTZ,
+    rank REAL,
+    snippet TEXT
+)
+LANGUAGE sql STABLE SET search_path = public AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS query
+    ), hits AS (
+        SELECT m.id, m.session_id, m.role, m.message_order, m.created_at, m.content,
+               ts_rank_cd(m.search_vector, q.query) AS rank
+        FROM chat_messages m
+        CROSS JOIN q
+        JOIN chat_sessions s ON s.id = m.session_id AND s.is_active
+        WHERE m.user_id = p_user_id
+          AND m.search_vector @@ q.query
+        ORDER BY rank DESC, m.created_at DESC, m.id
+        LIMIT p_limit OFFSET p_offset
+    )
+    SELECT h.id, h.session_id, s.title, h.role, h.message_order, h.created_at, h.rank,
+           ts_headline('english', h.content, q.query,
+               'StartSel="' || chr(2) || '", StopSel="' || chr(3) || '", '
+               'MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=" … "')
+    FROM hits h
+    CROSS JOIN q
+    JOIN chat_sessions s ON s.id = h.session_id
+    ORDER BY h.rank DESC, h.created_at DESC, h.id;
+$$;
@@ -0,0 +1,126 @@
+-- Migration: keep message_count / last_message_preview on chat_sessions
+-- Run this in your Supabase SQL editor after chat_sessions_and_messages.sql
+--
+-- session_stats used to LEFT JOIN + COUNT every message and run a correlated
+-- subquery per session for the preview. The counters are now maintained by
+-- triggers on chat_messages and session_stats becomes a plain read of
+-- chat_sessions, so listing sessions no longer scales with message history.
+
+BEGIN;
+
+-- Block message writes until the triggers exist and the backfill is done
+LOCK TABLE chat_messages IN SHARE ROW EXCLUSIVE MODE;
+
+ALTER TABLE chat_sessions
+    ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS last_message_preview TEXT;
+
+-- Sidebar query: sessions of a user ordered by latest activity
+CREATE INDEX IF NOT EXISTS idx_sessions_user_last_message ON chat_sessions(user_id, last_message_at DESC);
+
+-- Statement-level triggers see all affected rows at once, so bulk deletes
+-- (clearing a session) update each session a single time.
+-- Messages are appended in message_order, so the newest inserted row is the preview.
+CREATE OR REPLACE FUNCTION chat_messages_after_insert() RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    UPDATE chat_sessions s
+    SET message_count = s.message_count + n.added,
+        last_message_preview = n.content
+    FROM (
+        SELECT DISTINCT ON (session_id)
+            session_id,
+            content,
+            COUNT(*) OVER (PARTITION BY session_id) AS added
+        FROM inserted_rows
+        ORDER BY session_id, message_order DESC
+    ) n
+    WHERE s.id = n.session_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION chat_messages_after_delete() RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    UPDATE chat_sessions s
+    SET message_count = GREATEST(s.message_count - d.removed, 0),
+        last_message_preview = (
+            SELECT m.content FROM chat_messages m
+            WHERE m.session_id = s.id
+            ORDER BY m.message_order DESC
+            LIMIT 1
+        )
+    FROM (
+        SELECT session_id, COUNT(*) AS removed FROM deleted_rows GROUP BY session_id
+    ) d
+    WHERE s.id = d.session_id;
+    RETURN NULL;
+END;
+$$;
+
+-- Editing the newest message changes the preview
+CREATE OR REPLACE FUNCTION chat_messages_after_content_update() RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    UPDATE chat_sessions s
+    SET last_message_preview = NEW.content
+    WHERE s.id = NEW.session_id
+      AND NOT EXISTS (
+          SELECT 1 FROM chat_messages m
+          WHERE m.session_id = NEW.session_id AND m.message_order > NEW.message_order
+      );
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS chat_messages_count_insert ON chat_messages;
+CREATE TRIGGER chat_messages_count_insert
+    AFTER INSERT ON chat_messages
+    REFERENCING NEW TABLE AS inserted_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION chat_messages_after_insert();
+
+DROP TRIGGER IF EXISTS chat_messages_count_delete ON chat_messages;
+CREATE TRIGGER chat_messages_count_delete
+    AFTER DELETE ON chat_messages
+    REFERENCING OLD TABLE AS deleted_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION chat_messages_after_delete();
+
+DROP TRIGGER IF EXISTS chat_messages_preview_update ON chat_messages;
+CREATE TRIGGER chat_messages_preview_update
+    AFTER UPDATE OF content ON chat_messages
+    FOR EACH ROW
+    WHEN (OLD.content IS DISTINCT FROM NEW.content)
+    EXECUTE FUNCTION chat_messages_after_content_update();
+
+-- Backfill existing sessions
+UPDATE chat_sessions s
+SET message_count = c.message_count,
+    last_message_preview = c.content
+FROM (
+    SELECT DISTINCT ON (session_id)
+        session_id,
+        content,
+        COUNT(*) OVER (PARTITION BY session_id) AS message_count
+    FROM chat_messages
+    ORDER BY session_id, message_order DESC
+) c
+WHERE s.id = c.session_id;
+
+-- Same columns as before, now a plain indexed read of chat_sessions
+DROP VIEW IF EXISTS session_stats;
+CREATE VIEW session_stats AS
+SELECT
+    s.id,
+    s.user_id,
+    s.title,
+    s.description,
+    s.is_active,
+    s.created_at,
+    s.updated_at,
+    s.last_message_at,
+    s.message_count,
+    COALESCE(s.last_message_preview, 'No messages yet') AS last_message_preview
+FROM chat_sessions s;
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- Migration: support incremental session list refresh (GET /sessions?updated_since=...)
+-- Run this in your Supabase SQL editor after database_migration_session_counters.sql
+
+-- Changed-since polling: sessions of a user by updated_at
+CREATE INDEX IF NOT EXISTS idx_sessions_user_updated_at ON chat_sessions(user_id, updated_at);
+
+-- Clearing messages changes message_count / last_message_preview, so it must
+-- also bump updated_at for pollers to pick the session up
+CREATE OR REPLACE FUNCTION chat_messages_after_delete() RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    UPDATE chat_sessions s
+    SET message_count = GREATEST(s.message_count - d.removed, 0),
+        last_message_preview = (
+            SELECT m.content FROM chat_messages m
+            WHERE m.session_id = s.id
+            ORDER BY m.message_order DESC
+            LIMIT 1
+        ),
+        updated_at = NOW()
+    FROM (
+        SELECT session_id, COUNT(*) AS removed FROM deleted_rows GROUP BY session_id
+    ) d
+    WHERE s.id = d.session_id;
+    RETURN NULL;
+END;
+$$;
+
+-- Same for edits to the newest message
+CREATE OR REPLACE FUNCTION chat_messages_after_content_update() RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    UPDATE chat_sessions s
+    SET last_message_preview = NEW.content,
+        updated_at = NOW()
+    WHERE s.id = NEW.session_id
+      AND NOT EXISTS (
+          SELECT 1 FROM chat_messages m
+          WHERE m.session_id = NEW.session_id AND m.message_order > NEW.message_order
+      );
+    RETURN NULL;
+END;
+$$;
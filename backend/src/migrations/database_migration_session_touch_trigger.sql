@@ -0,0 +1,28 @@
+-- Migration: bump chat_sessions.last_message_at from the message insert trigger
+-- Run this in your Supabase SQL editor after database_migration_session_counters.sql,
+-- then set SESSION_TOUCH_MODE=trigger so the backend stops issuing its own UPDATEs.
+--
+-- The counter trigger already updates the session row for every insert
+-- statement, so setting the timestamps there costs no extra write.
+
+CREATE OR REPLACE FUNCTION chat_messages_after_insert() RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+    UPDATE chat_sessions s
+    SET message_count = s.message_count + n.added,
+        last_message_preview = n.content,
+        last_message_at = GREATEST(s.last_message_at, n.created_at),
+        updated_at = NOW()
+    FROM (
+        SELECT DISTINCT ON (session_id)
+            session_id,
+            content,
+            created_at,
+            COUNT(*) OVER (PARTITION BY session_id) AS added
+        FROM inserted_rows
+        ORDER BY session_id, message_order DESC
+    ) n
+    WHERE s.id = n.session_id;
+    RETURN NULL;
+END;
+$$;
@@ -18,6 +18,7 @@ if os.path.exists(_calendar_tools_path):
     
     create_calendar_event = calendar_tools_module.create_calendar_event
     get_upcoming_meetings_tool = calendar_tools_module.get_upcoming_meetings_tool
+    find_free_slots = calendar_tools_module.find_free_slots
 else:
     # Create dummy functions if file doesn't exist
     def create_calendar_event(prompt: str, user_id: str) -> str:
@@ -26,6 +27,9 @@ else:
     def get_upcoming_meetings_tool(query: str = "next 7 days", user_id: str = None) -> str:
         return "❌ Upcoming meetings not available due to import error."
 
+    def find_free_slots(query: str = "next 7 days", user_id: str = None, min_duration_minutes: int = 30) -> str:
+        return "❌ Availability not available due to import error."
+
 def create_calendar_chatbot_node(llm_with_tools):
     """Create calendar chatbot node with direct tool execution capabilities"""
 
@@ -40,6 +44,7 @@ def create_calendar_chatbot_node(llm_with_tools):
 🔧 AVAILABLE TOOLS:
 - create_calendar_event: Creates calendar events from natural language prompts
 - get_upcoming_meetings_tool: Retrieves upcoming meetings from user's Google Calendar
+- find_free_slots: Lists free time slots (already computed) within working hours
 
 🎯 EXAMPLES FOR CREATING EVENTS:
 - "Schedule meeting tomorrow at 2pm" → Extract: meeting, tomorrow, 2pm
@@ -53,6 +58,10 @@ def create_calendar_chatbot_node(llm_with_tools):
 - "What do I have tomorrow?" → Use get_upcoming_meetings_tool with query "tomorrow"
 - "Any meetings next week?" → Use get_upcoming_meetings_tool with query "next week"
 
+🎯 EXAMPLES FOR AVAILABILITY:
+- "When am I free tomorrow afternoon?" → Use find_free_slots with query "tomorrow afternoon"
+- "Do I have an hour free on Friday?" → Use find_free_slots with query "friday" and min_duration_minutes 60
+
 📝 RESPONSE FORMAT:
 When creating events, always:
 1. Acknowledge what event you're creating
@@ -65,12 +74,15 @@ When showing upcoming meetings:
 2. Use the get_upcoming_meetings_tool with appropriate query
 3. Present the results in a clear, formatted way
 
+When answering availability questions, phrase the slots find_free_slots returns; do not work out free time from the meeting list yourself.
+
 Be conversational and helpful - users should feel like they're talking to a personal assistant!"""
 
     # Create a mapping of tool names to actual functions
     tool_map = {
         'create_calendar_event': create_calendar_event,
-        'get_upcoming_meetings_tool': get_upcoming_meetings_tool
+        'get_upcoming_meetings_tool': get_upcoming_meetings_tool,
+        'find_free_slots': find_free_slots
     }
 
     def calendar_chatbot(state):
@@ -2,12 +2,13 @@
 Authentication API routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from src.models.auth_models import (
     UserSignupRequest,
     UserSigninRequest,
     AuthResponse,
+    RefreshTokenRequest,
     UserResponse
 )
 from src.services.auth_service import auth_service
@@ -30,9 +31,20 @@ async def signup(signup_data: UserSignupRequest):
     return await auth_service.signup_user(signup_data)
 
 @router.post("/signin", response_model=AuthResponse)
-async def signin(signin_data: UserSigninRequest):
+async def signin(signin_data: UserSigninRequest, background_tasks: BackgroundTasks):
     """Authenticate user login"""
-    return await auth_service.signin_user(signin_data)
+    return await auth_service.signin_user(signin_data, background_tasks)
+
+@router.post("/refresh", response_model=AuthResponse)
+async def refresh(refresh_data: RefreshTokenRequest):
+    """Exchange a refresh token for new access and refresh tokens"""
+    return await auth_service.refresh_tokens(refresh_data.refresh_token)
+
+@router.post("/signout")
+async def signout(current_user: UserResponse = Depends(get_current_user)):
+    """Sign out the current user"""
+    auth_service.signout_user(current_user.id)
+    return {"message": "Signed out successfully"}
 
 @router.get("/me", response_model=UserResponse)
 async def get_me(current_user: UserResponse = Depends(get_current_user)):
@@ -7,16 +7,38 @@ from fastapi.responses import RedirectResponse
 from src.routes.auth_routes import get_current_user
 from src.models.auth_models import UserResponse
 from src.services.google_calendar_service import google_calendar_service
+from src.services.calendar_sync import calendar_sync
+from src.services.calendar_tokens import calendar_tokens
 from src.database.calendar_operations import calendar_db
-from src.database.supabase_client import db_manager
 from pydantic import BaseModel
+from typing import Optional
+import importlib.util
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/calendar", tags=["calendar"])
 
 class UpcomingMeetingsRequest(BaseModel):
     query: str = "next 7 days"
+    max_staleness: Optional[float] = None
+
+_upcoming_meetings_tool = None
+
+def _load_upcoming_meetings_tool():
+    """Load upcoming_meetings_tool by file path once (the calendar.tools directory is not importable)"""
+    global _upcoming_meetings_tool
+    if _upcoming_meetings_tool is None:
+        upcoming_meetings_path = os.path.join(
+            os.path.dirname(__file__), '..', 'tools', 'calendar.tools', 'upcoming_meetings_tool.py'
+        )
+        if not os.path.exists(upcoming_meetings_path):
+            raise Exception("Upcoming meetings tool not found")
+        spec = importlib.util.spec_from_file_location("upcoming_meetings_tool", upcoming_meetings_path)
+        upcoming_meetings_module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(upcoming_meetings_module)
+        _upcoming_meetings_tool = upcoming_meetings_module.upcoming_meetings_tool
+    return _upcoming_meetings_tool
 
 @router.get("/connect")
 async def connect_google_calendar(current_user: UserResponse = Depends(get_current_user)):
@@ -66,6 +88,9 @@ async def google_calendar_callback(request: Request):
         )
 
         if result:
+            # A reconnect may be a different Google account
+            calendar_sync.forget(state)
+            calendar_tokens.forget(state)
             logger.info(f"✅ Google Calendar connected successfully for user: {state}")
             return RedirectResponse(url="http://localhost:3000/chat?calendar_success=connected")
         else:
@@ -101,26 +126,13 @@ async def calendar_status(current_user: UserResponse = Depends(get_current_user)
 @router.get("/upcoming")
 async def get_upcoming_meetings_endpoint(
     query: str = Query("next 7 days", description="Time range query (e.g., 'today', 'this week', 'next month')"),
+    max_staleness: Optional[float] = Query(None, ge=0, description="Accept events synced up to this many seconds ago (0 fetches changes first)"),
     current_user: UserResponse = Depends(get_current_user)
 ):
     """Get upcoming meetings from user's Google Calendar"""
     try:
-        # Import upcoming_meetings_tool using direct file loading
-        import importlib.util
-        import os
-        
-        upcoming_meetings_path = os.path.join(
-            os.path.dirname(__file__), '..', 'tools', 'calendar.tools', 'upcoming_meetings_tool.py'
-        )
-        if os.path.exists(upcoming_meetings_path):
-            spec = importlib.util.spec_from_file_location("upcoming_meetings_tool", upcoming_meetings_path)
-            upcoming_meetings_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(upcoming_meetings_module)
-            upcoming_meetings_tool = upcoming_meetings_module.upcoming_meetings_tool
-        else:
-            raise Exception("Upcoming meetings tool not found")
-            
-        result = await upcoming_meetings_tool.get_upcoming_meetings(current_user.id, query)
+        upcoming_meetings_tool = _load_upcoming_meetings_tool()
+        result = await upcoming_meetings_tool.get_upcoming_meetings(current_user.id, query, max_staleness)
         return {"meetings": result, "query": query}
     except Exception as e:
         logger.error(f"Error fetching upcoming meetings: {e}")
@@ -133,35 +145,50 @@ async def get_upcoming_meetings_post(
 ):
     """Get upcoming meetings with POST request (for complex queries)"""
     try:
-        # Import upcoming_meetings_tool using direct file loading
-        import importlib.util
-        import os
-        
-        upcoming_meetings_path = os.path.join(
-            os.path.dirname(__file__), '..', 'tools', 'calendar.tools', 'upcoming_meetings_tool.py'
-        )
-        if os.path.exists(upcoming_meetings_path):
-            spec = importlib.util.spec_from_file_location("upcoming_meetings_tool", upcoming_meetings_path)
-            upcoming_meetings_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(upcoming_meetings_module)
-            upcoming_meetings_tool = upcoming_meetings_module.upcoming_meetings_tool
-        else:
-            raise Exception("Upcoming meetings tool not found")
-            
-        result = await upcoming_meetings_tool.get_upcoming_meetings(current_user.id, request.query)
+        upcoming_meetings_tool = _load_upcoming_meetings_tool()
+        result = await upcoming_meetings_tool.get_upcoming_meetings(current_user.id, request.query, request.max_staleness)
         return {"meetings": result, "query": request.query}
     except Exception as e:
         logger.error(f"Error fetching upcoming meetings: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch upcoming meetings: {str(e)}")
 
+@router.get("/availability")
+async def get_availability(
+    query: str = Query("next 7 days", description="Day and optional part of day (e.g., 'tomorrow afternoon', 'friday', 'this week')"),
+    min_duration_minutes: Optional[int] = Query(None, ge=1, le=1440, description="Shortest free slot to return"),
+    work_start: Optional[str] = Query(None, description="Start of working hours, HH:MM"),
+    work_end: Optional[str] = Query(None, description="End of working hours, HH:MM"),
+    timezone: Optional[str] = Query(None, description="IANA timezone (defaults to the calendar's timezone)"),
+    include_weekends: Optional[bool] = Query(None, description="Defaults to true only for single-day queries"),
+    max_staleness: Optional[float] = Query(None, ge=0, description="Accept events synced up to this many seconds ago (0 fetches changes first)"),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Free slots in the user's Google Calendar within working hours"""
+    try:
+        upcoming_meetings_tool = _load_upcoming_meetings_tool()
+        availability = await upcoming_meetings_tool.get_free_slots(
+            current_user.id, query, min_duration_minutes, work_start, work_end,
+            timezone, include_weekends, max_staleness
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error finding free slots: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to find free slots: {str(e)}")
+
+    if availability is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Google Calendar connected")
+    return availability
+
 @router.delete("/disconnect")
 async def disconnect_calendar(current_user: UserResponse = Depends(get_current_user)):
     """Disconnect user's calendar integration"""
     try:
         # Deactivate integration
-        db_manager.admin.table('user_calendar_integrations').update({
-            'is_active': False
-        }).eq('user_id', current_user.id).eq('provider', 'google').execute()
+        if not await calendar_db.deactivate_calendar_integration(current_user.id):
+            raise Exception("Database update failed")
+        calendar_sync.forget(current_user.id)
+        calendar_tokens.forget(current_user.id)
 
         return {"message": "Calendar disconnected successfully"}
 
@@ -3,12 +3,13 @@ Chat session management API routes
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 from ..models.auth_models import UserResponse
 from ..routes.auth_routes import get_current_user, get_current_user_with_token
-from ..database.session_operations import session_manager
-from ..database.message_operations import message_manager
+from ..database.session_operations import session_manager, SESSION_PAGE_SIZE, SESSION_PAGE_MAX_SIZE
+from ..database.message_operations import message_manager, MESSAGE_PAGE_SIZE, MESSAGE_PAGE_MAX_SIZE, SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX_SIZE
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
@@ -32,6 +33,12 @@ class SessionResponse(BaseModel):
     message_count: int
     last_message_preview: str
 
+class SessionPageResponse(BaseModel):
+    sessions: List[SessionResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool
+    synced_at: Optional[str] = None
+
 class MessageResponse(BaseModel):
     id: str
     role: str
@@ -40,6 +47,26 @@ class MessageResponse(BaseModel):
     message_order: int
     created_at: str
 
+class MessagePageResponse(BaseModel):
+    messages: List[MessageResponse]
+    next_cursor: Optional[int] = None
+    has_more: bool
+
+class SearchHitResponse(BaseModel):
+    id: str
+    session_id: str
+    session_title: str
+    role: str
+    message_order: int
+    created_at: str
+    rank: float
+    snippet: str
+
+class SearchResponse(BaseModel):
+    results: List[SearchHitResponse]
+    next_offset: Optional[int] = None
+    has_more: bool
+
 @router.post("/", response_model=SessionResponse)
 async def create_session(
     request: CreateSessionRequest,
@@ -66,16 +93,35 @@ async def create_session(
 
     return enriched_session
 
-@router.get("/", response_model=List[SessionResponse])
+@router.get("/", response_model=SessionPageResponse)
 async def get_sessions(
     active_only: bool = Query(True, description="Only return active sessions"),
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=SESSION_PAGE_MAX_SIZE, description="Maximum number of sessions to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    updated_since: Optional[datetime] = Query(None, description="Only sessions changed after this time (synced_at of the previous poll)"),
     user_and_token: tuple[UserResponse, str] = Depends(get_current_user_with_token)
 ):
-    """Get all sessions for the current user"""
+    """Get a page of sessions for the current user, most recently active first"""
     current_user, jwt_token = user_and_token
     
-    sessions = await session_manager.get_user_sessions(current_user.id, active_only)
-    return sessions
+    try:
+        page = await session_manager.get_user_sessions_page(
+            current_user.id, active_only, limit, cursor=cursor, updated_since=updated_since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page
+
+# Declared before /{session_id} so "search" is not taken for a session id
+@router.get("/search", response_model=SearchResponse)
+async def search_sessions(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in message text"),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_PAGE_MAX_SIZE, description="Maximum number of hits to return"),
+    offset: int = Query(0, ge=0, le=10000, description="next_offset from the previous page"),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Search the current user's chat history, best matches first"""
+    return await message_manager.search_messages(current_user.id, q, limit, offset)
 
 @router.get("/{session_id}", response_model=SessionResponse)
 async def get_session(
@@ -138,26 +184,30 @@ async def delete_session(
 
     return {"message": "Session deleted successfully"}
 
-@router.get("/{session_id}/messages", response_model=List[MessageResponse])
+@router.get("/{session_id}/messages", response_model=MessagePageResponse)
 async def get_session_messages(
     session_id: str,
-    limit: Optional[int] = Query(None, description="Maximum number of messages to return"),
-    offset: int = Query(0, description="Number of messages to skip"),
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MESSAGE_PAGE_MAX_SIZE, description="Maximum number of messages to return"),
+    before: Optional[int] = Query(None, description="Cursor: return messages older than this message_order"),
+    after: Optional[int] = Query(None, description="Cursor: return messages newer than this message_order"),
     user_and_token: tuple[UserResponse, str] = Depends(get_current_user_with_token)
 ):
-    """Get messages for a session"""
+    """Get a page of messages for a session (newest page when no cursor is given)"""
     current_user, jwt_token = user_and_token
+
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
     
     # Verify session exists and belongs to user
     session = await session_manager.get_session(session_id, current_user.id, jwt_token)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    messages = await message_manager.get_session_messages(
-        session_id, current_user.id, limit, offset, jwt_token
+    page = await message_manager.get_session_messages(
+        session_id, current_user.id, limit, before=before, after=after, jwt_token=jwt_token
     )
 
-    return messages
+    return page
 
 @router.delete("/{session_id}/messages")
 async def clear_session_messages(
@@ -3,43 +3,103 @@ Authentication service with JWT token management
 """
 
 import os
+import time
+import uuid
 import jwt
-import bcrypt
+import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from fastapi import HTTPException, status
-from src.database.supabase_client import db_manager
+from fastapi import BackgroundTasks, HTTPException, status
+from src.database.supabase_client import db_manager, UserConflictError
+from src.database.user_cache import user_cache
+from src.services.token_revocation import token_revocations
+from src.services.password_hasher import password_hasher, PasswordHasherBusy
+from pydantic import ValidationError
 from src.models.auth_models import UserSignupRequest, UserSigninRequest, UserResponse, AuthResponse
 
+logger = logging.getLogger(__name__)
+
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+JWT_REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+# AUTH_TOKEN_MODE:
+#   lookup    - access tokens identify the user, who is read from the database (cached)
+#   stateless - the user claims embedded in the access token are trusted as-is;
+#               tokens are short-lived and renewed through /auth/refresh
+AUTH_TOKEN_MODE = os.getenv("AUTH_TOKEN_MODE", "lookup").lower()
+JWT_STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES", "5"))
+ACCESS_TOKEN_EXPIRE_MINUTES = (
+    JWT_STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES if AUTH_TOKEN_MODE == "stateless" else JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+)
 
 class AuthService:
     """Handle authentication operations"""
 
     @staticmethod
-    def hash_password(password: str) -> str:
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    async def hash_password(password: str) -> str:
+        """Hash password using bcrypt (on the hashing pool)"""
+        try:
+            return await password_hasher.hash(password)
+        except PasswordHasherBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts. Please try again shortly."
+            )
 
     @staticmethod
-    def verify_password(password: str, hashed_password: str) -> bool:
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    async def verify_password(password: str, hashed_password: str) -> bool:
+        """Verify password against hash (on the hashing pool)"""
+        try:
+            return await password_hasher.verify(password, hashed_password)
+        except PasswordHasherBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts. Please try again shortly."
+            )
 
     @staticmethod
     def create_access_token(data: Dict[str, Any]) -> str:
         """Create JWT access token"""
         to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire})
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        # Sub-second iat so a token issued right after a revocation is told apart from older ones
+        to_encode.update({"exp": expire, "iat": time.time(), "typ": "access"})
 
         encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
         return encoded_jwt
 
+    @staticmethod
+    def create_refresh_token(user_id: str) -> str:
+        """Create JWT refresh token
+
+        The jti lets /auth/refresh revoke the token once it has been exchanged;
+        sign-out revokes every token of the user issued before it.
+        """
+        to_encode = {
+            "user_id": user_id,
+            "exp": datetime.utcnow() + timedelta(days=JWT_REFRESH_TOKEN_EXPIRE_DAYS),
+            "iat": time.time(),
+            "jti": uuid.uuid4().hex,
+            "typ": "refresh",
+        }
+        return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+    def create_auth_response(self, user: Dict[str, Any]) -> AuthResponse:
+        """Issue access and refresh tokens for a user row"""
+        user_response = UserResponse(**user)
+        # Everything UserResponse needs besides id/email, for stateless verification
+        claims = user_response.model_dump(mode="json", exclude={"id", "email"})
+        token_data = {"user_id": user_response.id, "email": user_response.email, "usr": claims}
+        return AuthResponse(
+            user=user_response,
+            access_token=self.create_access_token(token_data),
+            refresh_token=self.create_refresh_token(user_response.id),
+            expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+
     @staticmethod
     def verify_token(token: str) -> Optional[Dict[str, Any]]:
         """Verify and decode JWT token"""
@@ -52,32 +112,8 @@ class AuthService:
     async def signup_user(self, signup_data: UserSignupRequest) -> AuthResponse:
         """Register new user"""
 
-        # Check if user already exists
-        existing_user = await db_manager.get_user_by_email(signup_data.email)
-        if existing_user is None:
-            # If None is returned, it could mean database is unavailable or user doesn't exist
-            # We can't distinguish, so for now we'll continue with user creation
-            pass
-        elif existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this email already exists"
-            )
-
-        # Check if username already exists
-        existing_username = await db_manager.get_user_by_username(signup_data.username)
-        if existing_username is None:
-            # If None is returned, it could mean database is unavailable or user doesn't exist
-            # We can't distinguish, so for now we'll continue with user creation
-            pass
-        elif existing_username:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username is already taken"
-            )
-
         # Hash password
-        hashed_password = self.hash_password(signup_data.password)
+        hashed_password = await self.hash_password(signup_data.password)
 
         # Prepare user data
         user_data = {
@@ -89,29 +125,30 @@ class AuthService:
             "is_active": True
         }
 
-        # Create user in database
-        created_user = await db_manager.create_user(user_data)
-        print(f"Created user: {created_user}")
+        # Create user in database: one insert, with the unique indexes on email
+        # and username detecting existing users (no racy check-then-insert)
+        try:
+            created_user = await db_manager.create_user(user_data)
+        except UserConflictError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User with this email already exists" if e.field == "email" else "Username is already taken"
+            )
         if not created_user:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Database service unavailable. Please configure Supabase environment variables."
             )
 
-        # Generate access token
-        token_data = {"user_id": created_user["id"], "email": created_user["email"]}
-        access_token = self.create_access_token(token_data)
+        # Generate tokens
+        return self.create_auth_response(created_user)
 
-        # Prepare response
-        user_response = UserResponse(**created_user)
-        return AuthResponse(
-            user=user_response,
-            access_token=access_token,
-            expires_in=JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60
-        )
+    async def signin_user(self, signin_data: UserSigninRequest, background_tasks: Optional[BackgroundTasks] = None) -> AuthResponse:
+        """Authenticate user login
 
-    async def signin_user(self, signin_data: UserSigninRequest) -> AuthResponse:
-        """Authenticate user login"""
+        Bookkeeping writes (last_login, hash upgrades) go to background_tasks
+        when given, so they run after the response is sent.
+        """
 
         # Get user from database using admin client (to bypass RLS)
         user = await db_manager.get_user_by_email_admin(signin_data.email)
@@ -122,7 +159,7 @@ class AuthService:
             )
 
         # Verify password
-        if not self.verify_password(signin_data.password, user["password_hash"]):
+        if not await self.verify_password(signin_data.password, user["password_hash"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
@@ -136,26 +173,83 @@ class AuthService:
             )
 
         # Update last login
-        await db_manager.update_last_login(user["id"])
+        await self._defer(background_tasks, db_manager.update_last_login, user["id"])
 
-        # Generate access token
-        token_data = {"user_id": user["id"], "email": user["email"]}
-        access_token = self.create_access_token(token_data)
+        # Upgrade hashes made with a different cost factor while the password is at hand
+        if password_hasher.needs_rehash(user["password_hash"]):
+            await self._defer(background_tasks, self._rehash_password, user["id"], signin_data.password)
 
-        # Prepare response
-        user_response = UserResponse(**user)
-        return AuthResponse(
-            user=user_response,
-            access_token=access_token,
-            expires_in=JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60
-        )
+        # Generate tokens
+        return self.create_auth_response(user)
+
+    @staticmethod
+    async def _defer(background_tasks: Optional[BackgroundTasks], func, *args):
+        """Run func after the response when background tasks are available, otherwise now"""
+        if background_tasks is not None:
+            background_tasks.add_task(func, *args)
+        else:
+            await func(*args)
+
+    async def _rehash_password(self, user_id: str, password: str):
+        """Store a new hash of the password at the configured cost"""
+        try:
+            new_hash = await password_hasher.hash(password)
+            if await db_manager.update_user(user_id, {"password_hash": new_hash}):
+                logger.info(f"Rehashed password of user {user_id} with cost {password_hasher.rounds}")
+        except Exception as e:
+            # The old hash still works, so sign-in goes ahead
+            logger.warning(f"Password rehash failed for user {user_id}: {e}")
+
+    async def refresh_tokens(self, refresh_token: str) -> AuthResponse:
+        """Exchange a refresh token for new tokens, re-reading the user"""
+
+        payload = self.verify_token(refresh_token)
+        if not payload or payload.get("typ") != "refresh" or not payload.get("user_id") or not payload.get("jti"):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+        if self._refresh_token_revoked(payload):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
+
+        # The database is the source of truth here, so a refresh picks up profile changes and deactivation
+        user = await db_manager.get_user_by_id_admin(payload["user_id"])
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        if not user["is_active"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Account is deactivated"
+            )
+
+        # Re-check after the lookup, then consume the token with no await in between
+        if self._refresh_token_revoked(payload):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
+        token_revocations.revoke(f"refresh:{payload['jti']}", ttl_seconds=JWT_REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+
+        return self.create_auth_response(user)
+
+    @staticmethod
+    def _refresh_token_revoked(payload: Dict[str, Any]) -> bool:
+        """Refresh token issued before a sign-out, or already exchanged"""
+        return (token_revocations.is_revoked(payload["user_id"], payload.get("iat"))
+                or token_revocations.is_revoked(f"refresh:{payload['jti']}", None))
 
     async def get_current_user(self, token: str) -> UserResponse:
         """Get current user from JWT token"""
 
-        # Verify token
+        # Verify token (refresh tokens are only accepted by /auth/refresh)
         payload = self.verify_token(token)
-        if not payload:
+        if not payload or payload.get("typ", "access") != "access":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication token"
@@ -169,14 +263,54 @@ class AuthService:
                 detail="Invalid token payload"
             )
 
-        user = await db_manager.get_user_by_id_admin(user_id)
-        if not user:
+        if token_revocations.is_revoked(user_id, payload.get("iat")):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
+                detail="Token has been revoked"
             )
 
-        return UserResponse(**user)
+        user_response = None
+        if AUTH_TOKEN_MODE == "stateless":
+            # Tokens issued before claims were embedded fall back to the lookup
+            user_response = self._user_from_claims(payload)
+
+        if user_response is None:
+            user_response = user_cache.get(user_id)
+
+        if user_response is None:
+            user = await db_manager.get_user_by_id_admin(user_id)
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found"
+                )
+            user_response = UserResponse(**user)
+            user_cache.set(user_id, user_response)
+
+        if not user_response.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Account is deactivated"
+            )
+
+        return user_response
+
+    @staticmethod
+    def _user_from_claims(payload: Dict[str, Any]) -> Optional[UserResponse]:
+        """UserResponse from the claims embedded by create_auth_response, if present"""
+        claims = payload.get("usr")
+        if not isinstance(claims, dict):
+            return None
+        try:
+            return UserResponse(id=payload["user_id"], email=payload.get("email"), **claims)
+        except (ValidationError, TypeError):
+            return None
+
+    def signout_user(self, user_id: str):
+        """Revoke the user's tokens issued so far and forget the cached user"""
+        # Kept for the refresh token lifetime so signed-out refresh tokens stay rejected
+        token_revocations.revoke(user_id, ttl_seconds=JWT_REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+        user_cache.invalidate(user_id)
 
 # Global instance
 auth_service = AuthService() 
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Free time computed from busy calendar intervals (working hours, minimum duration, timezones)
+"""
+
+from datetime import datetime, time as dt_time, timedelta
+from typing import Iterable, List, Optional, Dict, Any, Tuple
+import math
+import os
+import pytz
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Defaults for availability queries; each can be overridden per request
+CALENDAR_WORK_START = os.getenv("CALENDAR_WORK_START", "09:00")
+CALENDAR_WORK_END = os.getenv("CALENDAR_WORK_END", "18:00")
+CALENDAR_MIN_SLOT_MINUTES = int(os.getenv("CALENDAR_MIN_SLOT_MINUTES", "30"))
+# Free slots start on this grid (a meeting ending 10:07 frees time from 10:15)
+CALENDAR_SLOT_GRANULARITY_MINUTES = int(os.getenv("CALENDAR_SLOT_GRANULARITY_MINUTES", "15"))
+# Used when the calendar's own timezone is not known yet
+CALENDAR_DEFAULT_TIMEZONE = os.getenv("CALENDAR_DEFAULT_TIMEZONE", "Asia/Kolkata")
+
+# "tomorrow afternoon": the part of the day replaces working hours
+DAY_PARTS = {
+    'morning': (dt_time(8, 0), dt_time(12, 0)),
+    'afternoon': (dt_time(12, 0), dt_time(17, 0)),
+    'evening': (dt_time(17, 0), dt_time(21, 0)),
+}
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+def parse_clock(value: str) -> dt_time:
+    """'09:00' / '9:30' -> time; raises ValueError on anything else"""
+    hours, _, minutes = value.strip().partition(':')
+    return dt_time(int(hours), int(minutes or 0))
+
+def get_timezone(name: Optional[str]):
+    """pytz timezone by name; raises ValueError for unknown names"""
+    try:
+        return pytz.timezone(name or CALENDAR_DEFAULT_TIMEZONE)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone: {name}")
+
+def parse_availability_window(query: str, tz, now: datetime) -> Tuple[datetime, datetime, Optional[Tuple[dt_time, dt_time]]]:
+    """Days (in tz) and optional part of day asked for by a query like "tomorrow afternoon"
+
+    Returns (window_start, window_end, day_part). Without a recognised day
+    the window is the next 7 days; "weekend" is the coming Saturday and Sunday.
+    """
+    query_lower = query.lower()
+    today = now.astimezone(tz).date()
+
+    if 'today' in query_lower or 'tonight' in query_lower:
+        first_day, days = today, 1
+    elif 'tomorrow' in query_lower:
+        first_day, days = today + timedelta(days=1), 1
+    elif 'weekend' in query_lower:
+        # On a Sunday the window starts on Saturday; past slots are dropped by the caller
+        first_day, days = today + timedelta(days=5 - today.weekday()), 2
+        if 'next weekend' in query_lower and today.weekday() >= 5:
+            first_day += timedelta(days=7)
+    elif 'next week' in query_lower:
+        first_day, days = today + timedelta(days=7 - today.weekday()), 7
+    elif 'week' in query_lower:
+        first_day, days = today, 7
+    else:
+        weekday = next((i for i, name in enumerate(WEEKDAYS) if name in query_lower), None)
+        if weekday is not None:
+            offset = (weekday - today.weekday()) % 7
+            if offset == 0 and f"next {WEEKDAYS[weekday]}" in query_lower:
+                offset = 7
+            first_day, days = today + timedelta(days=offset), 1
+        else:
+            first_day, days = today, 7
+
+    day_part = next((hours for name, hours in DAY_PARTS.items() if name in query_lower), None)
+    if 'tonight' in query_lower:
+        day_part = DAY_PARTS['evening']
+
+    window_start = tz.localize(datetime.combine(first_day, dt_time(0, 0)))
+    window_end = tz.localize(datetime.combine(first_day + timedelta(days=days), dt_time(0, 0)))
+    return window_start, window_end, day_part
+
+def window_includes_weekends(window_start: datetime, window_end: datetime) -> bool:
+    """Whether a parsed window asks for weekend days itself: a single day or a weekend"""
+    first_day = window_start.date()
+    last_day = (window_end - timedelta(microseconds=1)).date()
+    return first_day == last_day or (first_day.weekday() == 5 and (last_day - first_day).days == 1)
+
+def merge_intervals(intervals: Iterable[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Sorted, non-overlapping union of (start, end) intervals"""
+    merged: List[List[float]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+def _round_up(timestamp: float, granularity_seconds: float) -> float:
+    if granularity_seconds <= 0:
+        return timestamp
+    return math.ceil(timestamp / granularity_seconds) * granularity_seconds
+
+def find_free_slots(busy: Iterable[Tuple[float, float]],
+                    window_start: datetime,
+                    window_end: datetime,
+                    tz,
+                    work_start: dt_time,
+                    work_end: dt_time,
+                    min_duration: timedelta,
+                    include_weekends: bool = False,
+                    granularity: timedelta = timedelta(minutes=CALENDAR_SLOT_GRANULARITY_MINUTES)) -> List[Dict[str, Any]]:
+    """Free slots of at least min_duration inside the daily [work_start, work_end) hours
+
+    busy holds (start, end) epoch seconds. Days are walked in tz so working
+    hours follow DST changes. Slots are returned in tz, ordered by start.
+    """
+    busy = merge_intervals(busy)
+    granularity_seconds = granularity.total_seconds()
+    min_seconds = min_duration.total_seconds()
+    window_from, window_to = window_start.timestamp(), window_end.timestamp()
+    slots = []
+
+    day = window_start.astimezone(tz).date()
+    last_day = window_end.astimezone(tz).date()
+    index = 0
+    while day <= last_day:
+        if include_weekends or day.weekday() < 5:
+            day_from = max(window_from, tz.localize(datetime.combine(day, work_start)).timestamp())
+            day_to = min(window_to, tz.localize(datetime.combine(day, work_end)).timestamp())
+            # Skip busy intervals that ended before this day's hours
+            while index < len(busy) and busy[index][1] <= day_from:
+                index += 1
+            cursor = day_from
+            position = index
+            while cursor < day_to:
+                free_until = day_to
+                if position < len(busy) and busy[position][0] < day_to:
+                    free_until = max(cursor, busy[position][0])
+                start = _round_up(cursor, granularity_seconds)
+                if free_until - start >= min_seconds:
+                    slots.append((start, free_until))
+                if free_until >= day_to:
+                    break
+                cursor = max(cursor, busy[position][1])
+                position += 1
+        day += timedelta(days=1)
+
+    return [
+        {
+            'start': datetime.fromtimestamp(start, tz).isoformat(),
+            'end': datetime.fromtimestamp(end, tz).isoformat(),
+            'duration_minutes': int((end - start) // 60),
+        }
+        for start, end in slots
+    ]
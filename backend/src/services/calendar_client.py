@@ -0,0 +1,130 @@
+"""
+Shared Google Calendar API client: one service object per process, per-user credentials per request
+"""
+
+from typing import Optional, Dict, Any
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+import httplib2
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Socket timeout for Calendar API and token refresh requests
+GOOGLE_API_TIMEOUT_SECONDS = float(os.getenv("GOOGLE_API_TIMEOUT_SECONDS", "30"))
+# Retries (with backoff) on 429/5xx and connection errors
+GOOGLE_API_NUM_RETRIES = int(os.getenv("GOOGLE_API_NUM_RETRIES", "2"))
+
+class CalendarClient:
+    """Lightweight per-user handle: builds requests on the shared service, sends them with the user's credentials"""
+
+    def __init__(self, factory: "CalendarClientFactory", credentials: Credentials):
+        self._factory = factory
+        self.credentials = credentials
+
+    def events(self):
+        """The shared events resource (requests built from it are sent via execute)"""
+        return self._factory.events
+
+    def execute(self, request, num_retries: Optional[int] = None) -> Dict[str, Any]:
+        """Send a request built on the shared service as this user"""
+        return self._factory.execute(request, self.credentials, num_retries)
+
+class CalendarClientFactory:
+    """Loads the bundled Calendar v3 discovery document once and reuses its service object
+
+    googleapiclient.discovery.build() re-reads and parses the discovery
+    document and creates a new HTTP connection on every call. Here the
+    service is built once without credentials; each request is sent through
+    an AuthorizedHttp wrapping the caller's credentials around a keep-alive
+    transport. httplib2 is not thread-safe, so there is one transport per
+    thread.
+    """
+
+    def __init__(self, timeout: float = GOOGLE_API_TIMEOUT_SECONDS, num_retries: int = GOOGLE_API_NUM_RETRIES):
+        self.timeout = timeout
+        self.num_retries = num_retries
+        self._service = None
+        self._events = None
+        self._build_lock = threading.Lock()
+        self._local = threading.local()
+        self._transports = 0
+        self.build_ms = 0.0
+        self.clients = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def _build(self):
+        started = time.perf_counter()
+        # Requests always pass their own http to execute(); this one is only a placeholder
+        service = build_from_document(get_static_doc('calendar', 'v3'), http=httplib2.Http(timeout=self.timeout))
+        self._events = service.events()
+        self._service = service
+        self.build_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"📅 Calendar API service built from bundled discovery document in {self.build_ms:.1f}ms")
+
+    @property
+    def service(self):
+        """The process-wide Calendar v3 service object"""
+        if self._service is None:
+            with self._build_lock:
+                if self._service is None:
+                    self._build()
+        return self._service
+
+    @property
+    def events(self):
+        """The process-wide events resource"""
+        if self._events is None:
+            self.service
+        return self._events
+
+    def transport(self) -> httplib2.Http:
+        """Keep-alive HTTP transport of the current thread"""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = httplib2.Http(timeout=self.timeout)
+            self._local.http = http
+            self._transports += 1
+        return http
+
+    def for_user(self, credentials: Credentials) -> CalendarClient:
+        """Client that sends requests with these credentials (refreshed on demand by AuthorizedHttp)"""
+        self.clients += 1
+        return CalendarClient(self, credentials)
+
+    def execute(self, request, credentials: Credentials, num_retries: Optional[int] = None) -> Dict[str, Any]:
+        """Send a request built on the shared service with the given credentials"""
+        started = time.perf_counter()
+        try:
+            return request.execute(
+                http=AuthorizedHttp(credentials, http=self.transport()),
+                num_retries=self.num_retries if num_retries is None else num_retries
+            )
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.requests += 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Build time and request counters"""
+        return {
+            "service_built": self._service is not None,
+            "build_ms": round(self.build_ms, 1),
+            "transports": self._transports,
+            "clients": self.clients,
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+        }
+
+# Global instance
+calendar_client_factory = CalendarClientFactory()
@@ -0,0 +1,78 @@
+"""
+Interval index over a user's calendar events for range, next-N and conflict queries
+"""
+
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import islice
+from typing import Iterable, List, Optional, Dict, Any, Tuple
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Events longer than this (all-day, multi-day) are kept apart so they do not widen every range scan
+CALENDAR_INDEX_LONG_EVENT_SECONDS = float(os.getenv("CALENDAR_INDEX_LONG_EVENT_SECONDS", "86400"))
+
+Interval = Tuple[float, float, Dict[str, Any]]
+
+def blocks_time(event: Dict[str, Any]) -> bool:
+    """True if an event makes the user busy (timed, not marked free and not declined by them)
+
+    All-day events (holidays, birthdays, day notes) never block time.
+    """
+    if event.get('transparency') == 'transparent' or event.get('status') == 'cancelled':
+        return False
+    if 'date' in event.get('start', {}):
+        return False
+    for attendee in event.get('attendees', []):
+        if attendee.get('self') and attendee.get('responseStatus') == 'declined':
+            return False
+    return True
+
+def _start_key(interval: Interval) -> float:
+    return interval[0]
+
+class EventIntervalIndex:
+    """Immutable index of (start, end, event) intervals in epoch seconds
+
+    Short events live in arrays sorted by start; an event overlapping
+    [a, b) must start before b and, being at most max_short long, after
+    a - max_short, so two bisects bound the scan. The few long events are
+    checked directly.
+    """
+
+    def __init__(self, intervals: Iterable[Interval], long_event_seconds: float = CALENDAR_INDEX_LONG_EVENT_SECONDS):
+        short, long = [], []
+        for interval in intervals:
+            (long if interval[1] - interval[0] > long_event_seconds else short).append(interval)
+        short.sort(key=_start_key)
+        long.sort(key=_start_key)
+        self._starts = [interval[0] for interval in short]
+        self._short = short
+        self._long = long
+        self._max_short = max((end - start for start, end, _ in short), default=0.0)
+
+    def __len__(self) -> int:
+        return len(self._short) + len(self._long)
+
+    def overlapping(self, start: float, end: float) -> List[Interval]:
+        """Intervals overlapping [start, end), ordered by start"""
+        lo = bisect_right(self._starts, start - self._max_short)
+        hi = bisect_left(self._starts, end)
+        short = [interval for interval in self._short[lo:hi] if interval[1] > start]
+        long = [interval for interval in self._long if interval[0] < end and interval[1] > start]
+        return list(merge(short, long, key=_start_key)) if long else short
+
+    def next_after(self, after: float, count: int) -> List[Interval]:
+        """The first `count` intervals starting at or after `after`, ordered by start"""
+        short = self._short[bisect_left(self._starts, after):]
+        long = (interval for interval in self._long if interval[0] >= after)
+        return list(islice(merge(short, long, key=_start_key), count))
+
+    def conflicts(self, start: float, end: float, exclude_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Busy events overlapping [start, end), other than `exclude_id`"""
+        return [
+            event for _, _, event in self.overlapping(start, end)
+            if event.get('id') != exclude_id and blocks_time(event)
+        ]
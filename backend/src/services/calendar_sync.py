@@ -0,0 +1,313 @@
+"""
+Per-user local copy of Google Calendar events, kept current with syncToken incremental sync
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+from google.auth.exceptions import RefreshError
+from googleapiclient.errors import HttpError
+from src.services.calendar_index import EventIntervalIndex, blocks_time
+import os
+import threading
+import time
+import pytz
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Users whose events are kept in memory (least recently queried are dropped); 0 disables the store
+CALENDAR_SYNC_MAX_USERS = int(os.getenv("CALENDAR_SYNC_MAX_USERS", "1000"))
+# Queries accept a store synced this long ago; older stores fetch the changes first
+CALENDAR_SYNC_MAX_STALENESS_SECONDS = float(os.getenv("CALENDAR_SYNC_MAX_STALENESS_SECONDS", "60"))
+# Events that ended longer ago than this are dropped from the store
+CALENDAR_SYNC_RETENTION_DAYS = float(os.getenv("CALENDAR_SYNC_RETENTION_DAYS", "7"))
+CALENDAR_SYNC_PAGE_SIZE = int(os.getenv("CALENDAR_SYNC_PAGE_SIZE", "250"))
+
+def _parse_event_time(value: Dict[str, Any], timezone: str) -> Optional[float]:
+    """Epoch seconds of an event start/end; all-day dates are midnight in the calendar's timezone"""
+    if value.get('dateTime'):
+        return datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00')).timestamp()
+    if value.get('date'):
+        try:
+            tz = pytz.timezone(timezone)
+        except pytz.UnknownTimeZoneError:
+            tz = pytz.UTC
+        return tz.localize(datetime.fromisoformat(value['date'])).timestamp()
+    return None
+
+def event_bounds(event: Dict[str, Any], timezone: str = 'UTC') -> Optional[Tuple[float, float]]:
+    """(start, end) of a Google event in epoch seconds, or None if it has no usable times"""
+    try:
+        start = _parse_event_time(event.get('start', {}), timezone)
+        end = _parse_event_time(event.get('end', {}), timezone)
+    except ValueError:
+        return None
+    if start is None:
+        return None
+    return start, max(start, end if end is not None else start)
+
+class _UserCalendar:
+    """Events of one user's primary calendar and the sync token they are current at"""
+
+    __slots__ = ("events", "index", "sync_token", "timezone", "synced_at", "lock")
+
+    def __init__(self):
+        # event id -> (start, end, event); replaced, never mutated, so reads need no lock
+        self.events: Dict[str, Tuple[float, float, Dict[str, Any]]] = {}
+        # Interval index over the same events, replaced together with them
+        self.index = EventIntervalIndex(())
+        self.sync_token: Optional[str] = None
+        self.timezone = 'UTC'
+        # time.monotonic() of the last successful sync, 0 when never synced or marked stale
+        self.synced_at = 0.0
+        # Held for a sync so concurrent queries of the same user wait for it instead of syncing again
+        self.lock = threading.Lock()
+
+class _SyncTokenExpired(Exception):
+    """Google answered 410 Gone: the sync token is no longer valid"""
+
+class CalendarSync:
+    """Answers calendar range queries from a local store, fetching only changes from Google
+
+    The first query of a user downloads the calendar once (full sync) and
+    keeps the nextSyncToken; later queries older than their staleness bound
+    send the token and apply only the changed or cancelled events. When
+    Google expires the token (410 Gone) the store is rebuilt with a full
+    sync. Methods block on HTTP, so call them from a worker thread.
+    """
+
+    def __init__(self,
+                 max_users: int = CALENDAR_SYNC_MAX_USERS,
+                 max_staleness: float = CALENDAR_SYNC_MAX_STALENESS_SECONDS,
+                 retention_days: float = CALENDAR_SYNC_RETENTION_DAYS,
+                 page_size: int = CALENDAR_SYNC_PAGE_SIZE):
+        self.max_users = max_users
+        self.max_staleness = max_staleness
+        self.retention_seconds = retention_days * 86400
+        self.page_size = page_size
+        self.enabled = max_users > 0
+        self._users: "OrderedDict[str, _UserCalendar]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.store_hits = 0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.token_expirations = 0
+        self.events_fetched = 0
+        self.stale_served = 0
+        self.evictions = 0
+
+    def _entry(self, user_id: str) -> _UserCalendar:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                entry = _UserCalendar()
+                self._users[user_id] = entry
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+                    self.evictions += 1
+            self._users.move_to_end(user_id)
+            return entry
+
+    def _list(self, client, **params) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+        """All pages of an events().list call: (items, nextSyncToken, calendar timezone)"""
+        items = []
+        page_token = None
+        while True:
+            try:
+                response = client.execute(client.events().list(
+                    calendarId='primary',
+                    singleEvents=True,
+                    maxResults=self.page_size,
+                    pageToken=page_token,
+                    **params
+                ))
+            except HttpError as e:
+                if e.resp.status == 410:
+                    raise _SyncTokenExpired() from e
+                raise
+            items.extend(response.get('items', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                self.events_fetched += len(items)
+                return items, response.get('nextSyncToken'), response.get('timeZone')
+
+    def _apply(self, events: Dict[str, Tuple[float, float, Dict[str, Any]]], items: List[Dict[str, Any]], timezone: str):
+        for event in items:
+            event_id = event.get('id')
+            if not event_id:
+                continue
+            bounds = event_bounds(event, timezone) if event.get('status') != 'cancelled' else None
+            if bounds is None:
+                events.pop(event_id, None)
+            else:
+                events[event_id] = (bounds[0], bounds[1], event)
+
+    def _full_sync(self, entry: _UserCalendar, client):
+        items, sync_token, timezone = self._list(client)
+        entry.timezone = timezone or entry.timezone
+        events = {}
+        self._apply(events, items, entry.timezone)
+        self._publish(entry, events)
+        entry.sync_token = sync_token
+        self.full_syncs += 1
+
+    def _sync(self, entry: _UserCalendar, client):
+        if entry.sync_token:
+            try:
+                items, sync_token, timezone = self._list(client, syncToken=entry.sync_token)
+                entry.timezone = timezone or entry.timezone
+                events = dict(entry.events)
+                self._apply(events, items, entry.timezone)
+                self._publish(entry, events)
+                entry.sync_token = sync_token or entry.sync_token
+                self.incremental_syncs += 1
+            except _SyncTokenExpired:
+                logger.info("📅 Calendar sync token expired, running a full sync")
+                self.token_expirations += 1
+                self._full_sync(entry, client)
+        else:
+            self._full_sync(entry, client)
+        entry.synced_at = time.monotonic()
+
+    def _publish(self, entry: _UserCalendar, events: Dict[str, Tuple[float, float, Dict[str, Any]]]):
+        """Swap in a new event map and index (readers keep using the old ones without locking)"""
+        cutoff = time.time() - self.retention_seconds
+        events = {event_id: value for event_id, value in events.items() if value[1] >= cutoff}
+        index = EventIntervalIndex(events.values())
+        entry.events, entry.index = events, index
+
+    def _ensure_fresh(self, user_id: str, client, max_staleness: Optional[float]) -> _UserCalendar:
+        """The user's store, synced first if it is older than max_staleness seconds"""
+        max_staleness = self.max_staleness if max_staleness is None else max_staleness
+        entry = self._entry(user_id)
+        self.queries += 1
+        requested_at = time.monotonic()
+        if entry.synced_at and requested_at - entry.synced_at <= max_staleness:
+            self.store_hits += 1
+            return entry
+        with entry.lock:
+            # A sync that finished while this query waited is fresh enough for it
+            if entry.synced_at >= requested_at:
+                self.store_hits += 1
+                return entry
+            try:
+                self._sync(entry, client)
+            except Exception as e:
+                if isinstance(e, RefreshError) or (isinstance(e, HttpError) and e.resp.status in (401, 403)):
+                    # Access was revoked; keep nothing of this user's calendar
+                    self.forget(user_id)
+                    raise
+                if entry.sync_token is None:
+                    raise
+                logger.warning(f"📅 Calendar sync failed, answering from the store: {e}")
+                self.stale_served += 1
+        return entry
+
+    def get_events(self,
+                   user_id: str,
+                   client,
+                   start_time: datetime,
+                   end_time: datetime,
+                   max_results: int = 50,
+                   max_staleness: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Events overlapping [start_time, end_time), ordered by start (like events().list with orderBy=startTime)"""
+        entry = self._ensure_fresh(user_id, client, max_staleness)
+        matches = entry.index.overlapping(start_time.timestamp(), end_time.timestamp())
+        return [event for _, _, event in matches[:max_results]]
+
+    def next_events(self,
+                    user_id: str,
+                    client,
+                    after: datetime,
+                    count: int,
+                    max_staleness: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The next `count` events starting at or after `after`"""
+        entry = self._ensure_fresh(user_id, client, max_staleness)
+        return [event for _, _, event in entry.index.next_after(after.timestamp(), count)]
+
+    def busy_intervals(self,
+                       user_id: str,
+                       client,
+                       start_time: datetime,
+                       end_time: datetime,
+                       max_staleness: Optional[float] = None) -> List[Tuple[float, float]]:
+        """(start, end) epoch seconds of busy events overlapping [start_time, end_time)"""
+        entry = self._ensure_fresh(user_id, client, max_staleness)
+        return [
+            (start, end) for start, end, event in entry.index.overlapping(start_time.timestamp(), end_time.timestamp())
+            if blocks_time(event)
+        ]
+
+    def calendar_timezone(self, user_id: str, client, max_staleness: Optional[float] = None) -> str:
+        """Timezone of the user's primary calendar (syncs first when the store is stale)"""
+        return self._ensure_fresh(user_id, client, max_staleness).timezone
+
+    def _synced_entry(self, user_id: str) -> Optional[_UserCalendar]:
+        with self._lock:
+            entry = self._users.get(user_id)
+        return entry if entry is not None and entry.sync_token is not None else None
+
+    def find_conflicts(self,
+                       user_id: str,
+                       start_time: datetime,
+                       end_time: datetime,
+                       exclude_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Busy events overlapping [start_time, end_time) from the store, without calling Google
+
+        None when the user's calendar has not been synced in this process.
+        """
+        entry = self._synced_entry(user_id)
+        if entry is None:
+            return None
+        return entry.index.conflicts(start_time.timestamp(), end_time.timestamp(), exclude_id)
+
+    def double_bookings(self, user_id: str, events: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Event id -> other busy events it overlaps, for events taken from the store"""
+        entry = self._synced_entry(user_id)
+        if entry is None:
+            return {}
+        bookings = {}
+        for event in events:
+            stored = entry.events.get(event.get('id'))
+            if stored is None or not blocks_time(event):
+                continue
+            conflicts = entry.index.conflicts(stored[0], stored[1], event['id'])
+            if conflicts:
+                bookings[event['id']] = conflicts
+        return bookings
+
+    def mark_stale(self, user_id: str):
+        """Make the next query of this user fetch changes (e.g. after creating an event)"""
+        with self._lock:
+            entry = self._users.get(user_id)
+        if entry is not None:
+            entry.synced_at = 0.0
+
+    def forget(self, user_id: str):
+        """Drop a user's events (calendar disconnected or reconnected)"""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Store size and sync counters"""
+        with self._lock:
+            events = sum(len(entry.events) for entry in self._users.values())
+            users = len(self._users)
+        return {
+            "enabled": self.enabled,
+            "users": users,
+            "events": events,
+            "queries": self.queries,
+            "store_hits": self.store_hits,
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+            "token_expirations": self.token_expirations,
+            "events_fetched": self.events_fetched,
+            "stale_served": self.stale_served,
+            "evictions": self.evictions,
+        }
+
+# Global instance
+calendar_sync = CalendarSync()
@@ -0,0 +1,294 @@
+"""
+Cached Google OAuth credentials per user, refreshed before they expire and persisted once
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import Request
+import asyncio
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# Users whose credentials are kept in memory (least recently used are dropped)
+CALENDAR_TOKEN_CACHE_MAX_USERS = int(os.getenv("CALENDAR_TOKEN_CACHE_MAX_USERS", "1000"))
+# Cached integrations are re-read after this long, so a disconnect in another worker is picked up
+CALENDAR_TOKEN_CACHE_TTL_SECONDS = float(os.getenv("CALENDAR_TOKEN_CACHE_TTL_SECONDS", "300"))
+# A request refreshes inline when its token has less than this left (google-auth itself refreshes at 3m45s)
+CALENDAR_TOKEN_REFRESH_MARGIN_SECONDS = float(os.getenv("CALENDAR_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+# The background job refreshes tokens of recently active users this long before expiry
+CALENDAR_TOKEN_REFRESH_AHEAD_SECONDS = float(os.getenv("CALENDAR_TOKEN_REFRESH_AHEAD_SECONDS", "600"))
+CALENDAR_TOKEN_REFRESH_INTERVAL_SECONDS = float(os.getenv("CALENDAR_TOKEN_REFRESH_INTERVAL_SECONDS", "60"))
+# Users idle for longer are left for an inline refresh on their next request
+CALENDAR_TOKEN_ACTIVE_SECONDS = float(os.getenv("CALENDAR_TOKEN_ACTIVE_SECONDS", "1800"))
+
+def _parse_expiry(value: Optional[str]) -> Optional[datetime]:
+    """Stored token_expires_at -> naive UTC datetime (what google-auth expects)"""
+    if not value:
+        return None
+    try:
+        expiry = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if expiry.tzinfo is not None:
+        expiry = expiry.astimezone(timezone.utc).replace(tzinfo=None)
+    return expiry
+
+class _CachedCredentials:
+    """One user's credentials, integration row and the access token last written to the database"""
+
+    __slots__ = ("credentials", "integration", "stored_token", "loaded_at", "used_at", "lock")
+
+    def __init__(self, credentials: Credentials, integration: Dict[str, Any]):
+        self.credentials = credentials
+        # Integration row without the token columns
+        self.integration = integration
+        self.stored_token = credentials.token
+        self.loaded_at = self.used_at = time.monotonic()
+        # Held while refreshing so concurrent requests for the user share one refresh
+        self.lock = threading.Lock()
+
+    def seconds_left(self) -> Optional[float]:
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return None
+        return (expiry - datetime.utcnow()).total_seconds()
+
+class CalendarTokenManager:
+    """Hands out Google credentials per user without a database read or token refresh per call
+
+    Credentials are decrypted once and cached. A token close to expiry is
+    refreshed inline (one refresh per user however many requests wait on
+    it); tokens of active users are refreshed ahead of time by a background
+    job. Refreshed tokens, including ones google-auth refreshed on a 401,
+    are written back with calendar_db.update_tokens, which only touches an
+    active integration. Entries are re-read from the database after
+    CALENDAR_TOKEN_CACHE_TTL_SECONDS so other workers' disconnects apply.
+    """
+
+    def __init__(self,
+                 max_users: int = CALENDAR_TOKEN_CACHE_MAX_USERS,
+                 ttl_seconds: float = CALENDAR_TOKEN_CACHE_TTL_SECONDS,
+                 refresh_margin: float = CALENDAR_TOKEN_REFRESH_MARGIN_SECONDS,
+                 refresh_ahead: float = CALENDAR_TOKEN_REFRESH_AHEAD_SECONDS,
+                 refresh_interval: float = CALENDAR_TOKEN_REFRESH_INTERVAL_SECONDS,
+                 active_seconds: float = CALENDAR_TOKEN_ACTIVE_SECONDS):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.refresh_ahead = refresh_ahead
+        self.refresh_interval = refresh_interval
+        self.active_seconds = active_seconds
+        self._users: "OrderedDict[str, _CachedCredentials]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_task = None
+        self.hits = 0
+        self.loads = 0
+        self.refreshes = 0
+        self.background_refreshes = 0
+        self.coalesced = 0
+        self.refresh_failures = 0
+        self.persisted = 0
+
+    def _cached(self, user_id: str) -> Optional[_CachedCredentials]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                self._users.move_to_end(user_id)
+            return entry
+
+    def _remember(self, user_id: str, entry: _CachedCredentials):
+        with self._lock:
+            self._users[user_id] = entry
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    async def _load(self, user_id: str) -> Optional[_CachedCredentials]:
+        """Read and decrypt the user's integration"""
+        from src.database.calendar_operations import calendar_db
+        from src.services.google_calendar_service import google_calendar_service
+
+        integration = await calendar_db.get_user_calendar_integration(user_id)
+        if not integration:
+            return None
+        self.loads += 1
+        refresh_token = integration.get('refresh_token')
+        credentials = Credentials(
+            token=google_calendar_service.decrypt_token(integration['access_token']),
+            refresh_token=google_calendar_service.decrypt_token(refresh_token) if refresh_token else None,
+            token_uri=GOOGLE_TOKEN_URI,
+            client_id=google_calendar_service.client_id,
+            client_secret=google_calendar_service.client_secret,
+            scopes=(integration.get('scope') or '').split() or google_calendar_service.scopes
+        )
+        credentials.expiry = _parse_expiry(integration.get('token_expires_at'))
+        row = {key: value for key, value in integration.items() if key not in ('access_token', 'refresh_token')}
+        return _CachedCredentials(credentials, row)
+
+    async def _entry(self, user_id: str) -> Optional[_CachedCredentials]:
+        entry = self._cached(user_id)
+        if entry is not None and self.ttl_seconds > 0 and time.monotonic() - entry.loaded_at > self.ttl_seconds:
+            entry = None
+        if entry is None:
+            entry = await self._load(user_id)
+            if entry is None:
+                # Disconnected (possibly by another worker): stop serving the cached credentials
+                self.forget(user_id)
+                return None
+            self._remember(user_id, entry)
+        else:
+            self.hits += 1
+        entry.used_at = time.monotonic()
+        return entry
+
+    def _refresh_locked(self, entry: _CachedCredentials, margin: float) -> bool:
+        """Refresh unless another caller already did; True if this call refreshed (blocking HTTP)"""
+        from src.services.calendar_client import calendar_client_factory
+
+        with entry.lock:
+            seconds_left = entry.seconds_left()
+            if seconds_left is not None and seconds_left > margin:
+                self.coalesced += 1
+                return False
+            entry.credentials.refresh(Request(calendar_client_factory.transport()))
+            return True
+
+    async def _refresh(self, user_id: str, entry: _CachedCredentials, margin: float) -> bool:
+        try:
+            refreshed = await asyncio.to_thread(self._refresh_locked, entry, margin)
+        except Exception:
+            self.refresh_failures += 1
+            raise
+        if refreshed:
+            self.refreshes += 1
+            logger.info(f"📅 Refreshed Google access token for user {user_id}")
+        return refreshed
+
+    async def _persist(self, user_id: str, entry: _CachedCredentials):
+        """Write a token refreshed since the last write"""
+        from src.database.calendar_operations import calendar_db
+
+        credentials = entry.credentials
+        token = credentials.token
+        if token == entry.stored_token:
+            return
+        # Entry replaced or forgotten while refreshing (reconnect or disconnect)
+        if self._cached(user_id) is not entry:
+            return
+        updated = await calendar_db.update_tokens(
+            user_id=user_id,
+            access_token=token,
+            refresh_token=credentials.refresh_token,
+            expires_at=credentials.expiry.isoformat() if credentials.expiry else None
+        )
+        if updated:
+            entry.stored_token = token
+            self.persisted += 1
+        else:
+            # No active integration left (or the write failed): re-read it on the next call
+            logger.warning(f"📅 Could not store refreshed token for user {user_id}; dropping cached credentials")
+            if self._cached(user_id) is entry:
+                self.forget(user_id)
+
+    async def get_credentials(self, user_id: str) -> Optional[Credentials]:
+        """Valid credentials for the user, or None without a connected calendar
+
+        Raises google.auth.exceptions.RefreshError when the grant was revoked.
+        """
+        entry = await self._entry(user_id)
+        if entry is None:
+            return None
+        seconds_left = entry.seconds_left()
+        if seconds_left is not None and seconds_left <= self.refresh_margin and entry.credentials.refresh_token:
+            await self._refresh(user_id, entry, self.refresh_margin)
+        await self._persist(user_id, entry)
+        return entry.credentials
+
+    async def get_integration(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The user's integration row (without tokens), or None without a connected calendar"""
+        entry = await self._entry(user_id)
+        return entry.integration if entry is not None else None
+
+    def forget(self, user_id: str):
+        """Drop cached credentials (calendar connected again or disconnected)"""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    async def refresh_expiring(self) -> int:
+        """Refresh tokens of recently active users that expire soon; returns the number refreshed"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                (user_id, entry) for user_id, entry in self._users.items()
+                if now - entry.used_at <= self.active_seconds and entry.credentials.refresh_token
+            ]
+        refreshed = 0
+        for user_id, entry in candidates:
+            seconds_left = entry.seconds_left()
+            if seconds_left is None or seconds_left > self.refresh_ahead:
+                continue
+            try:
+                if await self._refresh(user_id, entry, self.refresh_ahead):
+                    refreshed += 1
+                    self.background_refreshes += 1
+                await self._persist(user_id, entry)
+            except Exception as e:
+                logger.error(f"📅 Background token refresh failed for user {user_id}: {e}")
+        return refreshed
+
+    def start_refresh_job(self):
+        """Start the background refresh loop"""
+        if self._refresh_task is not None:
+            return
+        if self.refresh_interval <= 0:
+            logger.info("Calendar token refresh job disabled (CALENDAR_TOKEN_REFRESH_INTERVAL_SECONDS <= 0)")
+            return
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop_refresh_job(self):
+        """Cancel the background refresh loop"""
+        if self._refresh_task is None:
+            return
+        self._refresh_task.cancel()
+        try:
+            await self._refresh_task
+        except asyncio.CancelledError:
+            pass
+        self._refresh_task = None
+
+    async def _refresh_loop(self):
+        """Run refresh_expiring periodically until cancelled"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh_expiring()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Calendar token refresh failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size and refresh counters"""
+        with self._lock:
+            users = len(self._users)
+        return {
+            "users": users,
+            "hits": self.hits,
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+            "background_refreshes": self.background_refreshes,
+            "coalesced": self.coalesced,
+            "refresh_failures": self.refresh_failures,
+            "persisted": self.persisted,
+        }
+
+# Global instance
+calendar_tokens = CalendarTokenManager()
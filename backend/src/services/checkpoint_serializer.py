@@ -0,0 +1,97 @@
+"""
+Compact checkpoint serializer: msgpack encoding with optional zstd compression
+"""
+
+from typing import Any, Tuple
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+except ImportError as e:
+    logger.warning(f"LangGraph serializer not available: {e}")
+    JsonPlusSerializer = None
+
+# zstandard is optional - without it the compact serializer only forces msgpack
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# CHECKPOINT_SERIALIZER: "compact" enables this serializer, "default" keeps LangGraph's
+CHECKPOINT_SERIALIZER = os.getenv("CHECKPOINT_SERIALIZER", "default").lower()
+CHECKPOINT_COMPRESSION_LEVEL = int(os.getenv("CHECKPOINT_COMPRESSION_LEVEL", "3"))
+# Payloads smaller than this are stored uncompressed; zstd framing costs more than it saves
+CHECKPOINT_COMPRESSION_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESSION_MIN_BYTES", "512"))
+
+ZSTD_SUFFIX = "+zstd"
+
+if JsonPlusSerializer is not None:
+
+    class CompactCheckpointSerializer(JsonPlusSerializer):
+        """JsonPlusSerializer that zstd-compresses large msgpack payloads
+
+        LangChain messages are encoded through JsonPlusSerializer's msgpack
+        extension types, so they round-trip as the original message classes.
+        Compressed payloads are tagged with a "+zstd" type suffix, which keeps
+        checkpoints written by the default serializer readable.
+        """
+
+        def __init__(self,
+                     level: int = CHECKPOINT_COMPRESSION_LEVEL,
+                     min_bytes: int = CHECKPOINT_COMPRESSION_MIN_BYTES,
+                     **kwargs):
+            super().__init__(**kwargs)
+            self.level = level
+            self.min_bytes = min_bytes
+            # zstd contexts are not safe to share across threads
+            self._local = threading.local()
+
+        def _compressor(self):
+            compressor = getattr(self._local, "compressor", None)
+            if compressor is None:
+                compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+            return compressor
+
+        def _decompressor(self):
+            decompressor = getattr(self._local, "decompressor", None)
+            if decompressor is None:
+                decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+            return decompressor
+
+        def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+            type_, data = super().dumps_typed(obj)
+            if not ZSTD_AVAILABLE or type_ not in ("msgpack", "json") or len(data) < self.min_bytes:
+                return type_, data
+            compressed = self._compressor().compress(data)
+            if len(compressed) >= len(data):
+                return type_, data
+            return type_ + ZSTD_SUFFIX, compressed
+
+        def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+            type_, payload = data
+            if type_.endswith(ZSTD_SUFFIX):
+                if not ZSTD_AVAILABLE:
+                    raise RuntimeError("Checkpoint is zstd-compressed but the zstandard package is not installed")
+                type_ = type_[:-len(ZSTD_SUFFIX)]
+                payload = self._decompressor().decompress(payload)
+            return super().loads_typed((type_, payload))
+
+else:
+    CompactCheckpointSerializer = None
+
+def get_checkpoint_serializer():
+    """Serializer for checkpointers, or None to use LangGraph's default"""
+    if CHECKPOINT_SERIALIZER != "compact":
+        return None
+    if CompactCheckpointSerializer is None:
+        logger.warning("CHECKPOINT_SERIALIZER=compact requested but LangGraph serializer is unavailable")
+        return None
+    if not ZSTD_AVAILABLE:
+        logger.warning("zstandard not installed - compact checkpoint serializer will not compress")
+    return CompactCheckpointSerializer()
@@ -4,12 +4,11 @@ Google Calendar service for OAuth2 and calendar operations
 
 import os
 import json
-from google.auth.transport.requests import Request
+import asyncio
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Dict, Any, List
 from cryptography.fernet import Fernet
 import logging
 
@@ -141,53 +140,21 @@ class GoogleCalendarService:
         return stored_token  # Return token as-is
 
     async def create_calendar_event(self,
-                                  access_token: str,
-                                  refresh_token: Optional[str],
+                                  credentials: Credentials,
                                   event_title: str,
                                   event_description: str = "",
                                   start_time: str = "",
                                   end_time: str = "") -> Dict[str, Any]:
-        """Create a calendar event using Google Calendar API"""
+        """Create a calendar event using Google Calendar API
+
+        credentials come from calendar_tokens, which refreshes and stores them.
+        """
         try:
             logger.info(f"📅 Creating calendar event: {event_title}")
-            logger.info(f"📅 Has refresh_token: {'✅' if refresh_token else '❌'}")
-            
-            # Create credentials with ALL required fields for token refresh
-            creds = Credentials(
-                token=access_token,
-                refresh_token=refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",  # Required for refresh
-                client_id=self.client_id,
-                client_secret=self.client_secret,
-                scopes=self.scopes
-            )
-
-            logger.info(f"📅 Credentials created - Valid: {creds.valid}, Expired: {creds.expired}")
-
-            # Refresh token if needed and possible
-            if creds.expired and refresh_token:
-                logger.info("📅 Credentials expired, attempting refresh...")
-                try:
-                    creds.refresh(Request())
-                    logger.info("📅 Successfully refreshed credentials")
-                except Exception as refresh_error:
-                    logger.error(f"📅 Failed to refresh credentials: {refresh_error}")
-                    return {
-                        'success': False,
-                        'error': f"Failed to refresh access token: {refresh_error}",
-                        'message': f"❌ Failed to refresh access token: {refresh_error}"
-                    }
-            elif creds.expired and not refresh_token:
-                logger.error("📅 Credentials expired but no refresh token available")
-                return {
-                    'success': False,
-                    'error': "Access token expired and no refresh token available",
-                    'message': "❌ Access token expired. Please reconnect your Google Calendar."
-                }
 
-            # Build Calendar API service
-            logger.info("📅 Building Calendar API service...")
-            service = build('calendar', 'v3', credentials=creds)
+            # Reuse the shared Calendar API service with this user's credentials
+            from src.services.calendar_client import calendar_client_factory
+            client = calendar_client_factory.for_user(credentials)
 
             # Create the event object with proper timezone and Google Meet
             event = {
@@ -217,11 +184,12 @@ class GoogleCalendarService:
 
             logger.info(f"📅 Inserting event into calendar with Google Meet...")
             # Insert the event with conference data support
-            created_event = service.events().insert(
+            # Not retried: a repeated insert could create the event twice
+            created_event = await asyncio.to_thread(client.execute, client.events().insert(
                 calendarId='primary', 
                 body=event,
                 conferenceDataVersion=1  # Required for Google Meet integration
-            ).execute()
+            ), 0)
             logger.info(f"📅 Event created successfully: {created_event.get('id')}")
             
             # Extract Google Meet link if available
@@ -256,33 +224,6 @@ class GoogleCalendarService:
                 'message': f"❌ Failed to create calendar event: {e}"
             }
 
-    async def update_stored_tokens_if_refreshed(self, user_id: str, credentials: Credentials):
-        """Update stored tokens if they were refreshed"""
-        try:
-            from src.database.calendar_operations import calendar_db
-            
-            # Check if tokens were refreshed (new access_token)
-            if credentials.token:
-                logger.info(f"📅 Updating stored tokens for user: {user_id}")
-                
-                # Get current integration
-                current_integration = await calendar_db.get_user_calendar_integration(user_id)
-                if current_integration and current_integration.get('access_token') != credentials.token:
-                    logger.info("📅 Access token was refreshed, updating database...")
-                    
-                    # Update with new tokens
-                    await calendar_db.store_calendar_integration(
-                        user_id=user_id,
-                        access_token=credentials.token,
-                        refresh_token=credentials.refresh_token or current_integration.get('refresh_token'),
-                        expires_at=credentials.expiry.isoformat() if credentials.expiry else None,
-                        scopes=credentials.scopes or []
-                    )
-                    logger.info("📅 Successfully updated stored tokens")
-                    
-        except Exception as e:
-            logger.error(f"📅 Failed to update stored tokens: {e}")
-
     def parse_natural_language_event(self, prompt: str, user_timezone: str = 'Asia/Kolkata') -> Dict[str, Any]:
         """Parse natural language prompt into event details"""
         # This is a simplified parser - in production, use more sophisticated NLP
@@ -0,0 +1,255 @@
+"""
+Bounded in-memory LangGraph checkpointer with LRU/TTL eviction by thread
+"""
+
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import os
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    try:
+        from langgraph.checkpoint.memory import InMemorySaver
+    except ImportError:
+        # Older langgraph-checkpoint releases only export the MemorySaver name
+        from langgraph.checkpoint.memory import MemorySaver as InMemorySaver
+except ImportError as e:
+    logger.warning(f"LangGraph in-memory checkpointer not available: {e}")
+    InMemorySaver = None
+
+# Eviction limits for the in-memory checkpointer
+MEMORY_CHECKPOINT_MAX_THREADS = int(os.getenv("MEMORY_CHECKPOINT_MAX_THREADS", "1000"))
+MEMORY_CHECKPOINT_MAX_BYTES = int(os.getenv("MEMORY_CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024)))
+MEMORY_CHECKPOINT_TTL_SECONDS = float(os.getenv("MEMORY_CHECKPOINT_TTL_SECONDS", "3600"))
+
+def _payload_size(value: Any) -> int:
+    """Approximate resident size of serialized checkpoint data"""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_payload_size(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_payload_size(v) for v in value)
+    return 0
+
+def _thread_key(config: Dict[str, Any]) -> Tuple[str, str]:
+    """Extract (thread_id, checkpoint_ns) from a runnable config"""
+    configurable = config["configurable"]
+    return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+if InMemorySaver is not None:
+
+    class BoundedInMemorySaver(InMemorySaver):
+        """InMemorySaver that evicts whole threads by LRU, TTL and a resident byte cap"""
+
+        def __init__(self,
+                     max_threads: int = MEMORY_CHECKPOINT_MAX_THREADS,
+                     max_bytes: int = MEMORY_CHECKPOINT_MAX_BYTES,
+                     ttl_seconds: float = MEMORY_CHECKPOINT_TTL_SECONDS,
+                     serde=None):
+            super().__init__(serde=serde)
+            self.max_threads = max_threads
+            self.max_bytes = max_bytes
+            self.ttl_seconds = ttl_seconds
+            # Graph nodes run in executor threads, so every storage mutation goes through this lock
+            self._lock = threading.RLock()
+            # thread_id -> [last_access, resident_bytes], least recently used first
+            self._threads: "OrderedDict[str, list]" = OrderedDict()
+            self._write_keys: Dict[str, set] = {}
+            self._blob_keys: Dict[str, set] = {}
+            self.resident_bytes = 0
+            self.evictions = {"lru": 0, "ttl": 0, "bytes": 0}
+            # Newer InMemorySaver releases keep channel values in a separate blob store
+            if not hasattr(self, "blobs"):
+                self.blobs = {}
+
+        def get_tuple(self, config):
+            with self._lock:
+                self._evict_expired()
+                thread_id, checkpoint_ns = _thread_key(config)
+                # The base class indexes defaultdicts, which would leave untracked
+                # empty entries behind for threads this saver has never stored
+                namespaces = self.storage.get(thread_id)
+                if not namespaces or checkpoint_ns not in namespaces:
+                    return None
+                if thread_id in self._threads:
+                    self._touch(thread_id)
+                result = super().get_tuple(config)
+                if result is not None:
+                    self._track_read(thread_id, result)
+                return result
+
+        def list(self, config, *args, **kwargs):
+            with self._lock:
+                if config and config["configurable"]["thread_id"] not in self.storage:
+                    return
+                # Materialize under the lock so eviction can't mutate storage mid-iteration
+                items = list(super().list(config, *args, **kwargs))
+                for item in items:
+                    self._track_read(item.config["configurable"]["thread_id"], item)
+            yield from items
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            with self._lock:
+                result = super().put(config, checkpoint, metadata, new_versions)
+                thread_id, checkpoint_ns = _thread_key(config)
+
+                added = _payload_size(self.storage[thread_id][checkpoint_ns].get(checkpoint["id"]))
+                blob_keys = self._blob_keys.setdefault(thread_id, set())
+                for channel, version in new_versions.items():
+                    key = (thread_id, checkpoint_ns, channel, version)
+                    if key in self.blobs and key not in blob_keys:
+                        blob_keys.add(key)
+                        added += _payload_size(self.blobs[key])
+
+                self._account(thread_id, added)
+                self._evict(keep=thread_id)
+                return result
+
+        def put_writes(self, config, writes, task_id, *args, **kwargs):
+            with self._lock:
+                thread_id, checkpoint_ns = _thread_key(config)
+                key = (thread_id, checkpoint_ns, config["configurable"]["checkpoint_id"])
+                before = _payload_size(self.writes.get(key))
+                super().put_writes(config, writes, task_id, *args, **kwargs)
+                self._write_keys.setdefault(thread_id, set()).add(key)
+                self._account(thread_id, _payload_size(self.writes.get(key)) - before)
+                self._evict(keep=thread_id)
+
+        def delete_thread(self, thread_id: str) -> Dict[str, int]:
+            """Remove every checkpoint, write and blob of a thread"""
+            with self._lock:
+                return self._drop(thread_id)
+
+        def prune_thread(self, thread_id: str, keep_last: int) -> Dict[str, int]:
+            """Keep only the newest keep_last checkpoints of each namespace of a thread"""
+            removed = {"checkpoints": 0, "writes": 0, "blobs": 0}
+            with self._lock:
+                namespaces = self.storage.get(thread_id)
+                if not namespaces:
+                    return removed
+
+                write_keys = self._write_keys.get(thread_id, set())
+                blob_keys = self._blob_keys.get(thread_id, set())
+                for checkpoint_ns, checkpoints in namespaces.items():
+                    if len(checkpoints) <= keep_last:
+                        continue
+                    # Checkpoint ids are UUIDv6, so lexical order is chronological
+                    for checkpoint_id in sorted(checkpoints, reverse=True)[keep_last:]:
+                        del checkpoints[checkpoint_id]
+                        removed["checkpoints"] += 1
+                        key = (thread_id, checkpoint_ns, checkpoint_id)
+                        removed["writes"] += len(self.writes.pop(key, {}))
+                        write_keys.discard(key)
+
+                    # Keep only blob versions referenced by a remaining checkpoint
+                    referenced = set()
+                    for saved in checkpoints.values():
+                        checkpoint = self.serde.loads_typed(saved[0])
+                        referenced.update(checkpoint.get("channel_versions", {}).items())
+                    for key in [k for k in blob_keys if k[1] == checkpoint_ns]:
+                        if (key[2], key[3]) not in referenced:
+                            self.blobs.pop(key, None)
+                            blob_keys.discard(key)
+                            removed["blobs"] += 1
+
+                if any(removed.values()) and thread_id in self._threads:
+                    resident = self._measure(thread_id)
+                    self.resident_bytes += resident - self._threads[thread_id][1]
+                    self._threads[thread_id][1] = resident
+            return removed
+
+        def thread_ids(self, idle_for: float = 0):
+            """Snapshot of resident thread ids not accessed within the last idle_for seconds"""
+            with self._lock:
+                if idle_for <= 0:
+                    return list(self._threads)
+                cutoff = time.monotonic() - idle_for
+                return [thread_id for thread_id, (last_access, _) in self._threads.items() if last_access < cutoff]
+
+        def get_stats(self) -> Dict[str, Any]:
+            """Resident size and eviction counters"""
+            with self._lock:
+                return {
+                    "threads": len(self._threads),
+                    "resident_bytes": self.resident_bytes,
+                    "max_threads": self.max_threads,
+                    "max_bytes": self.max_bytes,
+                    "ttl_seconds": self.ttl_seconds,
+                    "evictions": dict(self.evictions),
+                }
+
+        def _track_read(self, thread_id: str, checkpoint_tuple):
+            # Reads go through defaultdicts and leave empty write entries behind;
+            # remember their keys so evicting the thread cleans them up too
+            configurable = checkpoint_tuple.config["configurable"]
+            checkpoint_ns = configurable.get("checkpoint_ns", "")
+            checkpoint_ids = [configurable["checkpoint_id"]]
+            if checkpoint_tuple.parent_config:
+                checkpoint_ids.append(checkpoint_tuple.parent_config["configurable"]["checkpoint_id"])
+            for checkpoint_id in checkpoint_ids:
+                key = (thread_id, checkpoint_ns, checkpoint_id)
+                if key in self.writes:
+                    self._write_keys.setdefault(thread_id, set()).add(key)
+
+        def _touch(self, thread_id: str):
+            self._threads[thread_id][0] = time.monotonic()
+            self._threads.move_to_end(thread_id)
+
+        def _account(self, thread_id: str, added: int):
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                entry = self._threads[thread_id] = [time.monotonic(), 0]
+            entry[1] += added
+            self.resident_bytes += added
+            self._touch(thread_id)
+
+        def _measure(self, thread_id: str) -> int:
+            size = _payload_size(self.storage.get(thread_id))
+            size += sum(_payload_size(self.writes.get(k)) for k in self._write_keys.get(thread_id, ()))
+            size += sum(_payload_size(self.blobs.get(k)) for k in self._blob_keys.get(thread_id, ()))
+            return size
+
+        def _drop(self, thread_id: str) -> Dict[str, int]:
+            removed = {"checkpoints": 0, "writes": 0, "blobs": 0}
+            namespaces = self.storage.pop(thread_id, None) or {}
+            removed["checkpoints"] = sum(len(checkpoints) for checkpoints in namespaces.values())
+            for key in self._write_keys.pop(thread_id, ()):
+                removed["writes"] += len(self.writes.pop(key, {}))
+            for key in self._blob_keys.pop(thread_id, ()):
+                if self.blobs.pop(key, None) is not None:
+                    removed["blobs"] += 1
+            entry = self._threads.pop(thread_id, None)
+            if entry is not None:
+                self.resident_bytes -= entry[1]
+            return removed
+
+        def _evict_expired(self, keep: Optional[str] = None):
+            if not self.ttl_seconds or self.ttl_seconds <= 0:
+                return
+            cutoff = time.monotonic() - self.ttl_seconds
+            while self._threads:
+                thread_id, (last_access, _) = next(iter(self._threads.items()))
+                if last_access >= cutoff or thread_id == keep:
+                    break
+                self._drop(thread_id)
+                self.evictions["ttl"] += 1
+
+        def _evict(self, keep: Optional[str] = None):
+            self._evict_expired(keep)
+            # The thread being written is most recently used, so it is evicted last
+            while len(self._threads) > self.max_threads and len(self._threads) > 1:
+                self._drop(next(iter(self._threads)))
+                self.evictions["lru"] += 1
+            while self.resident_bytes > self.max_bytes and len(self._threads) > 1:
+                self._drop(next(iter(self._threads)))
+                self.evictions["bytes"] += 1
+
+else:
+    BoundedInMemorySaver = None
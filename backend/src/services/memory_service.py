@@ -3,7 +3,10 @@ LangGraph memory service for session-based conversation history
 """
 
 from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
+import asyncio
 import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,14 +15,34 @@ logger = logging.getLogger(__name__)
 try:
     from langgraph.checkpoint.postgres import PostgresSaver
     from langgraph.checkpoint.memory import InMemorySaver
+    from psycopg import AsyncConnection, Connection
+    from psycopg.rows import dict_row
     CHECKPOINTERS_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"LangGraph checkpointers not available: {e}")
     logger.warning("Session memory will work but without LangGraph checkpoint persistence")
     PostgresSaver = None
     InMemorySaver = None
+    AsyncConnection = None
+    Connection = None
+    dict_row = None
     CHECKPOINTERS_AVAILABLE = False
 
+# Async Postgres checkpointer backed by a psycopg connection pool
+try:
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg_pool import AsyncConnectionPool
+    ASYNC_CHECKPOINTER_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"Async Postgres checkpointer not available: {e}")
+    AsyncPostgresSaver = None
+    AsyncConnectionPool = None
+    ASYNC_CHECKPOINTER_AVAILABLE = False
+
+from .memory_checkpointer import BoundedInMemorySaver
+from .checkpoint_serializer import get_checkpoint_serializer
+from .semantic_memory import semantic_memory
+
 # Import message manager with error handling
 try:
     from ..database.message_operations import message_manager
@@ -27,13 +50,128 @@ except ImportError:
     logger.error("Could not import message_manager - database operations may not work")
     message_manager = None
 
+# Checkpointer configuration
+# CHECKPOINTER_MODE: "async" uses AsyncPostgresSaver over a connection pool,
+# "sync" keeps the single-connection PostgresSaver
+CHECKPOINTER_MODE = os.getenv("CHECKPOINTER_MODE", "async").lower()
+CHECKPOINT_POOL_MIN_SIZE = int(os.getenv("CHECKPOINT_POOL_MIN_SIZE", "2"))
+CHECKPOINT_POOL_MAX_SIZE = int(os.getenv("CHECKPOINT_POOL_MAX_SIZE", "10"))
+CHECKPOINT_POOL_TIMEOUT = float(os.getenv("CHECKPOINT_POOL_TIMEOUT", "10"))
+CHECKPOINT_POOL_MAX_IDLE = float(os.getenv("CHECKPOINT_POOL_MAX_IDLE", "300"))
+CHECKPOINT_POOL_MAX_LIFETIME = float(os.getenv("CHECKPOINT_POOL_MAX_LIFETIME", "3600"))
+CHECKPOINT_POOL_RECONNECT_TIMEOUT = float(os.getenv("CHECKPOINT_POOL_RECONNECT_TIMEOUT", "300"))
+
+# Checkpoint retention: keep the newest N checkpoints per thread and drop threads of deleted sessions
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_COMPACTION_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_COMPACTION_INTERVAL_SECONDS", "600"))
+CHECKPOINT_COMPACTION_BATCH_SIZE = int(os.getenv("CHECKPOINT_COMPACTION_BATCH_SIZE", "100"))
+CHECKPOINT_COMPACTION_MAX_BATCHES = int(os.getenv("CHECKPOINT_COMPACTION_MAX_BATCHES", "20"))
+# Threads with a checkpoint newer than this are skipped so in-flight runs are never pruned
+CHECKPOINT_COMPACTION_MIN_IDLE_SECONDS = float(os.getenv("CHECKPOINT_COMPACTION_MIN_IDLE_SECONDS", "120"))
+
+CHECKPOINT_TABLES = ("checkpoints", "checkpoint_blobs", "checkpoint_writes")
+
+# Threads with a namespace holding more than keep_last checkpoints that have been idle long enough.
+# Counted per (thread_id, checkpoint_ns) to match the pruning window, otherwise threads
+# whose namespaces are each under the limit are selected again on every batch
+_SELECT_THREADS_TO_PRUNE_SQL = """
+SELECT thread_id
+FROM (
+    SELECT thread_id, COUNT(*) AS checkpoints, MAX((checkpoint->>'ts')::timestamptz) AS last_ts
+    FROM checkpoints
+    GROUP BY thread_id, checkpoint_ns
+) per_ns
+GROUP BY thread_id
+HAVING MAX(checkpoints) > %(keep_last)s
+   AND MAX(last_ts) < NOW() - make_interval(secs => %(min_idle)s)
+LIMIT %(batch_size)s
+"""
+
+# checkpoint_id is a UUIDv6, so ordering by it is chronological
+_PRUNE_CHECKPOINTS_SQL = """
+WITH ranked AS (
+    SELECT thread_id, checkpoint_ns, checkpoint_id,
+           ROW_NUMBER() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+    FROM checkpoints
+    WHERE thread_id = ANY(%(thread_ids)s)
+), doomed AS (
+    SELECT thread_id, checkpoint_ns, checkpoint_id FROM ranked WHERE rn > %(keep_last)s
+), deleted_writes AS (
+    DELETE FROM checkpoint_writes w
+    USING doomed d
+    WHERE w.thread_id = d.thread_id AND w.checkpoint_ns = d.checkpoint_ns AND w.checkpoint_id = d.checkpoint_id
+    RETURNING 1
+), deleted_checkpoints AS (
+    DELETE FROM checkpoints c
+    USING doomed d
+    WHERE c.thread_id = d.thread_id AND c.checkpoint_ns = d.checkpoint_ns AND c.checkpoint_id = d.checkpoint_id
+    RETURNING 1
+)
+SELECT
+    (SELECT COUNT(*) FROM deleted_checkpoints) AS checkpoints,
+    (SELECT COUNT(*) FROM deleted_writes) AS writes
+"""
+
+# Channel values no longer referenced by any remaining checkpoint of the thread
+_PRUNE_BLOBS_SQL = """
+DELETE FROM checkpoint_blobs b
+WHERE b.thread_id = ANY(%(thread_ids)s)
+  AND NOT EXISTS (
+      SELECT 1 FROM checkpoints c
+      WHERE c.thread_id = b.thread_id
+        AND c.checkpoint_ns = b.checkpoint_ns
+        AND c.checkpoint->'channel_versions'->>b.channel = b.version
+  )
+"""
+
+# Threads of soft-deleted sessions, found again after a restart lost the in-process queue.
+# Only run when chat_sessions lives in the checkpoint database.
+_SESSIONS_TABLE_SQL = "SELECT to_regclass('public.chat_sessions') IS NOT NULL AS present"
+_SELECT_DELETED_SESSION_THREADS_SQL = """
+SELECT DISTINCT c.thread_id
+FROM checkpoints c
+JOIN chat_sessions s ON s.id::text = c.thread_id
+WHERE s.is_active = false
+LIMIT %(batch_size)s
+"""
+
+_TABLE_SIZES_SQL = """
+SELECT relname AS table_name, pg_total_relation_size(oid) AS total_bytes, reltuples::bigint AS approx_rows
+FROM pg_class
+WHERE relname = ANY(%(tables)s) AND relkind = 'r'
+"""
+
 class MemoryService:
     """Manage LangGraph memory and checkpoints for chat sessions"""
 
     def __init__(self):
         self.checkpointer = None
+        self.pool = None
+        self.is_async = False
+        self.database_url = os.getenv("DATABASE_URL")
+        self.serde = get_checkpoint_serializer()
+        self._threads_to_drop = set()
+        self._compaction_task = None
+        self._compaction_lock = asyncio.Lock()
+        self.compaction_stats = {
+            "runs": 0,
+            "checkpoints_removed": 0,
+            "writes_removed": 0,
+            "blobs_removed": 0,
+            "threads_dropped": 0,
+            "last_run": None,
+        }
         self._setup_checkpointer()
 
+    def _use_async_postgres(self) -> bool:
+        """Whether the pooled async Postgres checkpointer should be used"""
+        return bool(
+            CHECKPOINTER_MODE == "async"
+            and ASYNC_CHECKPOINTER_AVAILABLE
+            and self.database_url
+            and self.database_url.startswith("postgresql://")
+        )
+
     def _setup_checkpointer(self):
         """Setup LangGraph checkpointer based on environment"""
         if not CHECKPOINTERS_AVAILABLE:
@@ -41,29 +179,317 @@ class MemoryService:
             self.checkpointer = None
             return
 
-        database_url = os.getenv("DATABASE_URL")
+        database_url = self.database_url
 
-        if database_url and database_url.startswith("postgresql://") and PostgresSaver:
+        if self._use_async_postgres():
+            # The pool needs a running event loop; setup_async_checkpointer() opens it
+            # at application startup. Until then, keep an in-memory checkpointer.
+            self.checkpointer = self._create_memory_saver()
+            logger.info("Async PostgreSQL checkpointer will be initialized on startup")
+        elif database_url and database_url.startswith("postgresql://") and PostgresSaver:
             try:
-                # Use PostgreSQL checkpointer for production
-                self.checkpointer = PostgresSaver.from_conn_string(database_url)
+                # Use PostgreSQL checkpointer for production. from_conn_string() takes no
+                # serializer, so open the connection with the settings it would use
+                conn = Connection.connect(database_url, autocommit=True, prepare_threshold=0, row_factory=dict_row)
+                self.checkpointer = PostgresSaver(conn, serde=self.serde)
                 self.checkpointer.setup()
                 logger.info("Initialized PostgreSQL checkpointer for memory")
             except Exception as e:
                 logger.warning(f"Failed to setup PostgreSQL checkpointer, falling back to memory: {e}")
-                if InMemorySaver:
-                    self.checkpointer = InMemorySaver()
-                else:
-                    self.checkpointer = None
+                self.checkpointer = self._create_memory_saver()
         else:
             # Use in-memory checkpointer for development
             if InMemorySaver:
-                self.checkpointer = InMemorySaver()
+                self.checkpointer = self._create_memory_saver()
                 logger.info("Initialized in-memory checkpointer for memory")
             else:
                 self.checkpointer = None
                 logger.warning("No checkpointer available")
 
+    def _create_memory_saver(self):
+        """In-memory checkpointer for development and as the Postgres fallback"""
+        if BoundedInMemorySaver is not None:
+            return BoundedInMemorySaver(serde=self.serde)
+        return InMemorySaver(serde=self.serde) if InMemorySaver else None
+
+    async def setup_async_checkpointer(self) -> bool:
+        """Open the connection pool and switch to the async Postgres checkpointer"""
+        if not self._use_async_postgres() or self.pool is not None:
+            return self.is_async
+
+        pool = AsyncConnectionPool(
+            conninfo=self.database_url,
+            min_size=CHECKPOINT_POOL_MIN_SIZE,
+            max_size=CHECKPOINT_POOL_MAX_SIZE,
+            timeout=CHECKPOINT_POOL_TIMEOUT,
+            max_idle=CHECKPOINT_POOL_MAX_IDLE,
+            max_lifetime=CHECKPOINT_POOL_MAX_LIFETIME,
+            reconnect_timeout=CHECKPOINT_POOL_RECONNECT_TIMEOUT,
+            reconnect_failed=self._on_pool_reconnect_failed,
+            # Validate connections before handing them out so dropped ones get replaced
+            check=AsyncConnectionPool.check_connection,
+            kwargs={
+                "autocommit": True,
+                "prepare_threshold": 0,
+                "row_factory": dict_row,
+            },
+            open=False,
+        )
+
+        try:
+            await pool.open(wait=True, timeout=CHECKPOINT_POOL_TIMEOUT)
+            checkpointer = AsyncPostgresSaver(pool, serde=self.serde)
+            await checkpointer.setup()
+        except Exception as e:
+            logger.warning(f"Failed to setup async PostgreSQL checkpointer, keeping in-memory checkpointer: {e}")
+            await pool.close()
+            return False
+
+        self.pool = pool
+        self.checkpointer = checkpointer
+        self.is_async = True
+        logger.info(
+            f"Initialized async PostgreSQL checkpointer "
+            f"(pool min={CHECKPOINT_POOL_MIN_SIZE}, max={CHECKPOINT_POOL_MAX_SIZE})"
+        )
+        return True
+
+    def _on_pool_reconnect_failed(self, pool) -> None:
+        """Called by the pool when it gives up reconnecting to the database"""
+        logger.error(
+            f"Checkpoint connection pool could not reconnect within "
+            f"{CHECKPOINT_POOL_RECONNECT_TIMEOUT}s - checkpoint writes will fail until the database is reachable"
+        )
+
+    async def close(self):
+        """Stop the compaction job and close the checkpoint connection pool"""
+        await self.stop_compaction_job()
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            self.is_async = False
+            logger.info("Closed checkpoint connection pool")
+
+    async def check_health(self) -> Dict[str, Any]:
+        """Report checkpointer status and connection pool statistics"""
+        health = {
+            "checkpointer": type(self.checkpointer).__name__ if self.checkpointer else None,
+            "async": self.is_async,
+            "serializer": type(self.serde).__name__ if self.serde else "default",
+            "compaction": self.compaction_stats,
+        }
+        if BoundedInMemorySaver and isinstance(self.checkpointer, BoundedInMemorySaver):
+            health["memory"] = self.checkpointer.get_stats()
+        if self.pool is None:
+            return health
+
+        try:
+            await self.pool.check()
+            health["pool_ok"] = True
+        except Exception as e:
+            logger.warning(f"Checkpoint pool health check failed: {e}")
+            health["pool_ok"] = False
+
+        stats = self.pool.get_stats()
+        health["pool"] = {
+            "size": stats.get("pool_size", 0),
+            "available": stats.get("pool_available", 0),
+            "waiting": stats.get("requests_waiting", 0),
+            "max_size": CHECKPOINT_POOL_MAX_SIZE,
+        }
+        return health
+
+    def schedule_thread_deletion(self, session_id: str):
+        """Queue a session's checkpoint thread for removal by the next compaction run"""
+        self._threads_to_drop.add(session_id)
+
+    def forget_session(self, session_id: str, user_id: str):
+        """Drop a deleted session's checkpoints and stop recalling its messages"""
+        self.schedule_thread_deletion(session_id)
+        try:
+            semantic_memory.forget_session(user_id, session_id)
+        except Exception as e:
+            logger.error(f"Error removing session {session_id} from semantic memory: {e}")
+
+    def start_compaction_job(self):
+        """Start the background checkpoint compaction loop"""
+        if self._compaction_task is not None or self.checkpointer is None:
+            return
+        if CHECKPOINT_COMPACTION_INTERVAL_SECONDS <= 0:
+            logger.info("Checkpoint compaction disabled (CHECKPOINT_COMPACTION_INTERVAL_SECONDS <= 0)")
+            return
+        self._compaction_task = asyncio.create_task(self._compaction_loop())
+        logger.info(
+            f"Started checkpoint compaction job (every {CHECKPOINT_COMPACTION_INTERVAL_SECONDS}s, "
+            f"keep last {CHECKPOINT_KEEP_LAST} per thread)"
+        )
+
+    async def stop_compaction_job(self):
+        """Cancel the background checkpoint compaction loop"""
+        if self._compaction_task is None:
+            return
+        self._compaction_task.cancel()
+        try:
+            await self._compaction_task
+        except asyncio.CancelledError:
+            pass
+        self._compaction_task = None
+
+    async def _compaction_loop(self):
+        """Run compaction periodically until cancelled"""
+        while True:
+            await asyncio.sleep(CHECKPOINT_COMPACTION_INTERVAL_SECONDS)
+            try:
+                await self.compact_checkpoints()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Checkpoint compaction failed: {e}")
+
+    async def compact_checkpoints(self) -> Dict[str, Any]:
+        """Apply the retention policy once and return stats for this run"""
+        async with self._compaction_lock:
+            started = time.perf_counter()
+            drop_threads = list(self._threads_to_drop)
+
+            if self.pool is not None:
+                run = await self._compact_postgres(self.pool.connection(), drop_threads)
+            elif PostgresSaver and isinstance(self.checkpointer, PostgresSaver):
+                # The sync saver's single connection serves requests, so compaction opens its own
+                connection = await AsyncConnection.connect(
+                    self.database_url, autocommit=True, prepare_threshold=0, row_factory=dict_row
+                )
+                run = await self._compact_postgres(connection, drop_threads)
+            elif BoundedInMemorySaver and isinstance(self.checkpointer, BoundedInMemorySaver):
+                run = self._compact_in_memory(drop_threads)
+            else:
+                return {}
+
+            # Only forget queued threads once they were actually removed
+            self._threads_to_drop.difference_update(drop_threads)
+
+            run["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            run["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+            totals = self.compaction_stats
+            totals["runs"] += 1
+            for key in ("checkpoints_removed", "writes_removed", "blobs_removed", "threads_dropped"):
+                totals[key] += run[key]
+            totals["last_run"] = run
+
+            logger.info(
+                f"Checkpoint compaction removed {run['checkpoints_removed']} checkpoints, "
+                f"{run['writes_removed']} writes, {run['blobs_removed']} blobs "
+                f"and dropped {run['threads_dropped']} threads in {run['duration_ms']}ms"
+            )
+            return run
+
+    async def _compact_postgres(self, connection, drop_threads: List[str]) -> Dict[str, Any]:
+        """Prune checkpoint tables in batches of threads over an async connection (context manager)"""
+        run = {
+            "checkpoints_removed": 0,
+            "writes_removed": 0,
+            "blobs_removed": 0,
+            "threads_dropped": 0,
+            "threads_compacted": 0,
+        }
+
+        async with connection as conn:
+            # Drop every checkpoint of deleted sessions
+            for i in range(0, len(drop_threads), CHECKPOINT_COMPACTION_BATCH_SIZE):
+                await self._drop_threads_postgres(conn, drop_threads[i:i + CHECKPOINT_COMPACTION_BATCH_SIZE], run)
+
+            # Sessions deleted before a restart are no longer queued; find them in the database
+            cur = await conn.execute(_SESSIONS_TABLE_SQL)
+            if (await cur.fetchone())["present"]:
+                for _ in range(CHECKPOINT_COMPACTION_MAX_BATCHES):
+                    cur = await conn.execute(_SELECT_DELETED_SESSION_THREADS_SQL, {
+                        "batch_size": CHECKPOINT_COMPACTION_BATCH_SIZE,
+                    })
+                    thread_ids = [row["thread_id"] for row in await cur.fetchall()]
+                    if not thread_ids:
+                        break
+                    await self._drop_threads_postgres(conn, thread_ids, run)
+                    if len(thread_ids) < CHECKPOINT_COMPACTION_BATCH_SIZE:
+                        break
+
+            # Keep only the newest checkpoints of long threads
+            for _ in range(CHECKPOINT_COMPACTION_MAX_BATCHES):
+                cur = await conn.execute(_SELECT_THREADS_TO_PRUNE_SQL, {
+                    "keep_last": CHECKPOINT_KEEP_LAST,
+                    "min_idle": CHECKPOINT_COMPACTION_MIN_IDLE_SECONDS,
+                    "batch_size": CHECKPOINT_COMPACTION_BATCH_SIZE,
+                })
+                thread_ids = [row["thread_id"] for row in await cur.fetchall()]
+                if not thread_ids:
+                    break
+
+                async with conn.transaction():
+                    cur = await conn.execute(_PRUNE_CHECKPOINTS_SQL, {
+                        "thread_ids": thread_ids,
+                        "keep_last": CHECKPOINT_KEEP_LAST,
+                    })
+                    removed = await cur.fetchone()
+                    cur = await conn.execute(_PRUNE_BLOBS_SQL, {"thread_ids": thread_ids})
+                    run["blobs_removed"] += cur.rowcount
+
+                run["checkpoints_removed"] += removed["checkpoints"]
+                run["writes_removed"] += removed["writes"]
+                run["threads_compacted"] += len(thread_ids)
+
+                if len(thread_ids) < CHECKPOINT_COMPACTION_BATCH_SIZE:
+                    break
+                # Let request traffic use the connection pool between batches
+                await asyncio.sleep(0)
+
+            cur = await conn.execute(_TABLE_SIZES_SQL, {"tables": list(CHECKPOINT_TABLES)})
+            run["tables"] = {
+                row["table_name"]: {"total_bytes": row["total_bytes"], "approx_rows": row["approx_rows"]}
+                for row in await cur.fetchall()
+            }
+
+        return run
+
+    @staticmethod
+    async def _drop_threads_postgres(conn, thread_ids: List[str], run: Dict[str, Any]):
+        """Delete every checkpoint, blob and write of a batch of threads"""
+        async with conn.transaction():
+            for table, key in zip(CHECKPOINT_TABLES, ("checkpoints", "blobs", "writes")):
+                cur = await conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ANY(%(thread_ids)s)",
+                    {"thread_ids": thread_ids},
+                )
+                run[f"{key}_removed"] += cur.rowcount
+        run["threads_dropped"] += len(thread_ids)
+
+    def _compact_in_memory(self, drop_threads: List[str]) -> Dict[str, Any]:
+        """Apply the retention policy to the bounded in-memory checkpointer"""
+        saver = self.checkpointer
+        run = {
+            "checkpoints_removed": 0,
+            "writes_removed": 0,
+            "blobs_removed": 0,
+            "threads_dropped": 0,
+            "threads_compacted": 0,
+        }
+
+        for thread_id in drop_threads:
+            removed = saver.delete_thread(thread_id)
+            if removed["checkpoints"]:
+                run["threads_dropped"] += 1
+            for key in ("checkpoints", "writes", "blobs"):
+                run[f"{key}_removed"] += removed[key]
+
+        for thread_id in saver.thread_ids(idle_for=CHECKPOINT_COMPACTION_MIN_IDLE_SECONDS):
+            removed = saver.prune_thread(thread_id, CHECKPOINT_KEEP_LAST)
+            if removed["checkpoints"]:
+                run["threads_compacted"] += 1
+            for key in ("checkpoints", "writes", "blobs"):
+                run[f"{key}_removed"] += removed[key]
+
+        run["memory"] = saver.get_stats()
+        return run
+
     def get_checkpointer(self):
         """Get the configured checkpointer"""
         return self.checkpointer
@@ -73,7 +499,7 @@ class MemoryService:
         if not message_manager:
             logger.warning("Message manager not available - returning empty context")
             return []
-            
+
         try:
             messages = await message_manager.get_recent_messages(session_id, user_id, max_messages)
 
@@ -98,12 +524,38 @@ class MemoryService:
             logger.error(f"Error loading session context: {e}")
             return []
 
+    async def remember_messages(self, session_id: str, user_id: str, messages: List[Dict[str, Any]]) -> int:
+        """Add stored message rows to the user's semantic memory index"""
+        try:
+            # Embedding and the index append are CPU/disk work - keep them off the event loop
+            return await asyncio.to_thread(semantic_memory.remember, user_id, session_id, messages)
+        except Exception as e:
+            logger.error(f"Error indexing messages for semantic memory: {e}")
+            return 0
+
+    async def retrieve_relevant_context(self, user_id: str, query: str, recent_messages: List[Dict[str, Any]] = None) -> str:
+        """Format the most relevant earlier messages for the prompt, skipping ones already in context"""
+        try:
+            exclude = [m.get("content") for m in (recent_messages or [])]
+            hits = await asyncio.to_thread(semantic_memory.recall, user_id, query, exclude_contents=exclude)
+        except Exception as e:
+            logger.error(f"Error retrieving semantic memory: {e}")
+            return ""
+
+        if not hits:
+            return ""
+        lines = ["Relevant earlier conversation:"]
+        for hit in hits:
+            lines.append(f"- [{hit.get('role')}] {hit.get('content')}")
+        logger.info(f"Recalled {len(hits)} relevant messages for user {user_id}")
+        return "\n".join(lines)
+
     async def save_messages_to_db(self, session_id: str, user_id: str, messages: List[Dict[str, Any]]) -> bool:
         """Save new messages to database"""
         if not message_manager:
             logger.warning("Message manager not available - cannot save messages")
             return False
-            
+
         try:
             for message in messages:
                 await message_manager.add_message(
@@ -127,4 +579,4 @@ class MemoryService:
         }
 
 # Global instance
-memory_service = MemoryService() 
\ No newline at end of file
+memory_service = MemoryService()
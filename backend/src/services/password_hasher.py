@@ -0,0 +1,120 @@
+"""
+bcrypt hashing on a bounded worker pool, off the event loop
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Dict, Any
+import asyncio
+import os
+import threading
+import time
+import bcrypt
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cost factor for new hashes; existing hashes with another cost are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# thread: bcrypt releases the GIL, so threads hash in parallel (default)
+# process: isolates hashing from the worker entirely, at the cost of extra processes
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes waiting for a worker beyond this are refused instead of queueing without bound
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+def _hash_password(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+def _check_password(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12)"""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded executor so logins never block the event loop"""
+
+    def __init__(self,
+                 rounds: int = BCRYPT_ROUNDS,
+                 executor_type: str = PASSWORD_HASH_EXECUTOR,
+                 workers: int = PASSWORD_HASH_WORKERS,
+                 max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.rounds = rounds
+        self.executor_type = executor_type
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._in_flight = 0
+        self.hashes = 0
+        self.verifications = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.executor_type == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured cost"""
+        hashed = await self._run(_hash_password, password.encode('utf-8'), self.rounds)
+        self.hashes += 1
+        return hashed.decode('utf-8')
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Check a password against a bcrypt hash"""
+        matches = await self._run(_check_password, password.encode('utf-8'), hashed_password.encode('utf-8'))
+        self.verifications += 1
+        return matches
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True if a hash was made with a different cost factor than the configured one"""
+        return hash_rounds(hashed_password) != self.rounds
+
+    def close(self):
+        """Shut the worker pool down"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool configuration and counters"""
+        completed = self.hashes + self.verifications
+        return {
+            "rounds": self.rounds,
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "hashes": self.hashes,
+            "verifications": self.verifications,
+            "rejected": self.rejected,
+            "mean_ms": round(self.total_ms / completed, 1) if completed else 0.0,
+        }
+
+# Global instance
+password_hasher = PasswordHasher()
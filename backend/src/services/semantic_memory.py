@@ -0,0 +1,294 @@
+"""
+Semantic long-term memory: local hashed n-gram embeddings in a per-user on-disk vector index
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Iterable
+import json
+import os
+import re
+import threading
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    logger.warning("numpy not available - semantic memory disabled")
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): only safe with a single worker process
+    fcntl = None
+
+# Semantic memory configuration
+SEMANTIC_MEMORY_ENABLED = os.getenv("SEMANTIC_MEMORY_ENABLED", "true").lower() == "true"
+SEMANTIC_MEMORY_DIR = os.getenv(
+    "SEMANTIC_MEMORY_DIR",
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'semantic_memory')
+)
+SEMANTIC_MEMORY_DIM = int(os.getenv("SEMANTIC_MEMORY_DIM", "512"))
+SEMANTIC_MEMORY_TOP_K = int(os.getenv("SEMANTIC_MEMORY_TOP_K", "3"))
+SEMANTIC_MEMORY_MIN_SCORE = float(os.getenv("SEMANTIC_MEMORY_MIN_SCORE", "0.3"))
+SEMANTIC_MEMORY_MIN_CHARS = int(os.getenv("SEMANTIC_MEMORY_MIN_CHARS", "20"))
+SEMANTIC_MEMORY_SNIPPET_CHARS = int(os.getenv("SEMANTIC_MEMORY_SNIPPET_CHARS", "300"))
+SEMANTIC_MEMORY_MAX_OPEN_INDEXES = int(os.getenv("SEMANTIC_MEMORY_MAX_OPEN_INDEXES", "256"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+class HashingEmbedder:
+    """Embed text as a signed feature-hashed bag of words, word bigrams and character trigrams"""
+
+    def __init__(self, dim: int = SEMANTIC_MEMORY_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> Iterable[tuple]:
+        words = _TOKEN_RE.findall(text.lower())
+        for word in words:
+            yield "w:" + word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3], 0.5
+        for first, second in zip(words, words[1:]):
+            yield f"b:{first} {second}", 0.7
+
+    def embed(self, text: str):
+        """Return an L2-normalized float32 vector"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            # crc32 is stable across processes, unlike the salted built-in hash()
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += weight if (h >> 31) & 1 else -weight
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+@contextmanager
+def _file_lock(path: str, exclusive: bool):
+    """Advisory lock shared by every worker process using the same index directory"""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _read_new_lines(path: str, offset: int) -> tuple:
+    """Complete lines appended since offset, and the offset after the last one"""
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    lines = [line for line in data[:end].decode("utf-8").splitlines() if line.strip()]
+    return lines, offset + end
+
+class UserVectorIndex:
+    """Append-only vector index for one user: vectors.f32 (memory-mapped) + meta.jsonl
+
+    Row i of the vector file belongs to line i of meta.jsonl. Several worker processes may
+    share a directory, so appends to both files happen under one exclusive file lock and
+    every process picks up the others' rows from the files before remapping.
+    """
+
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.meta_path = os.path.join(directory, "meta.jsonl")
+        self.deleted_path = os.path.join(directory, "deleted_sessions.txt")
+        self.lock_path = os.path.join(directory, ".lock")
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._rows = 0
+        # Bytes of meta.jsonl / deleted_sessions.txt already read into memory
+        self._meta_offset = 0
+        self._deleted_offset = 0
+        # Appends only mark the mapping stale; the next search remaps once
+        self._stale = False
+        # Callers currently using this index; SemanticMemory never evicts one in use
+        self.users = 0
+        self.meta: List[Dict[str, Any]] = []
+        self.deleted_sessions = set()
+        self._sync()
+
+    def _changed_on_disk(self) -> bool:
+        """Whether another process appended metadata or tombstones since the last read"""
+        meta_size = os.path.getsize(self.meta_path) if os.path.exists(self.meta_path) else 0
+        deleted_size = os.path.getsize(self.deleted_path) if os.path.exists(self.deleted_path) else 0
+        return meta_size != self._meta_offset or deleted_size != self._deleted_offset
+
+    def _sync(self):
+        """Read rows and tombstones written by any process, then remap"""
+        if not os.path.isdir(self.directory):
+            return
+        with _file_lock(self.lock_path, exclusive=False):
+            self._read_new()
+            self._remap()
+
+    def _read_new(self):
+        lines, self._meta_offset = _read_new_lines(self.meta_path, self._meta_offset)
+        self.meta.extend(json.loads(line) for line in lines)
+        lines, self._deleted_offset = _read_new_lines(self.deleted_path, self._deleted_offset)
+        self.deleted_sessions.update(line.strip() for line in lines)
+
+    def _remap(self):
+        """Map the vector file; rows without metadata yet (torn append) are ignored"""
+        if not os.path.exists(self.vectors_path):
+            self._matrix, self._rows = None, 0
+            return
+        rows = min(os.path.getsize(self.vectors_path) // (self.dim * 4), len(self.meta))
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+        self._rows = rows
+
+    def append(self, vectors, metas: List[Dict[str, Any]]):
+        """Append rows to the on-disk index; they are mapped on the next search"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with _file_lock(self.lock_path, exclusive=True):
+                self._read_new()
+                # Drop a torn append left by a crashed writer so both files stay row-aligned
+                row_bytes = self.dim * 4
+                if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) != len(self.meta) * row_bytes:
+                    os.truncate(self.vectors_path, len(self.meta) * row_bytes)
+                if os.path.exists(self.meta_path) and os.path.getsize(self.meta_path) != self._meta_offset:
+                    os.truncate(self.meta_path, self._meta_offset)
+                with open(self.vectors_path, "ab") as f:
+                    f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                with open(self.meta_path, "ab") as f:
+                    f.write("".join(json.dumps(meta) + "\n" for meta in metas).encode("utf-8"))
+                    self._meta_offset = f.tell()
+            self.meta.extend(metas)
+            self._stale = True
+
+    def mark_session_deleted(self, session_id: str):
+        """Tombstone a session so its messages are no longer recalled"""
+        with self._lock:
+            if session_id in self.deleted_sessions:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with _file_lock(self.lock_path, exclusive=True):
+                self._read_new()
+                if session_id not in self.deleted_sessions:
+                    with open(self.deleted_path, "a", encoding="utf-8") as f:
+                        f.write(session_id + "\n")
+                    self._deleted_offset = os.path.getsize(self.deleted_path)
+            self.deleted_sessions.add(session_id)
+
+    def search(self, query_vector, k: int, min_score: float, exclude_contents: set) -> List[Dict[str, Any]]:
+        """Top-k rows by cosine similarity"""
+        with self._lock:
+            if self._stale or self._changed_on_disk():
+                self._sync()
+                self._stale = False
+            matrix, meta, deleted = self._matrix, self.meta, self.deleted_sessions
+        if matrix is None or k <= 0:
+            return []
+
+        scores = matrix @ query_vector
+        # Over-fetch so filtered rows don't leave the result short
+        candidates = min(len(scores), k * 4 + len(exclude_contents))
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top])]
+
+        hits = []
+        for row in top:
+            score = float(scores[row])
+            if score < min_score:
+                break
+            entry = meta[row]
+            if entry.get("session_id") in deleted or entry.get("content") in exclude_contents:
+                continue
+            hits.append({**entry, "score": round(score, 4)})
+            if len(hits) == k:
+                break
+        return hits
+
+class SemanticMemory:
+    """Per-user retrieval memory over past chat messages"""
+
+    def __init__(self, base_dir: str = SEMANTIC_MEMORY_DIR, dim: int = SEMANTIC_MEMORY_DIM):
+        self.enabled = SEMANTIC_MEMORY_ENABLED and NUMPY_AVAILABLE
+        self.base_dir = base_dir
+        self.embedder = HashingEmbedder(dim) if NUMPY_AVAILABLE else None
+        self._indexes: "OrderedDict[str, UserVectorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _index(self, user_id: str):
+        """Borrow a user's index; indexes in use are never evicted, so each user has one instance and lock"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                # user ids are UUIDs; strip anything path-like regardless
+                safe_user_id = re.sub(r"[^A-Za-z0-9_-]", "_", user_id)
+                index = UserVectorIndex(os.path.join(self.base_dir, safe_user_id), self.embedder.dim)
+                self._indexes[user_id] = index
+            else:
+                self._indexes.move_to_end(user_id)
+            index.users += 1
+        try:
+            yield index
+        finally:
+            with self._lock:
+                index.users -= 1
+                self._evict()
+
+    def _evict(self):
+        overflow = len(self._indexes) - SEMANTIC_MEMORY_MAX_OPEN_INDEXES
+        if overflow <= 0:
+            return
+        idle = [user_id for user_id, index in self._indexes.items() if index.users == 0]
+        for user_id in idle[:overflow]:
+            del self._indexes[user_id]
+
+    def remember(self, user_id: str, session_id: str, messages: List[Dict[str, Any]]) -> int:
+        """Embed and index stored message rows; returns the number indexed"""
+        if not self.enabled:
+            return 0
+        rows = [m for m in messages if m and len((m.get("content") or "").strip()) >= SEMANTIC_MEMORY_MIN_CHARS]
+        if not rows:
+            return 0
+
+        vectors = np.stack([self.embedder.embed(m["content"]) for m in rows])
+        metas = [{
+            "message_id": m.get("id"),
+            "session_id": session_id,
+            "role": m.get("role"),
+            "content": m["content"][:SEMANTIC_MEMORY_SNIPPET_CHARS],
+            "created_at": m.get("created_at"),
+        } for m in rows]
+        with self._index(user_id) as index:
+            index.append(vectors, metas)
+        return len(rows)
+
+    def recall(self, user_id: str, query: str, k: int = SEMANTIC_MEMORY_TOP_K,
+               exclude_contents: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Return the k stored snippets most similar to the query"""
+        if not self.enabled or not query.strip():
+            return []
+        exclude = {c[:SEMANTIC_MEMORY_SNIPPET_CHARS] for c in (exclude_contents or []) if c}
+        query_vector = self.embedder.embed(query)
+        with self._index(user_id) as index:
+            return index.search(query_vector, k, SEMANTIC_MEMORY_MIN_SCORE, exclude)
+
+    def forget_session(self, user_id: str, session_id: str):
+        """Stop recalling messages of a deleted session"""
+        if self.enabled:
+            with self._index(user_id) as index:
+                index.mark_session_deleted(session_id)
+
+# Global instance
+semantic_memory = SemanticMemory()
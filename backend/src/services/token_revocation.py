@@ -0,0 +1,126 @@
+"""
+In-memory revocation list for tokens of deactivated and signed-out users
+"""
+
+from typing import Optional, Dict, Any, Tuple
+import hashlib
+import math
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default entry lifetime: it only has to outlive the access tokens issued before it
+TOKEN_REVOCATION_TTL_SECONDS = float(os.getenv("TOKEN_REVOCATION_TTL_SECONDS", "3600"))
+# Bloom filter sizing: expected revoked users and acceptable false-positive rate
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.getenv("TOKEN_REVOCATION_BLOOM_CAPACITY", "100000"))
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("TOKEN_REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (double hashing of one blake2b digest)"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class TokenRevocationList:
+    """Users whose tokens issued before a point in time are rejected
+
+    The bloom filter answers "not revoked" for almost every request without
+    touching the exact map; the map decides the rare positives. Revocations
+    are per process, so access tokens should be short-lived when several
+    workers serve requests.
+    """
+
+    def __init__(self,
+                 ttl_seconds: float = TOKEN_REVOCATION_TTL_SECONDS,
+                 capacity: int = TOKEN_REVOCATION_BLOOM_CAPACITY,
+                 error_rate: float = TOKEN_REVOCATION_BLOOM_ERROR_RATE):
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # key -> (revoked_at, expires_at) in epoch seconds
+        self._revoked: Dict[str, Tuple[float, float]] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.bloom_positives = 0
+        self.rejections = 0
+
+    def revoke(self, user_id: str, revoked_at: Optional[float] = None, ttl_seconds: Optional[float] = None):
+        """Reject the user's tokens issued up to now
+
+        ttl_seconds overrides the default entry lifetime; it must cover the
+        longest-lived token the entry is meant to reject.
+        """
+        now = time.time()
+        revoked_at = revoked_at or now
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self._prune(now)
+            previous = self._revoked.get(user_id)
+            if previous:
+                revoked_at, expires_at = max(revoked_at, previous[0]), max(expires_at, previous[1])
+            self._revoked[user_id] = (revoked_at, expires_at)
+            self._bloom.add(user_id)
+        logger.info(f"Revoked tokens of {user_id}")
+
+    def is_revoked(self, user_id: str, issued_at: Optional[float]) -> bool:
+        """True if a token of this user issued at `issued_at` has been revoked"""
+        self.checks += 1
+        if user_id not in self._bloom:
+            return False
+        self.bloom_positives += 1
+        with self._lock:
+            entry = self._revoked.get(user_id)
+            if entry is None or time.time() > entry[1]:
+                return False
+            revoked_at = entry[0]
+        # Tokens without an issue time predate this list and are treated as old
+        revoked = issued_at is None or issued_at <= revoked_at
+        if revoked:
+            self.rejections += 1
+        return revoked
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Sizes and check counters"""
+        with self._lock:
+            return {
+                "revoked_users": len(self._revoked),
+                "bloom_bits": self._bloom.size,
+                "bloom_hashes": self._bloom.hash_count,
+                "checks": self.checks,
+                "bloom_positives": self.bloom_positives,
+                "rejections": self.rejections,
+            }
+
+    def _prune(self, now: float):
+        expired = [user_id for user_id, (_, expires_at) in self._revoked.items() if now > expires_at]
+        if not expired:
+            return
+        for user_id in expired:
+            del self._revoked[user_id]
+        # Bloom filters cannot delete, so rebuild from the remaining entries
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        for user_id in self._revoked:
+            self._bloom.add(user_id)
+
+# Global instance
+token_revocations = TokenRevocationList()
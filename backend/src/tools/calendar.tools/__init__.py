@@ -17,6 +17,7 @@ if os.path.exists(calendar_tools_path):
     create_calendar_tools = calendar_tools_module.create_calendar_tools
     create_calendar_event = calendar_tools_module.create_calendar_event
     get_upcoming_meetings_tool = calendar_tools_module.get_upcoming_meetings_tool
+    find_free_slots = calendar_tools_module.find_free_slots
 else:
     # Create dummy functions if file doesn't exist
     def create_calendar_tools():
@@ -25,6 +26,8 @@ else:
         return "❌ Calendar tools not available due to import error."
     def get_upcoming_meetings_tool(query: str = "next 7 days", user_id: str = None) -> str:
         return "❌ Upcoming meetings not available due to import error."
+    def find_free_slots(query: str = "next 7 days", user_id: str = None, min_duration_minutes: int = 30) -> str:
+        return "❌ Availability not available due to import error."
 
 # Load upcoming_meetings_tool directly
 upcoming_meetings_tool_path = os.path.join(os.path.dirname(__file__), 'upcoming_meetings_tool.py')
@@ -39,4 +42,4 @@ else:
     async def get_upcoming_meetings(query: str = "next 7 days", user_id: str = None) -> str:
         return "❌ Upcoming meetings not available due to import error."
 
-__all__ = ['create_calendar_tools', 'create_calendar_event', 'get_upcoming_meetings_tool', 'get_upcoming_meetings'] 
\ No newline at end of file
+__all__ = ['create_calendar_tools', 'create_calendar_event', 'get_upcoming_meetings_tool', 'find_free_slots', 'get_upcoming_meetings'] 
\ No newline at end of file
@@ -4,8 +4,11 @@ Google Calendar tools for event creation and upcoming meetings retrieval
 
 from langchain_core.tools import tool
 from src.services.google_calendar_service import google_calendar_service
+from src.services.calendar_sync import calendar_sync
+from src.services.calendar_tokens import calendar_tokens
 from src.database.calendar_operations import calendar_db
-import asyncio
+from src.database.supabase_client import run_sync
+from datetime import datetime
 import logging
 
 # Import the upcoming meetings function using direct file loading
@@ -20,11 +23,15 @@ if os.path.exists(_upcoming_meetings_path):
     sys.modules['upcoming_meetings_tool'] = upcoming_meetings_module
     spec.loader.exec_module(upcoming_meetings_module)
     get_upcoming_meetings = upcoming_meetings_module.get_upcoming_meetings
+    get_free_slots = upcoming_meetings_module.get_free_slots
 else:
     # If file doesn't exist, create a dummy function
     async def get_upcoming_meetings(query: str = "next 7 days", user_id: str = None) -> str:
         return "❌ Upcoming meetings feature not available due to import error."
 
+    async def get_free_slots(query: str = "next 7 days", user_id: str = None, min_duration_minutes: int = None) -> str:
+        return "❌ Availability feature not available due to import error."
+
 logger = logging.getLogger(__name__)
 
 @tool
@@ -55,18 +62,26 @@ def create_calendar_event(prompt: str, user_id: str) -> str:
     try:
         # Check if user has calendar integration
         logger.info(f"📅 Checking calendar integration for user: {user_id}")
-        integration = asyncio.run(calendar_db.get_user_calendar_integration(user_id))
-        print(f"🔍 Integration: {integration}")
+        integration = run_sync(calendar_tokens.get_integration(user_id))
         if not integration:
             return "❌ Please connect your Google Calendar first. Go to chat settings to connect your calendar."
 
         # Parse natural language into event details
         event_details = google_calendar_service.parse_natural_language_event(prompt)
 
+        # Double-booking check against the locally synced calendar (no API call)
+        conflicts = calendar_sync.find_conflicts(
+            user_id,
+            datetime.fromisoformat(event_details['start_time']),
+            datetime.fromisoformat(event_details['end_time'])
+        )
+
+        # Cached credentials, refreshed (and stored) only when close to expiry
+        credentials = run_sync(calendar_tokens.get_credentials(user_id))
+
         # Create the event using Google Calendar API
-        result = asyncio.run(google_calendar_service.create_calendar_event(
-            access_token=integration['access_token'],
-            refresh_token=integration.get('refresh_token'),
+        result = run_sync(google_calendar_service.create_calendar_event(
+            credentials=credentials,
             event_title=event_details['title'],
             event_description=event_details['description'],
             start_time=event_details['start_time'],
@@ -75,7 +90,9 @@ def create_calendar_event(prompt: str, user_id: str) -> str:
 
         # Log the created event if successful
         if result.get('success'):
-            asyncio.run(calendar_db.log_calendar_event(
+            # The next upcoming-meetings query fetches the new event instead of trusting the store
+            calendar_sync.mark_stale(user_id)
+            run_sync(calendar_db.log_calendar_event(
                 user_id=user_id,
                 integration_id=integration['id'],
                 event_data={
@@ -88,7 +105,14 @@ def create_calendar_event(prompt: str, user_id: str) -> str:
                 original_prompt=prompt
             ))
             
-        return result.get('message', 'Calendar event created successfully!')  if result.get('success') else result.get('message', 'Failed to create calendar event')
+        if not result.get('success'):
+            return result.get('message', 'Failed to create calendar event')
+
+        message = result.get('message', 'Calendar event created successfully!')
+        if conflicts:
+            titles = ", ".join(conflict.get('summary', 'No Title') for conflict in conflicts)
+            message += f"\n⚠️ This overlaps with: {titles}"
+        return message
 
 
 
@@ -124,13 +148,46 @@ def get_upcoming_meetings_tool(query: str = "next 7 days", user_id: str = None)
 
     try:
         # Use the async function from the upcoming_meetings_tool module
-        result = asyncio.run(get_upcoming_meetings(query, user_id))
+        result = run_sync(get_upcoming_meetings(query, user_id))
         return result
     except Exception as e:
         error_msg = f"❌ Failed to get upcoming meetings: {str(e)}"
         logger.error(error_msg)
         return error_msg
 
+@tool
+def find_free_slots(query: str = "next 7 days", user_id: str = None, min_duration_minutes: int = 30) -> str:
+    """
+    Find free time slots in Google Calendar within working hours.
+    
+    Args:
+        query: Day and optional part of day (e.g., "tomorrow afternoon", "friday", "this week")
+        user_id: ID of the user to check availability for
+        min_duration_minutes: Shortest free slot to report
+    
+    Returns:
+        Free slots with start, end and length, one per line
+    """
+    logger.info(f"📅 Finding free slots for user {user_id}: {query}")
+    
+    # Validate user_id format
+    if not user_id or user_id in ["unknown", "user123", ""]:
+        return "❌ Invalid user session. Please ensure you're properly logged in to use calendar features."
+    
+    # Basic UUID format validation
+    import re
+    uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[1-5][0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$'
+    if not re.match(uuid_pattern, user_id, re.IGNORECASE):
+        logger.error(f"❌ Invalid UUID format for user_id: {user_id}")
+        return "❌ Invalid user ID format. Please log in again to use calendar features."
+
+    try:
+        return run_sync(get_free_slots(query, user_id, min_duration_minutes))
+    except Exception as e:
+        error_msg = f"❌ Failed to find free slots: {str(e)}"
+        logger.error(error_msg)
+        return error_msg
+
 def create_calendar_tools():
     """Create list of calendar tools"""
-    return [create_calendar_event, get_upcoming_meetings_tool] 
\ No newline at end of file
+    return [create_calendar_event, get_upcoming_meetings_tool, find_free_slots] 
\ No newline at end of file
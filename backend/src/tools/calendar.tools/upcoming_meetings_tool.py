@@ -6,7 +6,6 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import pytz
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import logging
 import re
@@ -98,26 +97,20 @@ class UpcomingMeetingsTool:
         
         return start_time, end_time
 
-    def build_calendar_service(self, user_credentials: Dict[str, Any]):
-        """Build Google Calendar service with user credentials"""
-        try:
-            # Create credentials object
-            credentials = Credentials(
-                token=user_credentials['access_token'],
-                refresh_token=user_credentials.get('refresh_token'),
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=user_credentials.get('client_id'),
-                client_secret=user_credentials.get('client_secret'),
-                scopes=user_credentials.get('scope', '').split()
-            )
-            
-            # Build and return the service
-            service = build(self.service_name, self.service_version, credentials=credentials)
-            return service
-            
-        except Exception as e:
-            logger.error(f"Error building calendar service: {e}")
-            raise e
+    def parse_next_count(self, query: str) -> Optional[int]:
+        """Number of events asked for by "next meeting" / "next 3 events" style queries, else None"""
+        match = re.search(r'\bnext\s+(?:(\d+)\s+)?(?:meeting|event|call|appointment)(s?)\b', query.lower())
+        if not match:
+            return None
+        if match.group(1):
+            return max(1, min(int(match.group(1)), 50))
+        # "next meetings" without a number
+        return 5 if match.group(2) else 1
+
+    def build_calendar_service(self, credentials: Credentials):
+        """Calendar client for the user on the shared Google Calendar service"""
+        from src.services.calendar_client import calendar_client_factory
+        return calendar_client_factory.for_user(credentials)
 
     def fetch_calendar_events(
         self, 
@@ -133,14 +126,14 @@ class UpcomingMeetingsTool:
             time_max = end_time.isoformat()
             
             # Call the Calendar API
-            events_result = service.events().list(
+            events_result = service.execute(service.events().list(
                 calendarId='primary',
                 timeMin=time_min,
                 timeMax=time_max,
                 maxResults=max_results,
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ))
             
             events = events_result.get('items', [])
             logger.info(f"Retrieved {len(events)} events from Google Calendar")
@@ -276,6 +269,10 @@ class UpcomingMeetingsTool:
                 
                 response_lines.append(event_line)
                 
+                # Flag double bookings
+                if event.get('conflicts_with'):
+                    response_lines.append(f"     ⚠️ Overlaps with: {', '.join(event['conflicts_with'])}")
+                
                 # Add location if available
                 if event.get('location'):
                     response_lines.append(f"     📍 {event['location']}")
@@ -302,38 +299,60 @@ class UpcomingMeetingsTool:
         
         return "\n".join(response_lines)
 
-    async def get_upcoming_meetings(self, user_id: str, query: str = "next 7 days") -> str:
-        """Main function to get and format upcoming meetings"""
+    async def get_upcoming_meetings(self, user_id: str, query: str = "next 7 days", max_staleness: Optional[float] = None) -> str:
+        """Main function to get and format upcoming meetings
+
+        max_staleness: seconds old the locally synced events may be (None uses
+        CALENDAR_SYNC_MAX_STALENESS_SECONDS, 0 fetches changes first)
+        """
         try:
+            from src.services.calendar_sync import calendar_sync
+
             # Get user's calendar credentials
             credentials = await self.get_user_calendar_credentials(user_id)
             if not credentials:
                 return "❌ No Google Calendar connected. Please connect your Google Calendar first."
             
-            # Parse date range from query
-            start_time, end_time = self.parse_date_range(query)
-            
-            # Determine date range description for response
+            # Calendar client on the shared service
+            service = self.build_calendar_service(credentials)
             now = datetime.now(pytz.UTC)
-            if start_time.date() == now.date() and end_time.date() == (now + timedelta(days=1)).date():
-                date_range_desc = "today"
-            elif start_time.date() == (now + timedelta(days=1)).date():
-                date_range_desc = "tomorrow"
-            elif (end_time - start_time).days == 7:
-                date_range_desc = "this week"
+            next_count = self.parse_next_count(query) if calendar_sync.enabled else None
+
+            if next_count:
+                # "next meeting", "next 3 meetings": no date range, the next events from now
+                events = await asyncio.to_thread(calendar_sync.next_events, user_id, service, now, next_count, max_staleness)
+                date_range_desc = f"(next {next_count})"
             else:
-                date_range_desc = f"from {start_time.strftime('%b %d')} to {end_time.strftime('%b %d')}"
-            
-            # Build Google Calendar service
-            service = self.build_calendar_service(credentials)
+                # Parse date range from query
+                start_time, end_time = self.parse_date_range(query)
+                
+                # Determine date range description for response
+                if start_time.date() == now.date() and end_time.date() == (now + timedelta(days=1)).date():
+                    date_range_desc = "today"
+                elif start_time.date() == (now + timedelta(days=1)).date():
+                    date_range_desc = "tomorrow"
+                elif (end_time - start_time).days == 7:
+                    date_range_desc = "this week"
+                else:
+                    date_range_desc = f"from {start_time.strftime('%b %d')} to {end_time.strftime('%b %d')}"
+                
+                # Answer from the synced event store (blocking HTTP when it syncs, kept off the event loop)
+                if calendar_sync.enabled:
+                    events = await asyncio.to_thread(calendar_sync.get_events, user_id, service, start_time, end_time, 50, max_staleness)
+                else:
+                    events = await asyncio.to_thread(self.fetch_calendar_events, service, start_time, end_time)
             
-            # Fetch events
-            events = self.fetch_calendar_events(service, start_time, end_time)
+            # Double bookings come from the local interval index, not another API call
+            double_bookings = calendar_sync.double_bookings(user_id, events) if calendar_sync.enabled else {}
             
             # Format events
             formatted_events = []
             for event in events:
                 formatted_event = self.format_event(event)
+                if event.get('id') in double_bookings:
+                    formatted_event['conflicts_with'] = [
+                        conflict.get('summary', 'No Title') for conflict in double_bookings[event['id']]
+                    ]
                 formatted_events.append(formatted_event)
             
             # Generate response
@@ -347,31 +366,97 @@ class UpcomingMeetingsTool:
             logger.error(error_msg)
             return f"❌ {error_msg}"
 
-    async def get_user_calendar_credentials(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get user's calendar credentials for API calls"""
-        try:
-            from src.services.google_calendar_service import google_calendar_service
-            import os
-            
-            # Get integration from database
-            integration = await calendar_db.get_user_calendar_integration(user_id)
-            
-            if integration:
-                # Decrypt credentials
-                access_token = google_calendar_service.decrypt_token(integration['access_token'])
-                refresh_token = None
-                if integration.get('refresh_token'):
-                    refresh_token = google_calendar_service.decrypt_token(integration['refresh_token'])
-                
-                return {
-                    'access_token': access_token,
-                    'refresh_token': refresh_token,
-                    'token_expires_at': integration.get('token_expires_at'),
-                    'scope': integration.get('scope'),
-                    'client_id': os.getenv('GOOGLE_CLIENT_ID'),
-                    'client_secret': os.getenv('GOOGLE_CLIENT_SECRET')
-                }
+    async def get_free_slots(self,
+                             user_id: str,
+                             query: str = "next 7 days",
+                             min_duration_minutes: Optional[int] = None,
+                             work_start: Optional[str] = None,
+                             work_end: Optional[str] = None,
+                             timezone: Optional[str] = None,
+                             include_weekends: Optional[bool] = None,
+                             max_staleness: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Free slots for a query like "tomorrow afternoon", or None without a connected calendar
+
+        Times default to the calendar's own timezone. Weekends are skipped
+        unless the query names a single day or the weekend, or include_weekends is set.
+        Raises ValueError for invalid hours, durations or timezones.
+        """
+        from src.services.calendar_sync import calendar_sync, event_bounds
+        from src.services.calendar_index import blocks_time
+        from src.services import calendar_availability as availability
+
+        work_from = availability.parse_clock(work_start or availability.CALENDAR_WORK_START)
+        work_to = availability.parse_clock(work_end or availability.CALENDAR_WORK_END)
+        if work_to <= work_from:
+            raise ValueError("work_end must be after work_start")
+        if min_duration_minutes is None:
+            min_duration_minutes = availability.CALENDAR_MIN_SLOT_MINUTES
+        if min_duration_minutes <= 0:
+            raise ValueError("min_duration_minutes must be positive")
+        tz = availability.get_timezone(timezone) if timezone else None
+
+        credentials = await self.get_user_calendar_credentials(user_id)
+        if not credentials:
             return None
+        service = self.build_calendar_service(credentials)
+
+        if tz is None:
+            calendar_timezone = None
+            if calendar_sync.enabled:
+                calendar_timezone = await asyncio.to_thread(calendar_sync.calendar_timezone, user_id, service, max_staleness)
+            try:
+                tz = availability.get_timezone(calendar_timezone)
+            except ValueError:
+                tz = availability.get_timezone(None)
+
+        now = datetime.now(pytz.UTC)
+        window_start, window_end, day_part = availability.parse_availability_window(query, tz, now)
+        if day_part:
+            work_from, work_to = day_part
+        if include_weekends is None:
+            include_weekends = availability.window_includes_weekends(window_start, window_end)
+        # No slots in the past
+        window_start = max(window_start, now.astimezone(tz))
+
+        if calendar_sync.enabled:
+            busy = await asyncio.to_thread(calendar_sync.busy_intervals, user_id, service, window_start, window_end, max_staleness)
+        else:
+            events = await asyncio.to_thread(self.fetch_calendar_events, service, window_start, window_end, 250)
+            busy = [bounds for bounds in (event_bounds(event, tz.zone) for event in events if blocks_time(event)) if bounds]
+
+        slots = availability.find_free_slots(
+            busy, window_start, window_end, tz, work_from, work_to,
+            timedelta(minutes=min_duration_minutes), include_weekends
+        )
+        logger.info(f"Found {len(slots)} free slots for user {user_id}")
+        return {
+            'query': query,
+            'timezone': tz.zone,
+            'window_start': window_start.isoformat(),
+            'window_end': window_end.isoformat(),
+            'working_hours': {'start': work_from.strftime('%H:%M'), 'end': work_to.strftime('%H:%M')},
+            'min_duration_minutes': min_duration_minutes,
+            'slots': slots,
+        }
+
+    def format_free_slots(self, availability: Dict[str, Any]) -> str:
+        """Free slots as short lines the assistant can phrase directly"""
+        hours = availability['working_hours']
+        scope = f"{availability['min_duration_minutes']}+ min, {hours['start']}-{hours['end']} {availability['timezone']}"
+        if not availability['slots']:
+            return f"📅 No free slots ({scope}) for \"{availability['query']}\"."
+        lines = [f"📅 Free slots ({scope}):"]
+        for slot in availability['slots']:
+            start = datetime.fromisoformat(slot['start'])
+            end = datetime.fromisoformat(slot['end'])
+            lines.append(f"- {start.strftime('%a %b %d')}: {start.strftime('%I:%M %p')} - {end.strftime('%I:%M %p')} ({slot['duration_minutes']} min)")
+        return "\n".join(lines)
+
+    async def get_user_calendar_credentials(self, user_id: str) -> Optional[Credentials]:
+        """Get user's calendar credentials for API calls (cached and refreshed by calendar_tokens)"""
+        try:
+            from src.services.calendar_tokens import calendar_tokens
+            return await calendar_tokens.get_credentials(user_id)
         except Exception as e:
             logger.error(f"Error fetching calendar credentials: {e}")
             return None
@@ -380,13 +465,14 @@ class UpcomingMeetingsTool:
 upcoming_meetings_tool = UpcomingMeetingsTool()
 
 # Tool function for LangGraph integration
-async def get_upcoming_meetings(query: str = "next 7 days", user_id: str = None) -> str:
+async def get_upcoming_meetings(query: str = "next 7 days", user_id: str = None, max_staleness: Optional[float] = None) -> str:
     """
     LangGraph tool function to get upcoming meetings from Google Calendar
     
     Args:
         query: Natural language query describing the time range (e.g., "today", "this week", "next month")
         user_id: User ID to fetch calendar for
+        max_staleness: How old (seconds) locally synced events may be; None for the default
     
     Returns:
         Formatted string with upcoming meetings
@@ -394,4 +480,28 @@ async def get_upcoming_meetings(query: str = "next 7 days", user_id: str = None)
     if not user_id:
         return "❌ User ID is required to fetch calendar events."
     
-    return await upcoming_meetings_tool.get_upcoming_meetings(user_id, query) 
\ No newline at end of file
+    return await upcoming_meetings_tool.get_upcoming_meetings(user_id, query, max_staleness) 
+
+async def get_free_slots(query: str = "next 7 days", user_id: str = None, min_duration_minutes: Optional[int] = None) -> str:
+    """
+    LangGraph tool function to find free time in the user's Google Calendar
+    
+    Args:
+        query: Natural language day / part of day (e.g., "tomorrow afternoon", "friday", "this week")
+        user_id: User ID to check the calendar of
+        min_duration_minutes: Shortest slot worth reporting
+    
+    Returns:
+        Free slots, one per line
+    """
+    if not user_id:
+        return "❌ User ID is required to check availability."
+    
+    try:
+        availability = await upcoming_meetings_tool.get_free_slots(user_id, query, min_duration_minutes)
+        if availability is None:
+            return "❌ No Google Calendar connected. Please connect your Google Calendar first."
+        return upcoming_meetings_tool.format_free_slots(availability)
+    except Exception as e:
+        logger.error(f"Failed to find free slots: {e}")
+        return f"❌ Failed to find free slots: {str(e)}"
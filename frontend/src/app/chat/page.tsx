@@ -8,7 +8,7 @@ import { useAuth } from "@/contexts/AuthContext";
 import { useSession } from "@/contexts/SessionContext";
 import { useRouter } from "next/navigation";
 import { useEffect, useState } from "react";
-import { chatAPI, sessionAPI } from "@/lib/api";
+import { chatAPI, sessionAPI, SessionMessage } from "@/lib/api";
 import {
   LogOut,
   User,
@@ -37,11 +37,17 @@ export default function ChatPage() {
     createSession,
     selectSession,
     deleteSession,
+    refreshSessions,
+    hasMoreSessions,
+    loadMoreSessions,
   } = useSession();
   const router = useRouter();
   const [message, setMessage] = useState("");
   const [chatLoading, setChatLoading] = useState(false);
   const [chatHistory, setChatHistory] = useState<ChatMessage[]>([]);
+  // Cursor for loading older messages; null once the full history is loaded
+  const [olderCursor, setOlderCursor] = useState<number | null>(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
 
   useEffect(() => {
     if (!loading && !user) {
@@ -55,26 +61,45 @@ export default function ChatPage() {
       loadSessionMessages(currentSession.id);
     } else {
       setChatHistory([]);
+      setOlderCursor(null);
     }
   }, [currentSession]);
 
+  const formatMessages = (messages: SessionMessage[]): ChatMessage[] =>
+    messages.map((msg) => ({
+      role: msg.role as "user" | "assistant",
+      content: msg.content,
+      timestamp: new Date(msg.created_at),
+    }));
+
   const loadSessionMessages = async (sessionId: string) => {
     try {
-      const messages = await sessionAPI.getSessionMessages(sessionId);
-      const formattedMessages: ChatMessage[] = messages.map(
-        (msg: { role: string; content: string; created_at: string }) => ({
-          role: msg.role as "user" | "assistant",
-          content: msg.content,
-          timestamp: new Date(msg.created_at),
-        })
-      );
-      setChatHistory(formattedMessages);
+      const page = await sessionAPI.getSessionMessages(sessionId);
+      setChatHistory(formatMessages(page.messages));
+      setOlderCursor(page.next_cursor);
     } catch (error) {
       console.error("Failed to load session messages:", error);
       toast.error("Failed to load conversation history");
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!currentSession || olderCursor === null) return;
+    try {
+      setLoadingOlder(true);
+      const page = await sessionAPI.getSessionMessages(currentSession.id, {
+        before: olderCursor,
+      });
+      setChatHistory((prev) => [...formatMessages(page.messages), ...prev]);
+      setOlderCursor(page.next_cursor);
+    } catch (error) {
+      console.error("Failed to load older messages:", error);
+      toast.error("Failed to load earlier messages");
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   const handleSendMessage = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!message.trim()) return;
@@ -110,6 +135,8 @@ export default function ChatPage() {
       };
 
       setChatHistory((prev) => [...prev, assistantMessage]);
+      // Pick up the new preview/ordering without reloading the whole list
+      refreshSessions();
     } catch (error) {
       toast.error("Failed to send message");
       console.error("Chat error:", error);
@@ -218,6 +245,14 @@ export default function ChatPage() {
               </div>
             </div>
           ))}
+          {hasMoreSessions && (
+            <button
+              onClick={loadMoreSessions}
+              className="w-full p-3 text-sm text-blue-600 hover:text-blue-800 hover:bg-gray-50"
+            >
+              Load more sessions
+            </button>
+          )}
         </div>
 
         {/* Available Agents Section */}
@@ -316,6 +351,17 @@ export default function ChatPage() {
             </div>
           ) : (
             <div className="space-y-4">
+              {olderCursor !== null && (
+                <div className="text-center">
+                  <button
+                    onClick={loadOlderMessages}
+                    disabled={loadingOlder}
+                    className="text-sm text-blue-600 hover:text-blue-800 disabled:text-gray-400"
+                  >
+                    {loadingOlder ? "Loading..." : "Load earlier messages"}
+                  </button>
+                </div>
+              )}
               {chatHistory.map((msg, index) => (
                 <div
                   key={index}
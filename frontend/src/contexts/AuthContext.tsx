@@ -59,6 +59,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       } catch (error) {
         console.error("Auth check failed:", error);
         localStorage.removeItem("access_token");
+        localStorage.removeItem("refresh_token");
         localStorage.removeItem("user_data");
       } finally {
         setLoading(false);
@@ -75,6 +76,9 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
 
       // Store token and user data
       localStorage.setItem("access_token", response.access_token);
+      if (response.refresh_token) {
+        localStorage.setItem("refresh_token", response.refresh_token);
+      }
       localStorage.setItem("user_data", JSON.stringify(response.user));
 
       setUser(response.user);
@@ -107,6 +111,9 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
 
       // Store token and user data
       localStorage.setItem("access_token", response.access_token);
+      if (response.refresh_token) {
+        localStorage.setItem("refresh_token", response.refresh_token);
+      }
       localStorage.setItem("user_data", JSON.stringify(response.user));
 
       setUser(response.user);
@@ -121,7 +128,13 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
   };
 
   const signout = () => {
+    // Best effort: let the backend drop its cached copy of the user
+    const token = localStorage.getItem("access_token");
+    if (token) {
+      authAPI.signout(token).catch(() => {});
+    }
     localStorage.removeItem("access_token");
+    localStorage.removeItem("refresh_token");
     localStorage.removeItem("user_data");
     setUser(null);
     toast.success("Signed out successfully");
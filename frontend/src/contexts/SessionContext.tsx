@@ -4,21 +4,19 @@ import React, {
   useContext,
   useState,
   useEffect,
+  useRef,
   ReactNode,
 } from "react";
-import { sessionAPI } from "../lib/api";
-
-interface ChatSession {
-  id: string;
-  title: string;
-  description?: string;
-  is_active: boolean;
-  created_at: string;
-  updated_at: string;
-  last_message_at: string;
-  message_count: number;
-  last_message_preview: string;
-}
+import { sessionAPI, ChatSessionSummary } from "../lib/api";
+
+type ChatSession = ChatSessionSummary;
+
+// How often the sidebar polls for changed sessions
+const SESSION_POLL_INTERVAL_MS = 30000;
+
+const byLastMessageDesc = (a: ChatSession, b: ChatSession) =>
+  new Date(b.last_message_at).getTime() -
+    new Date(a.last_message_at).getTime() || b.id.localeCompare(a.id);
 
 interface SessionContextType {
   sessions: ChatSession[];
@@ -36,6 +34,8 @@ interface SessionContextType {
   ) => Promise<void>;
   deleteSession: (sessionId: string) => Promise<void>;
   refreshSessions: () => Promise<void>;
+  hasMoreSessions: boolean;
+  loadMoreSessions: () => Promise<void>;
 }
 
 const SessionContext = createContext<SessionContextType | undefined>(undefined);
@@ -46,20 +46,29 @@ export function SessionProvider({ children }: { children: ReactNode }) {
     null
   );
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  // synced_at of the last full load or poll, passed back as updated_since
+  const syncedAt = useRef<string | null>(null);
 
   useEffect(() => {
     loadSessions();
+    const interval = setInterval(() => {
+      refreshSessions();
+    }, SESSION_POLL_INTERVAL_MS);
+    return () => clearInterval(interval);
   }, []);
 
   const loadSessions = async () => {
     try {
       setLoading(true);
-      const sessionsData = await sessionAPI.getSessions();
-      setSessions(sessionsData);
+      const page = await sessionAPI.getSessions();
+      setSessions(page.sessions);
+      setNextCursor(page.next_cursor);
+      syncedAt.current = page.synced_at;
 
       // If no current session and sessions exist, select the first one
-      if (!currentSession && sessionsData.length > 0) {
-        setCurrentSession(sessionsData[0]);
+      if (!currentSession && page.sessions.length > 0) {
+        setCurrentSession(page.sessions[0]);
       }
     } catch (error) {
       console.error("Failed to load sessions:", error);
@@ -68,6 +77,20 @@ export function SessionProvider({ children }: { children: ReactNode }) {
     }
   };
 
+  const loadMoreSessions = async () => {
+    if (!nextCursor) return;
+    try {
+      const page = await sessionAPI.getSessions({ cursor: nextCursor });
+      setSessions((prev) => {
+        const known = new Set(prev.map((s) => s.id));
+        return [...prev, ...page.sessions.filter((s) => !known.has(s.id))];
+      });
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error("Failed to load more sessions:", error);
+    }
+  };
+
   const createSession = async (
     title = "New Chat",
     description?: string
@@ -128,8 +151,37 @@ export function SessionProvider({ children }: { children: ReactNode }) {
     }
   };
 
+  // Merge sessions changed since the last sync instead of reloading the list
   const refreshSessions = async () => {
-    await loadSessions();
+    if (!syncedAt.current) {
+      await loadSessions();
+      return;
+    }
+    try {
+      const changed: ChatSession[] = [];
+      let cursor: string | undefined;
+      let page;
+      do {
+        page = await sessionAPI.getSessions({
+          updatedSince: syncedAt.current,
+          cursor,
+        });
+        changed.push(...page.sessions);
+        cursor = page.next_cursor ?? undefined;
+      } while (page.has_more);
+      if (page.synced_at) syncedAt.current = page.synced_at;
+      if (changed.length === 0) return;
+
+      const changedById = new Map(changed.map((s) => [s.id, s]));
+      setSessions((prev) => {
+        const merged = prev
+          .filter((s) => !changedById.has(s.id))
+          .concat(changed.filter((s) => s.is_active));
+        return merged.sort(byLastMessageDesc);
+      });
+    } catch (error) {
+      console.error("Failed to refresh sessions:", error);
+    }
   };
 
   const value: SessionContextType = {
@@ -141,6 +193,8 @@ export function SessionProvider({ children }: { children: ReactNode }) {
     updateSession,
     deleteSession,
     refreshSessions,
+    hasMoreSessions: nextCursor !== null,
+    loadMoreSessions,
   };
 
   return (
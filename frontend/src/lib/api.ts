@@ -28,13 +28,52 @@ apiClient.interceptors.request.use(
   }
 );
 
+// One refresh in flight at a time, shared by every request that got a 401
+let refreshPromise: Promise<string | null> | null = null;
+
+const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (!refreshToken) return Promise.resolve(null);
+  if (!refreshPromise) {
+    // Plain axios so this request skips the interceptors
+    refreshPromise = axios
+      .post<AuthResponse>(`${API_BASE_URL}/auth/refresh`, {
+        refresh_token: refreshToken,
+      })
+      .then((response) => {
+        localStorage.setItem("access_token", response.data.access_token);
+        if (response.data.refresh_token) {
+          localStorage.setItem("refresh_token", response.data.refresh_token);
+        }
+        localStorage.setItem("user_data", JSON.stringify(response.data.user));
+        return response.data.access_token;
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
 // Response interceptor to handle auth errors
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 401 && original && !original._retried) {
+      // Expired access token: refresh once and replay the request
+      original._retried = true;
+      const token = await refreshAccessToken();
+      if (token) {
+        original.headers.Authorization = `Bearer ${token}`;
+        return apiClient(original);
+      }
+    }
     if (error.response?.status === 401) {
       // Clear token and redirect to login
       localStorage.removeItem("access_token");
+      localStorage.removeItem("refresh_token");
       localStorage.removeItem("user_data");
       if (typeof window !== "undefined") {
         window.location.href = "/auth/signin";
@@ -58,6 +97,7 @@ export interface User {
 export interface AuthResponse {
   user: User;
   access_token: string;
+  refresh_token?: string;
   token_type: string;
   expires_in: number;
 }
@@ -86,6 +126,58 @@ export interface ChatResponse {
   session_id?: string;
 }
 
+export interface ChatSessionSummary {
+  id: string;
+  title: string;
+  description?: string;
+  is_active: boolean;
+  created_at: string;
+  updated_at: string;
+  last_message_at: string;
+  message_count: number;
+  last_message_preview: string;
+}
+
+export interface SessionPage {
+  sessions: ChatSessionSummary[];
+  next_cursor: string | null;
+  has_more: boolean;
+  synced_at: string | null;
+}
+
+export interface SessionMessage {
+  id: string;
+  role: string;
+  content: string;
+  metadata: Record<string, unknown>;
+  message_order: number;
+  created_at: string;
+}
+
+export interface MessagePage {
+  messages: SessionMessage[];
+  next_cursor: number | null;
+  has_more: boolean;
+}
+
+export interface SearchHit {
+  id: string;
+  session_id: string;
+  session_title: string;
+  role: string;
+  message_order: number;
+  created_at: string;
+  rank: number;
+  // HTML-escaped text with matched terms wrapped in <mark>
+  snippet: string;
+}
+
+export interface SearchPage {
+  results: SearchHit[];
+  next_offset: number | null;
+  has_more: boolean;
+}
+
 export interface CalendarStatus {
   connected: boolean;
   provider: string | null;
@@ -97,6 +189,30 @@ export interface CalendarConnectResponse {
   auth_url: string;
 }
 
+export interface FreeSlot {
+  start: string;
+  end: string;
+  duration_minutes: number;
+}
+
+export interface CalendarAvailability {
+  query: string;
+  timezone: string;
+  window_start: string;
+  window_end: string;
+  working_hours: { start: string; end: string };
+  min_duration_minutes: number;
+  slots: FreeSlot[];
+}
+
+export interface AvailabilityOptions {
+  min_duration_minutes?: number;
+  work_start?: string;
+  work_end?: string;
+  timezone?: string;
+  include_weekends?: boolean;
+}
+
 // Auth API functions
 export const authAPI = {
   signup: async (data: SignupRequest): Promise<AuthResponse> => {
@@ -109,6 +225,14 @@ export const authAPI = {
     return response.data;
   },
 
+  // Takes the token explicitly: the caller clears it from storage right away
+  signout: async (token: string): Promise<{ message: string }> => {
+    const response = await apiClient.post("/auth/signout", null, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    return response.data;
+  },
+
   getProfile: async (): Promise<User> => {
     const response = await apiClient.get("/auth/me");
     return response.data;
@@ -137,9 +261,19 @@ export const chatAPI = {
 
 // Session management API
 export const sessionAPI = {
-  // Get all sessions for current user
-  getSessions: async () => {
-    const response = await apiClient.get("/sessions");
+  // Get a page of sessions for current user (most recently active first)
+  getSessions: async (
+    options: { limit?: number; cursor?: string; updatedSince?: string } = {}
+  ): Promise<SessionPage> => {
+    const params = new URLSearchParams();
+    if (options.limit) params.append("limit", options.limit.toString());
+    if (options.cursor) params.append("cursor", options.cursor);
+    if (options.updatedSince)
+      params.append("updated_since", options.updatedSince);
+
+    const response = await apiClient.get(
+      `/sessions${params.toString() ? "?" + params.toString() : ""}`
+    );
     return response.data;
   },
 
@@ -169,15 +303,17 @@ export const sessionAPI = {
     return response.data;
   },
 
-  // Get session messages
+  // Get a page of session messages (newest page unless a cursor is given)
   getSessionMessages: async (
     sessionId: string,
-    limit?: number,
-    offset?: number
-  ) => {
+    options: { limit?: number; before?: number; after?: number } = {}
+  ): Promise<MessagePage> => {
     const params = new URLSearchParams();
-    if (limit) params.append("limit", limit.toString());
-    if (offset) params.append("offset", offset.toString());
+    if (options.limit) params.append("limit", options.limit.toString());
+    if (options.before !== undefined)
+      params.append("before", options.before.toString());
+    if (options.after !== undefined)
+      params.append("after", options.after.toString());
 
     const url = `/sessions/${sessionId}/messages${
       params.toString() ? "?" + params.toString() : ""
@@ -187,6 +323,19 @@ export const sessionAPI = {
     return response.data;
   },
 
+  // Full-text search across the user's chat history
+  searchMessages: async (
+    query: string,
+    options: { limit?: number; offset?: number } = {}
+  ): Promise<SearchPage> => {
+    const params = new URLSearchParams({ q: query });
+    if (options.limit) params.append("limit", options.limit.toString());
+    if (options.offset) params.append("offset", options.offset.toString());
+
+    const response = await apiClient.get(`/sessions/search?${params.toString()}`);
+    return response.data;
+  },
+
   // Clear session messages
   clearSessionMessages: async (sessionId: string) => {
     const response = await apiClient.delete(`/sessions/${sessionId}/messages`);
@@ -223,4 +372,17 @@ export const calendarAPI = {
     const response = await apiClient.post("/calendar/upcoming", { query });
     return response.data;
   },
+
+  // Free slots within working hours (e.g. "tomorrow afternoon")
+  getAvailability: async (
+    query: string = "next 7 days",
+    options: AvailabilityOptions = {}
+  ): Promise<CalendarAvailability> => {
+    const params = new URLSearchParams({ query });
+    Object.entries(options).forEach(([key, value]) => {
+      if (value !== undefined) params.append(key, String(value));
+    });
+    const response = await apiClient.get(`/calendar/availability?${params}`);
+    return response.data;
+  },
 };